@@ -1,7 +1,10 @@
 from flask import Flask
 
+from .config import USE_X_SENDFILE
+
 def create_app():
     app = Flask(__name__)
+    app.config['USE_X_SENDFILE'] = USE_X_SENDFILE
     
     from .routes.api import api_bp
     from .routes.web import web
@@ -9,4 +12,8 @@ def create_app():
     app.register_blueprint(api_bp, url_prefix='/api')
     app.register_blueprint(web)
 
+    # Keep the METAR and upper air data directories bounded in the background
+    from .utils.artifact_store import get_artifact_store
+    get_artifact_store().start()
+
     return app
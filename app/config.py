@@ -1,5 +1,4 @@
 import os
-import shutil
 
 # Base directory of the application
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -7,12 +6,72 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 # Directory for storing all METAR related files
 METAR_DATA_DIR = os.path.join(BASE_DIR, 'app', 'static', 'metar_data')
 UPPER_AIR_DATA_DIR = os.path.join(BASE_DIR,'app','static','upper_air_data')
-# clean the directory
-if os.path.exists(METAR_DATA_DIR):
-    shutil.rmtree(METAR_DATA_DIR)
 
-if os.path.exists(UPPER_AIR_DATA_DIR):
-    shutil.rmtree(UPPER_AIR_DATA_DIR)
-# Create the directory if it doesn't exist
+# Directory for data that must survive restarts (never swept)
+INSTANCE_DIR = os.environ.get('METAR_INSTANCE_DIR', os.path.join(BASE_DIR, 'instance'))
+
+# Local METAR archive consulted before going to OGIMET
+METAR_ARCHIVE_PATH = os.environ.get('METAR_ARCHIVE_PATH', os.path.join(INSTANCE_DIR, 'metar_archive.sqlite3'))
+
+# OGIMET endpoint; point it at a local fake server to work offline
+OGIMET_BASE_URL = os.environ.get('OGIMET_BASE_URL', 'http://www.ogimet.com/cgi-bin')
+
+# University of Wyoming sounding endpoint; point it at a local server to work offline
+UWYO_SOUNDING_URL = os.environ.get('UWYO_SOUNDING_URL', 'https://weather.uwyo.edu/wsgi/sounding')
+
+# Downloaded soundings, kept across restarts and evicted least recently used first
+SOUNDING_CACHE_DIR = os.environ.get('SOUNDING_CACHE_DIR', os.path.join(INSTANCE_DIR, 'soundings'))
+SOUNDING_CACHE_MAX_BYTES = int(os.environ.get('SOUNDING_CACHE_MAX_BYTES', 200 * 1024 * 1024))
+SOUNDING_CACHE_MEMORY_ITEMS = int(os.environ.get('SOUNDING_CACHE_MEMORY_ITEMS', 32))
+
+# Parsed forecast PDFs kept in memory, keyed by content hash
+FORECAST_CACHE_ITEMS = int(os.environ.get('FORECAST_CACHE_ITEMS', 128))
+
+# Upstream HTTP requests (OGIMET, University of Wyoming)
+HTTP_CONNECT_TIMEOUT = float(os.environ.get('HTTP_CONNECT_TIMEOUT', 10))
+HTTP_READ_TIMEOUT = float(os.environ.get('HTTP_READ_TIMEOUT', 60))
+HTTP_MAX_RETRIES = int(os.environ.get('HTTP_MAX_RETRIES', 3))
+HTTP_BACKOFF_FACTOR = float(os.environ.get('HTTP_BACKOFF_FACTOR', 1))
+HTTP_MAX_BACKOFF = float(os.environ.get('HTTP_MAX_BACKOFF', 60))
+HTTP_MAX_PER_HOST = int(os.environ.get('HTTP_MAX_PER_HOST', 4))
+
+# Batch verification: worker processes and concurrent OGIMET fetches
+BATCH_WORKERS = int(os.environ.get('BATCH_WORKERS', os.cpu_count() or 1))
+BATCH_FETCH_WORKERS = int(os.environ.get('BATCH_FETCH_WORKERS', 4))
+
+# Bulk forecast weather verification: validity periods of a station less than
+# this many hours apart are fetched from OGIMET as one range
+FORECAST_BATCH_MAX_GAP_HOURS = float(os.environ.get('FORECAST_BATCH_MAX_GAP_HOURS', 24))
+
+# Format of the process_metar result files: 'csv', or 'parquet'/'feather' (needs
+# pyarrow; the CSV is then written when a file is first downloaded)
+ARTIFACT_FORMAT = os.environ.get('ARTIFACT_FORMAT', 'csv')
+
+# Let the front-end server (nginx X-Accel / Apache mod_xsendfile) send downloads
+USE_X_SENDFILE = os.environ.get('USE_X_SENDFILE', '').lower() in ('1', 'true', 'yes')
+
+# Cache of process_metar results, keyed by the uploaded files and parameters
+RESULT_CACHE_DB_PATH = os.environ.get('RESULT_CACHE_DB_PATH', os.path.join(INSTANCE_DIR, 'result_cache.sqlite3'))
+RESULT_CACHE_TTL_SECONDS = int(os.environ.get('RESULT_CACHE_TTL_SECONDS', 24 * 3600))
+RESULT_CACHE_RECENT_TTL_SECONDS = int(os.environ.get('RESULT_CACHE_RECENT_TTL_SECONDS', 600))
+RESULT_CACHE_MAX_BYTES = int(os.environ.get('RESULT_CACHE_MAX_BYTES', 500 * 1024 * 1024))
+
+# Background jobs for the processing endpoints
+JOB_DB_PATH = os.environ.get('JOB_DB_PATH', os.path.join(INSTANCE_DIR, 'jobs.sqlite3'))
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 4))
+JOB_MAX_PENDING = int(os.environ.get('JOB_MAX_PENDING', 32))
+JOB_RETENTION_SECONDS = int(os.environ.get('JOB_RETENTION_SECONDS', 24 * 3600))
+
+# Generated files under METAR_DATA_DIR and UPPER_AIR_DATA_DIR are kept until a
+# background sweep removes those unused for ARTIFACT_MAX_AGE_SECONDS, then the
+# least recently used ones above ARTIFACT_MAX_BYTES (see app.utils.artifact_store)
+ARTIFACT_DB_PATH = os.environ.get('ARTIFACT_DB_PATH', os.path.join(INSTANCE_DIR, 'artifacts.sqlite3'))
+ARTIFACT_MAX_AGE_SECONDS = int(os.environ.get('ARTIFACT_MAX_AGE_SECONDS', 7 * 24 * 3600))
+ARTIFACT_MAX_BYTES = int(os.environ.get('ARTIFACT_MAX_BYTES', 2 * 1024 * 1024 * 1024))
+ARTIFACT_MIN_AGE_SECONDS = int(os.environ.get('ARTIFACT_MIN_AGE_SECONDS', 3600))
+ARTIFACT_SWEEP_INTERVAL_SECONDS = int(os.environ.get('ARTIFACT_SWEEP_INTERVAL_SECONDS', 3600))
+
+# Create the directories if they don't exist
 os.makedirs(METAR_DATA_DIR, exist_ok=True)
-os.makedirs(UPPER_AIR_DATA_DIR, exist_ok=True) 
\ No newline at end of file
+os.makedirs(UPPER_AIR_DATA_DIR, exist_ok=True)
+os.makedirs(INSTANCE_DIR, exist_ok=True)
@@ -1,20 +1,36 @@
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, request, jsonify, send_file, url_for
 import os
 import uuid
 import base64
+import time
 from datetime import datetime
 import re
 from werkzeug.utils import secure_filename
-from app.utils import decode_metar_to_csv, extract_data_from_file_with_day_and_wind, compare_weather_data, OgimetAPI, extract_day_month_year_from_filename,extract_month_year_from_date,fetch_upper_air_data,circular_difference,process_weather_accuracy_helper,interpolate_temperature_only
-from app.config import METAR_DATA_DIR, UPPER_AIR_DATA_DIR
+from app.utils import decode_metar_to_csv, extract_data_from_file_with_day_and_wind, compare_weather_data, compare_weather_data_chunked, OgimetAPI, extract_day_month_year_from_filename,extract_month_year_from_date,fetch_upper_air_data,load_upper_air_data,circular_difference,process_weather_accuracy_helper,interpolate_temperature_only
+from app.config import METAR_DATA_DIR, UPPER_AIR_DATA_DIR, ARTIFACT_FORMAT
+from app.utils.artifact_store import get_artifact_store
+from app.utils.artifacts import (
+    artifact_format, artifact_path, compressed_variant, ensure_csv, precompress, write_artifact
+)
+from app.utils.jobs import JobQueue, JobQueueFull, QUEUED, FINISHED, FAILED
+from app.utils.http_client import get_http_client
+from app.utils.result_cache import get_result_cache, result_key, stream_digest
+from app.utils.sounding_cache import get_sounding_cache
+from app.utils.stages import Stage, run_stages
+from app.utils.batch import run_batch, stations_from_zip
+from app.utils.forecast_batch import forecast_pdfs_from_zip, run_forecast_batch
+from app.utils.forecast_document import get_forecast_document_cache, load_forecast_document
+from app.utils.metar_reader import iter_metar_reports, report_station
+from app.utils.warning_bulletin import parse_warning_bulletin
+from app.utils.warning_verification import MetarTimeline, verify_warnings, warning_accuracy
 import tempfile
 import pandas as pd
 import numpy as np
 import re
-from PyPDF2 import PdfReader
 from datetime import datetime
 import requests
 from urllib.parse import quote
+import zipfile
 
 
 api_bp = Blueprint('api', __name__, url_prefix='/api')
@@ -31,6 +47,9 @@ os.makedirs(METAR_DOWNLOADS_DIR, exist_ok=True)
 os.makedirs(UPPER_AIR_UPLOADS_DIR, exist_ok=True)
 os.makedirs(UPPER_AIR_DOWNLOADS_DIR, exist_ok=True)
 
+# Background jobs for async process_metar / process_upper_air requests
+job_queue = JobQueue()
+
 def encode_file_path(file_path):
     """Encode a file path to a secure token"""
     # Combine with a random UUID to prevent guessing
@@ -116,6 +135,31 @@ def get_metar():
             "error": f"An error occurred while retrieving METAR data: {str(e)}"
         }), 500
 
+def _async_requested():
+    """Return True if the client asked for the request to run as a background job."""
+    value = request.values.get('async', '')
+    return value.lower() in ('1', 'true', 'yes')
+
+def _report_progress(progress, message):
+    print(f"[INFO] {message}")
+    if progress:
+        progress(message)
+
+def _queue_job(kind, func, params):
+    """Submit a prepared request to the job queue and return the 202 response."""
+    try:
+        job_id = job_queue.submit(kind, func, params)
+    except JobQueueFull as e:
+        return jsonify({
+            "error": f"Too many jobs in progress, please try again later. ({str(e)})"
+        }), 503
+    return jsonify({
+        "status": QUEUED,
+        "job_id": job_id,
+        "status_url": url_for('api.job_status', job_id=job_id),
+        "result_url": url_for('api.job_result', job_id=job_id)
+    }), 202
+
 @api_bp.route('/process_metar', methods=['POST'])
 def process_metar():
     """
@@ -126,187 +170,845 @@ def process_metar():
         "start_date": "YYYYMMDDHHMM", // Start date for METAR data
         "end_date": "YYYYMMDDHHMM",   // End date for METAR data
         "icao": "VABB",               // ICAO code for the airport
+        "tolerance_minutes": "30",    // Optional, match forecasts with the nearest METAR this close
+        "async": "true"               // Optional, run as a background job
     }
     
     The forecast file should be uploaded as 'forecast_file' in the multipart/form-data.
     
+    A request repeating an earlier one (same files, ICAO, dates and options)
+    is answered from the result cache, even when async is set.
+
     Returns:
-        JSON response with analysis results and paths to generated files
+        JSON response with analysis results and paths to generated files, or
+        202 with a job id when async is set (see /api/jobs/<job_id>)
     """
     try:
-        # Parse multipart/form-data
-        form_data = request.form.to_dict()
+        params, early_response = _prepare_process_metar()
+        if early_response:
+            return early_response
+
+        if _async_requested():
+            return _queue_job('process_metar', run_process_metar, params)
+
+        response_data, status_code = run_process_metar(params)
+        return jsonify(response_data), status_code
         
-        # Extract parameters from form data
-        start_date = form_data.get('start_date')
-        end_date = form_data.get('end_date') 
-        icao = form_data.get('icao')
-        verification_type = request.form.get('verification_type', 'daily')  # default to daily
+    except Exception as e:
+        # Log the error (in a production environment, you'd use a proper logger)
+        print(f"Error in process_metar: {str(e)}")
+        return jsonify({
+            "error": f"An error occurred while processing the METAR data: {str(e)}"
+        }), 500
+
+def _prepare_process_metar():
+    """
+    Validate a process_metar request and save its uploads.
 
-        is_date_time_provided = start_date and end_date
-        is_observation_file_provided = 'observation_file' in request.files
+    Runs in the request thread, as the uploaded files are only available there.
 
-        # Validate required parameters
-        if not ((start_date and end_date) or is_observation_file_provided) or not icao:
+    Returns:
+        tuple: (params, None) on success, or (None, response) when the request is
+               answered right away: an error, or a result from the result cache
+    """
+    # Parse multipart/form-data
+    form_data = request.form.to_dict()
+    
+    # Extract parameters from form data
+    start_date = form_data.get('start_date')
+    end_date = form_data.get('end_date') 
+    icao = form_data.get('icao')
+    verification_type = request.form.get('verification_type', 'daily')  # default to daily
+
+    is_date_time_provided = start_date and end_date
+    is_observation_file_provided = 'observation_file' in request.files
+
+    # Validate required parameters
+    if not ((start_date and end_date) or is_observation_file_provided) or not icao:
+        return None, (jsonify({
+            "error": "Missing required parameters. Please provide either (start_date and end_date) or observation file, and icao."
+        }), 400)
+    
+    # Sanitize ICAO code (allow only alphanumeric characters)
+    icao = re.sub(r'[^a-zA-Z0-9]', '', icao)
+
+    # Nearest-observation matching window; 0 compares exact times only
+    try:
+        tolerance = int(form_data.get('tolerance_minutes') or 0)
+        if tolerance < 0:
+            raise ValueError
+    except ValueError:
+        return None, (jsonify({
+            "error": "Invalid tolerance_minutes. Please give a whole number of minutes (0 or more)."
+        }), 400)
+    
+    # Validate date formats and extract month/year
+    metar_month_year = None
+    metar_month = metar_year = None
+    if is_date_time_provided:
+        try:
+            # Use helper function to extract month and year from start date
+            _, metar_month, metar_year, metar_month_year = extract_month_year_from_date(start_date)
+            print(f"Extracted METAR month/year: {metar_month_year}")
+            # Also validate end date format
+            datetime.strptime(end_date, "%Y%m%d%H%M")
+            if not metar_month_year:
+                return None, (jsonify({
+                    "error": "Could not extract month and year from start date."
+                }), 400)
+        except ValueError:
+            return None, (jsonify({
+                "error": "Invalid date format. Please use the format YYYYMMDDHHMM."
+            }), 400)
+        
+    # Check if forecast file is provided
+    if 'forecast_file' not in request.files:
+        return None, (jsonify({
+            "error": "No forecast file provided. Please upload a forecast file."
+        }), 400)
+        
+    forecast_file = request.files['forecast_file']
+    print(f"Forecast file: {forecast_file.filename}")
+
+    if forecast_file.filename == '':
+        return None, (jsonify({
+            "error": "Empty forecast file. Please upload a valid forecast file."
+        }), 400)
+    
+    # Extract month and year from forecast filename using helper function
+    _, forecast_month, forecast_year, forecast_month_year = extract_day_month_year_from_filename(forecast_file.filename)
+
+    if is_observation_file_provided:
+        observation_file = request.files['observation_file']
+        if observation_file.filename == '':
+            return None, (jsonify({
+                "error": "Empty observation file. Please upload a valid observation file."
+            }), 400)
+        
+        print(f"Observation file: {observation_file.filename}")
+        # If using observation file, extract month/year from its filename if possible
+        if not metar_month_year:
+            _, metar_month, metar_year, metar_month_year = extract_day_month_year_from_filename(observation_file.filename)
+    
+    # Validate month/year match if both are available
+    if metar_month_year and forecast_month_year and metar_month_year != forecast_month_year:
+        return None, (jsonify({
+            "error": f"Month/year mismatch between METAR data ({metar_month_year}) and forecast file ({forecast_month_year}). Please ensure both files are for the same month and year."
+        }), 200)
+
+    # Everything the result depends on; the uploads are hashed before they are saved
+    cache_key = result_key(
+        forecast=stream_digest(forecast_file.stream),
+        forecast_filename=forecast_file.filename,
+        observation=stream_digest(observation_file.stream) if is_observation_file_provided else None,
+        observation_filename=observation_file.filename if is_observation_file_provided else None,
+        icao=icao,
+        start_date=start_date,
+        end_date=end_date,
+        tolerance=tolerance,
+        artifact_format=ARTIFACT_FORMAT,
+    )
+    cached_response = get_result_cache().get(cache_key)
+    if cached_response:
+        print(f"Result cache hit for {icao} ({cache_key[:12]})")
+        return None, (jsonify(cached_response), 200)
+        
+    # Save forecast file with secure filename. Each request gets its own
+    # folder and file suffix so concurrent jobs never overwrite each other.
+    timestamp = f"{datetime.now().strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:8]}"
+    request_dir = os.path.join(METAR_UPLOADS_DIR, timestamp)
+    os.makedirs(request_dir, exist_ok=True)
+    forecast_filename = secure_filename(f"{forecast_month_year}.txt")
+    forecast_path = os.path.join(request_dir, forecast_filename)
+    forecast_file.save(forecast_path)
+
+    metar_path = None
+    if not is_date_time_provided:
+        # get observation file
+        # save observation file
+        observation_filename = secure_filename(f"observation_{icao}_{timestamp}.txt")
+        observation_path = os.path.join(METAR_UPLOADS_DIR, observation_filename)
+        observation_file.save(observation_path)
+        metar_path = observation_path
+
+    return {
+        "start_date": start_date,
+        "end_date": end_date,
+        "icao": icao,
+        "timestamp": timestamp,
+        "forecast_path": forecast_path,
+        "metar_path": metar_path,
+        "tolerance": tolerance,
+        "cache_key": cache_key,
+        "month": metar_month or forecast_month,
+        "year": metar_year or forecast_year,
+    }, None
+
+def run_process_metar(params, progress=None):
+    """
+    Fetch, decode and verify METAR data for a prepared process_metar request.
+
+    Does not touch the Flask request, so it can run in a background job.
+    The decoded METAR frame is held in memory in full (one forecast month of
+    reports); only the merged rows are written out a chunk at a time.
+
+    Args:
+        params: Dictionary returned by _prepare_process_metar
+        progress: Optional callback receiving short progress messages
+
+    Returns:
+        tuple: (response_data, status_code)
+    """
+    start_date = params["start_date"]
+    end_date = params["end_date"]
+    icao = params["icao"]
+    timestamp = params["timestamp"]
+    forecast_path = params["forecast_path"]
+    metar_path = params["metar_path"]
+
+    if metar_path is None:
+        # Get METAR data using OgimetAPI
+        _report_progress(progress, f"Fetching METAR data for {icao}")
+        api = OgimetAPI()
+        metar_path = api.save_metar_to_file(
+            begin=start_date,
+            end=end_date,
+            icao=icao
+        )
+    
+    # Decode METAR data to CSV with secure filename
+    _report_progress(progress, "Decoding METAR reports")
+    metar_csv_filename = secure_filename(f"decoded_metar_{icao}_{timestamp}.csv")
+    # Parquet/Feather in place of CSV if so configured (ARTIFACT_FORMAT)
+    metar_csv_path = artifact_path(os.path.join(METAR_DOWNLOADS_DIR, metar_csv_filename))
+    # Observation month/year let the decoder resolve report days (DDHHMMZ);
+    # reports of other stations in an uploaded dump are skipped
+    df_metar = decode_metar_to_csv(
+        metar_path,
+        metar_csv_path,
+        month=params["month"],
+        year=params["year"],
+        icao=icao,
+    )
+    if df_metar is None:
+        return {"error": "Could not decode the METAR reports. Please check the observation data."}, 400
+    
+    # Extract forecast data
+    df_forecast = extract_data_from_file_with_day_and_wind(forecast_path)
+    
+    # Compare weather data; merged rows are written to the merged CSV a month at a time,
+    # the decoded METAR and forecast frames stay in memory
+    _report_progress(progress, "Comparing observations with the forecast")
+    merged_csv_filename = secure_filename(f"merged_{icao}_{timestamp}.csv")
+    merged_csv_path = artifact_path(os.path.join(METAR_DOWNLOADS_DIR, merged_csv_filename))
+    comparison_df, _ = compare_weather_data_chunked(
+        df_metar, df_forecast, merged_csv_path, tolerance=params.get("tolerance", 0)
+    )
+    if comparison_df.empty:
+        return {"error": "No METAR observation matches a forecast day and time. Please check the forecast file is for the same station and period."}, 400
+    
+    _report_progress(progress, "Writing result files")
+    # Save comparison results to CSV with secure filename
+    comparison_csv_filename = secure_filename(f"comparison_{icao}_{timestamp}.csv")
+    comparison_csv_path = artifact_path(os.path.join(METAR_DOWNLOADS_DIR, comparison_csv_filename))
+
+    # Create header information with period and station details
+    header = f"REPORT,{icao},"
+    if start_date and end_date:
+        format_date = lambda x: datetime.strptime(x, "%Y%m%d%H%M").strftime("%d/%m/%Y %H:%M UTC") if x else ""
+        header += f"{format_date(start_date)} to {format_date(end_date)},"
+    else:
+        header += "Observation,"
+    header += "\n"  # Empty line separator
+
+    write_artifact(comparison_df, comparison_csv_path, preamble=header)
+
+    # Calculate metrics
+    total_comparisons = len(comparison_df)
+    #accurate_predictions = len(comparison_df[comparison_df['Accuracy'] == 'Accurate'])
+    accurate_predictions = 0
+    accuracy_percentage = (accurate_predictions / total_comparisons) * 100 if total_comparisons > 0 else 0
+    
+    # Encode file paths for security
+    encoded_metar_path = encode_file_path(metar_path)
+    encoded_metar_csv_path = encode_file_path(metar_csv_path)
+    encoded_comparison_csv_path = encode_file_path(comparison_csv_path)
+    encoded_merged_csv_path = encode_file_path(merged_csv_path)
+
+    # Prepare response
+    response_data = {
+        "status": "success",
+        "message": "METAR data processed successfully",
+        "metrics": {
+            "total_comparisons": total_comparisons,
+            "accurate_predictions": accurate_predictions,
+            "accuracy_percentage": round(accuracy_percentage, 2)
+        },
+        "file_paths": {
+            "metar_file": encoded_metar_path,
+            "metar_csv": encoded_metar_csv_path,
+            "comparison_csv": encoded_comparison_csv_path,
+            "merged_csv": encoded_merged_csv_path
+        },
+        "metadata": {
+            "start_time": datetime.strptime(start_date, "%Y%m%d%H%M").strftime("%d/%m/%Y %H:%M UTC") if start_date else None,
+            "end_time": datetime.strptime(end_date, "%Y%m%d%H%M").strftime("%d/%m/%Y %H:%M UTC") if end_date else None,
+            "icao": icao,
+            "decode_stats": df_metar.attrs.get("decode_stats"),
+            "artifact_format": artifact_format(merged_csv_path),
+        },
+        # "comparison_data": comparison_df.to_dict(orient='records')
+    }
+
+    # Compressed copies for downloads, made once here instead of on every download
+    result_files = [metar_path, metar_csv_path, comparison_csv_path, merged_csv_path]
+    for path in list(result_files):
+        result_files += precompress(path)
+    get_artifact_store().register("process_metar", forecast_path, *result_files)
+
+    # Cache the response with the files it links to, for repeats of this request
+    cache_key = params.get("cache_key")
+    if cache_key:
+        result_cache = get_result_cache()
+        result_cache.put(cache_key, response_data, [path for path in result_files if os.path.exists(path)],
+                         end_date=end_date)
+        response_data["metadata"]["cache"] = {"hit": False, "key": cache_key, **result_cache.metrics()}
+    
+    return response_data, 200
+
+@api_bp.route('/process_metar_batch', methods=['POST'])
+def process_metar_batch():
+    """
+    Verify the forecasts of several aerodromes in one request.
+
+    Form fields (multipart/form-data):
+        start_date: Start date for METAR data in format YYYYMMDDHHMM (optional if every station has observations)
+        end_date: End date for METAR data in format YYYYMMDDHHMM
+        batch_file: Zip archive with one forecast file per station (see stations_from_zip), or
+        icao / forecast_file: Repeated fields, paired in order
+        async: Optional, run as a background job
+
+    Returns:
+        JSON response with per-station results and the consolidated report, or
+        202 with a job id when async is set
+    """
+    try:
+        params, error_response = _prepare_process_metar_batch()
+        if error_response:
+            return error_response
+
+        if _async_requested():
+            return _queue_job('process_metar_batch', run_process_metar_batch, params)
+
+        response_data, status_code = run_process_metar_batch(params)
+        return jsonify(response_data), status_code
+
+    except Exception as e:
+        print(f"Error in process_metar_batch: {str(e)}")
+        return jsonify({
+            "error": f"An error occurred while processing the METAR batch: {str(e)}"
+        }), 500
+
+def _prepare_process_metar_batch():
+    """
+    Validate a process_metar_batch request and save its uploads.
+
+    Returns:
+        tuple: (params, None) on success, or (None, error_response)
+    """
+    start_date = request.form.get('start_date')
+    end_date = request.form.get('end_date')
+    if start_date or end_date:
+        try:
+            datetime.strptime(start_date or '', "%Y%m%d%H%M")
+            datetime.strptime(end_date or '', "%Y%m%d%H%M")
+        except ValueError:
+            return None, (jsonify({
+                "error": "Invalid date format. Please use the format YYYYMMDDHHMM."
+            }), 400)
+
+    timestamp = f"{datetime.now().strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:8]}"
+    request_dir = os.path.join(METAR_UPLOADS_DIR, f"batch_{timestamp}")
+    os.makedirs(request_dir, exist_ok=True)
+
+    batch_file = request.files.get('batch_file')
+    if batch_file and batch_file.filename:
+        zip_path = os.path.join(request_dir, 'batch.zip')
+        batch_file.save(zip_path)
+        try:
+            stations = stations_from_zip(zip_path, request_dir)
+        except (ValueError, zipfile.BadZipFile) as e:
+            return None, (jsonify({
+                "error": f"Invalid batch archive: {str(e)}"
+            }), 400)
+    else:
+        icaos = request.form.getlist('icao')
+        forecast_files = request.files.getlist('forecast_file')
+        if not icaos or len(icaos) != len(forecast_files):
+            return None, (jsonify({
+                "error": "Please upload a batch_file zip, or one forecast_file for every icao."
+            }), 400)
+        stations = []
+        for icao, forecast_file in zip(icaos, forecast_files):
+            # Sanitize ICAO code (allow only alphanumeric characters)
+            icao = re.sub(r'[^a-zA-Z0-9]', '', icao).upper()
+            if not icao or forecast_file.filename == '':
+                return None, (jsonify({
+                    "error": "Empty icao or forecast file in the batch."
+                }), 400)
+            station_dir = os.path.join(request_dir, icao)
+            os.makedirs(station_dir, exist_ok=True)
+            forecast_path = os.path.join(station_dir, secure_filename(forecast_file.filename))
+            forecast_file.save(forecast_path)
+            stations.append({"icao": icao, "forecast_path": forecast_path, "metar_path": None})
+
+    if not (start_date and end_date) and any(not station["metar_path"] for station in stations):
+        return None, (jsonify({
+            "error": "Please provide start_date and end_date, or an observation file for every station."
+        }), 400)
+
+    return {
+        "start_date": start_date,
+        "end_date": end_date,
+        "stations": stations,
+        "output_dir": os.path.join(METAR_DOWNLOADS_DIR, f"batch_{timestamp}"),
+    }, None
+
+def run_process_metar_batch(params, progress=None):
+    """
+    Run a prepared process_metar_batch request.
+
+    Args:
+        params: Dictionary returned by _prepare_process_metar_batch
+        progress: Optional callback receiving short progress messages
+
+    Returns:
+        tuple: (response_data, status_code)
+    """
+    result = run_batch(
+        params["stations"],
+        params["start_date"],
+        params["end_date"],
+        output_dir=params["output_dir"],
+        progress=progress,
+    )
+
+    artifacts = [result["summary_csv"]]
+    for station in params["stations"]:
+        artifacts += [station["forecast_path"], station.get("metar_path")]
+    for station in result["stations"]:
+        for path in station["files"].values():
+            artifacts += [path, *precompress(path)]
+    artifacts += precompress(result["summary_csv"])
+    get_artifact_store().register("process_metar_batch", *artifacts)
+
+    stations = []
+    for station in result["stations"]:
+        stations.append({
+            **{key: value for key, value in station.items() if key != "files"},
+            "file_paths": {name: encode_file_path(path) for name, path in station["files"].items()},
+        })
+
+    response_data = {
+        "status": "success",
+        "message": f"Verified {result['succeeded']} of {len(stations)} station(s)",
+        "metrics": {
+            "stations": len(stations),
+            "succeeded": result["succeeded"],
+            "failed": result["failed"],
+        },
+        "file_paths": {
+            "batch_summary_csv": encode_file_path(result["summary_csv"])
+        },
+        "stations": stations,
+        "metadata": {
+            "start_time": datetime.strptime(params["start_date"], "%Y%m%d%H%M").strftime("%d/%m/%Y %H:%M UTC") if params["start_date"] else None,
+            "end_time": datetime.strptime(params["end_date"], "%Y%m%d%H%M").strftime("%d/%m/%Y %H:%M UTC") if params["end_date"] else None,
+        },
+    }
+    return response_data, 200
+
+@api_bp.route('/process_forecast_batch', methods=['POST'])
+def process_forecast_batch():
+    """
+    Score the weather of many local forecast PDFs in one request.
+
+    Form fields (multipart/form-data):
+        batch_file: Zip archive of forecast PDFs, or
+        forecast_file: Repeated field, one forecast PDF each
+        icao: Optional station of the PDFs that do not name one
+        async: Optional, run as a background job
+
+    Returns:
+        JSON response with the score of every PDF and the consolidated report,
+        or 202 with a job id when async is set
+    """
+    try:
+        params, error_response = _prepare_process_forecast_batch()
+        if error_response:
+            return error_response
+
+        if _async_requested():
+            return _queue_job('process_forecast_batch', run_process_forecast_batch, params)
+
+        response_data, status_code = run_process_forecast_batch(params)
+        return jsonify(response_data), status_code
+
+    except Exception as e:
+        print(f"Error in process_forecast_batch: {str(e)}")
+        return jsonify({
+            "error": f"An error occurred while processing the forecast batch: {str(e)}"
+        }), 500
+
+def _prepare_process_forecast_batch():
+    """
+    Validate a process_forecast_batch request and save its uploads.
+
+    Returns:
+        tuple: (params, None) on success, or (None, error_response)
+    """
+    icao = re.sub(r'[^a-zA-Z0-9]', '', request.form.get('icao', '')).upper() or None
+
+    timestamp = f"{datetime.now().strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:8]}"
+    request_dir = os.path.join(METAR_UPLOADS_DIR, f"forecast_batch_{timestamp}")
+    os.makedirs(request_dir, exist_ok=True)
+
+    batch_file = request.files.get('batch_file')
+    if batch_file and batch_file.filename:
+        zip_path = os.path.join(request_dir, 'batch.zip')
+        batch_file.save(zip_path)
+        try:
+            paths = forecast_pdfs_from_zip(zip_path, request_dir)
+        except (ValueError, zipfile.BadZipFile) as e:
+            return None, (jsonify({
+                "error": f"Invalid batch archive: {str(e)}"
+            }), 400)
+    else:
+        paths = []
+        for number, forecast_file in enumerate(request.files.getlist('forecast_file')):
+            if forecast_file.filename == '':
+                continue
+            # Numbered, as several uploads may have the same name
+            path = os.path.join(request_dir, f"{number:04d}_{secure_filename(forecast_file.filename)}")
+            forecast_file.save(path)
+            paths.append(path)
+        if not paths:
+            return None, (jsonify({
+                "error": "Please upload a batch_file zip or at least one forecast_file."
+            }), 400)
+
+    return {
+        "paths": paths,
+        "icao": icao,
+        "output_dir": os.path.join(METAR_DOWNLOADS_DIR, f"forecast_batch_{timestamp}"),
+    }, None
+
+def run_process_forecast_batch(params, progress=None):
+    """
+    Run a prepared process_forecast_batch request.
+
+    Args:
+        params: Dictionary returned by _prepare_process_forecast_batch
+        progress: Optional callback receiving short progress messages
+
+    Returns:
+        tuple: (response_data, status_code)
+    """
+    result = run_forecast_batch(
+        params["paths"],
+        icao=params["icao"],
+        output_dir=params["output_dir"],
+        progress=progress,
+    )
+
+    artifacts = [*params["paths"], result["report_csv"], *precompress(result["report_csv"])]
+    artifacts += [metar_range["metar_path"] for metar_range in result["ranges"]]
+    get_artifact_store().register("process_forecast_batch", *artifacts)
+
+    def utc(value):
+        return value.strftime("%d/%m/%Y %H:%M UTC") if value else None
+
+    forecasts = []
+    for forecast in result["forecasts"]:
+        forecasts.append({
+            "file": os.path.basename(forecast["file"]),
+            "icao": forecast["icao"],
+            "start_time": utc(forecast["start"]),
+            "end_time": utc(forecast["end"]),
+            "weather": forecast["weather"],
+            "weather_accuracy": forecast.get("accuracy"),
+            "status": forecast["status"],
+            "error": forecast["error"],
+        })
+
+    response_data = {
+        "status": "success",
+        "message": f"Scored {result['succeeded']} of {len(forecasts)} forecast(s)",
+        "metrics": {
+            "forecasts": len(forecasts),
+            "succeeded": result["succeeded"],
+            "failed": result["failed"],
+            "mean_weather_accuracy": result["mean_accuracy"],
+        },
+        "file_paths": {
+            "forecast_batch_csv": encode_file_path(result["report_csv"])
+        },
+        "forecasts": forecasts,
+        "metadata": {
+            "metar_ranges": [
+                {
+                    "icao": metar_range["icao"],
+                    "start_time": utc(metar_range["start"]),
+                    "end_time": utc(metar_range["end"]),
+                    "reports": metar_range["reports"],
+                }
+                for metar_range in result["ranges"]
+            ],
+        },
+    }
+    return response_data, 200
+
+@api_bp.route('/verify_aerodrome_warnings', methods=['POST'])
+def verify_aerodrome_warnings():
+    """
+    Verify a month of aerodrome warnings against the METAR reports.
+
+    Form fields (multipart/form-data):
+        warning_file: Aerodrome warning composite (the monthly bulletin text)
+        icao: ICAO code of the aerodrome; warnings of other stations are skipped
+        observation_file: METAR reports of the month, or
+        start_date / end_date: Range of METAR data to fetch, in format YYYYMMDDHHMM
+
+    Both uploads are parsed straight from the request stream.
+
+    Returns:
+        JSON response with the warning report, the accuracy percentage and the
+        path of the report CSV
+    """
+    try:
+        start_date = request.form.get('start_date')
+        end_date = request.form.get('end_date')
+        icao = request.form.get('icao')
+        warning_file = request.files.get('warning_file')
+        observation_file = request.files.get('observation_file')
+
+        if not warning_file or warning_file.filename == '':
+            return jsonify({
+                "error": "No warning file provided. Please upload the aerodrome warning composite as warning_file."
+            }), 400
+        if not ((start_date and end_date) or (observation_file and observation_file.filename)) or not icao:
             return jsonify({
                 "error": "Missing required parameters. Please provide either (start_date and end_date) or observation file, and icao."
             }), 400
-        
+
         # Sanitize ICAO code (allow only alphanumeric characters)
-        icao = re.sub(r'[^a-zA-Z0-9]', '', icao)
-        
-        # Validate date formats and extract month/year
-        metar_month_year = None
-        if is_date_time_provided:
+        icao = re.sub(r'[^a-zA-Z0-9]', '', icao).upper()
+
+        month = year = None
+        if start_date and end_date:
             try:
-                # Use helper function to extract month and year from start date
-                _,_, _, metar_month_year = extract_month_year_from_date(start_date)
-                print(f"Extracted METAR month/year: {metar_month_year}")
-                # Also validate end date format
+                _, month, year, _ = extract_month_year_from_date(start_date)
                 datetime.strptime(end_date, "%Y%m%d%H%M")
-                if not metar_month_year:
-                    return jsonify({
-                        "error": "Could not extract month and year from start date."
-                    }), 400
             except ValueError:
                 return jsonify({
                     "error": "Invalid date format. Please use the format YYYYMMDDHHMM."
                 }), 400
-            
-        # Check if forecast file is provided
-        if 'forecast_file' not in request.files:
+        elif observation_file:
+            _, month, year, _ = extract_day_month_year_from_filename(observation_file.filename)
+
+        try:
+            ad_warn_df = parse_warning_bulletin(
+                warning_file.stream,
+                station=icao,
+                year=int(year) if year else None,
+                month=int(month) if month else None,
+            )
+        except ValueError as e:
             return jsonify({
-                "error": "No forecast file provided. Please upload a forecast file."
+                "error": f"Invalid warning file: {str(e)}"
             }), 400
-            
-        forecast_file = request.files['forecast_file']
-        print(f"Forecast file: {forecast_file.filename}")
-
-        if forecast_file.filename == '':
+        if ad_warn_df.empty:
             return jsonify({
-                "error": "Empty forecast file. Please upload a valid forecast file."
+                "error": f"No aerodrome warnings for {icao} found in the warning file."
             }), 400
-        
-        # Extract month and year from forecast filename using helper function
-        _,_, _, forecast_month_year = extract_day_month_year_from_filename(forecast_file.filename)
 
-        if is_observation_file_provided:
-            observation_file = request.files['observation_file']
-            if observation_file.filename == '':
+        if observation_file and observation_file.filename:
+            metar_reports = iter_metar_reports(observation_file.stream)
+        else:
+            metar_path = OgimetAPI().save_metar_to_file(begin=start_date, end=end_date, icao=icao)
+            if not os.path.exists(metar_path):
                 return jsonify({
-                    "error": "Empty observation file. Please upload a valid observation file."
-                }), 400
-            
-            print(f"Observation file: {observation_file.filename}")
-            # If using observation file, extract month/year from its filename if possible
-            if not metar_month_year:
-                _,_, _, metar_month_year = extract_day_month_year_from_filename(observation_file.filename)
-        
-        # Validate month/year match if both are available
-        if metar_month_year and forecast_month_year and metar_month_year != forecast_month_year:
+                    "error": f"No METAR data found for {icao} between {start_date} and {end_date}."
+                }), 404
+            metar_reports = iter_metar_reports(metar_path)
+
+        # Reports of other stations in an uploaded dump are skipped
+        timeline = MetarTimeline(
+            (f"{timestamp} {report}" if timestamp else report
+             for report, timestamp in metar_reports
+             if report_station(report) in (None, icao)),
+            year=int(year) if year else None,
+            month=int(month) if month else None,
+        )
+        if not len(timeline):
             return jsonify({
-                "error": f"Month/year mismatch between METAR data ({metar_month_year}) and forecast file ({forecast_month_year}). Please ensure both files are for the same month and year."
-            }), 200
-            
-        # Save forecast file with secure filename
-        timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
-        forecast_filename = secure_filename(f"{forecast_month_year}.txt")
-        forecast_path = os.path.join(METAR_UPLOADS_DIR, forecast_filename)
-        forecast_file.save(forecast_path)
-        
-        if is_date_time_provided:   
-            # Get METAR data using OgimetAPI
-            api = OgimetAPI()
-            metar_path = api.save_metar_to_file(
-                begin=start_date,
-                end=end_date,
-                icao=icao
-            )
-        else:
-            # get observation file
-            # save observation file
-            observation_filename = secure_filename(f"observation_{icao}_{timestamp}.txt")
-            observation_path = os.path.join(METAR_UPLOADS_DIR, observation_filename)
-            observation_file.save(observation_path)
-            metar_path = observation_path
-        
-        # Decode METAR data to CSV with secure filename
-        metar_csv_filename = secure_filename(f"decoded_metar_{icao}_{timestamp}.csv")
-        metar_csv_path = os.path.join(METAR_DOWNLOADS_DIR, metar_csv_filename)
-        df_metar = decode_metar_to_csv(metar_path, metar_csv_path)
-        
-        # Extract forecast data
-        df_forecast = extract_data_from_file_with_day_and_wind(forecast_path)
-        
-        # Compare weather data
-        comparison_df, merged_df = compare_weather_data(df_metar, df_forecast)
-        
-        # Save comparison results to CSV with secure filename
-        comparison_csv_filename = secure_filename(f"comparison_{icao}_{timestamp}.csv")
-        comparison_csv_path = os.path.join(METAR_DOWNLOADS_DIR, comparison_csv_filename)
-
-        # Create header information with period and station details
-        with open(comparison_csv_path, 'w', newline='', encoding='utf-8') as f:
-            f.write(f"REPORT,")
-            f.write(f"{icao},")
-            if start_date and end_date:
-                format_date = lambda x: datetime.strptime(x, "%Y%m%d%H%M").strftime("%d/%m/%Y %H:%M UTC") if x else ""
-                f.write(f"{format_date(start_date)} to {format_date(end_date)},")
-            else:
-                f.write(f"Observation,")
-            f.write("\n")  # Empty line separator
+                "error": "No METAR reports found for the warning period."
+            }), 400
 
-        comparison_df.to_csv(comparison_csv_path, index=False, mode='a')
+        report_df = verify_warnings(ad_warn_df, timeline)
+        accuracy = warning_accuracy(report_df)
 
-        # Save merged data to CSV with secure filename
-        merged_csv_filename = secure_filename(f"merged_{icao}_{timestamp}.csv")
-        merged_csv_path = os.path.join(METAR_DOWNLOADS_DIR, merged_csv_filename)
-        merged_df.to_csv(merged_csv_path, index=False)
-        
-        # Calculate metrics
-        total_comparisons = len(comparison_df)
-        #accurate_predictions = len(comparison_df[comparison_df['Accuracy'] == 'Accurate'])
-        accurate_predictions = 0
-        accuracy_percentage = (accurate_predictions / total_comparisons) * 100 if total_comparisons > 0 else 0
-        
-        # Encode file paths for security
-        encoded_metar_path = encode_file_path(metar_path)
-        encoded_metar_csv_path = encode_file_path(metar_csv_path)
-        encoded_comparison_csv_path = encode_file_path(comparison_csv_path)
-        encoded_merged_csv_path = encode_file_path(merged_csv_path)
-
-        # Prepare response
-        response_data = {
+        timestamp = f"{datetime.now().strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:8]}"
+        report_path = os.path.join(METAR_DOWNLOADS_DIR, secure_filename(f"warning_report_{icao}_{timestamp}.csv"))
+        report_df.to_csv(report_path, index=False)
+        get_artifact_store().register("aerodrome_warnings", report_path, *precompress(report_path))
+
+        correct = int(report_df["true-1 / false-0"].sum())
+        return jsonify({
             "status": "success",
-            "message": "METAR data processed successfully",
+            "message": f"{correct} of {len(report_df)} warning(s) for {icao} verified correct",
             "metrics": {
-                "total_comparisons": total_comparisons,
-                "accurate_predictions": accurate_predictions,
-                "accuracy_percentage": round(accuracy_percentage, 2)
+                "warnings": len(report_df),
+                "correct": correct,
+                "accuracy_percentage": round(accuracy, 2) if accuracy is not None else None,
             },
             "file_paths": {
-                "metar_file": encoded_metar_path,
-                "metar_csv": encoded_metar_csv_path,
-                "comparison_csv": encoded_comparison_csv_path,
-                "merged_csv": encoded_merged_csv_path
+                "warning_report_csv": encode_file_path(report_path)
             },
+            "report": report_df.astype(object).where(report_df.notna(), None).to_dict(orient='records'),
             "metadata": {
-                "start_time": datetime.strptime(start_date, "%Y%m%d%H%M").strftime("%d/%m/%Y %H:%M UTC") if start_date else None,
-                "end_time": datetime.strptime(end_date, "%Y%m%d%H%M").strftime("%d/%m/%Y %H:%M UTC") if end_date else None,
                 "icao": icao,
+                "month": timeline.month,
+                "year": timeline.year,
+                "metar_reports": len(timeline),
             },
-            # "comparison_data": comparison_df.to_dict(orient='records')
-        }
-        
-        return jsonify(response_data), 200
-        
+        }), 200
+
     except Exception as e:
-        # Log the error (in a production environment, you'd use a proper logger)
-        print(f"Error in process_metar: {str(e)}")
+        print(f"Error in verify_aerodrome_warnings: {str(e)}")
         return jsonify({
-            "error": f"An error occurred while processing the METAR data: {str(e)}"
+            "error": f"An error occurred while verifying the aerodrome warnings: {str(e)}"
         }), 500
-    
+
+@api_bp.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """
+    Report the state of a background job.
+
+    Parameters:
+        job_id: Id returned by an async process_metar or process_upper_air request
+
+    Returns:
+        JSON with the job status (queued, running, finished or failed) and progress
+    """
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({
+            "error": f"Unknown or expired job: {job_id}"
+        }), 404
+
+    response_data = {
+        "job_id": job["id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "progress": job["progress"],
+        "created": job["created"],
+        "started": job["started"],
+        "finished": job["finished"],
+        "result_url": url_for('api.job_result', job_id=job_id)
+    }
+    if job["status"] == FAILED:
+        response_data["error"] = job["error"]
+    elif job["status"] == FINISHED and isinstance(job["result"], dict):
+        response_data["file_paths"] = job["result"].get("file_paths")
+    return jsonify(response_data), 200
+
+@api_bp.route('/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    """
+    Return the response of a finished background job.
+
+    The body and status code are the ones the synchronous endpoint would have
+    returned. While the job is still queued or running, 202 is returned with
+    the current status instead.
+    """
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({
+            "error": f"Unknown or expired job: {job_id}"
+        }), 404
+
+    if job["status"] not in (FINISHED, FAILED):
+        return jsonify({
+            "job_id": job["id"],
+            "status": job["status"],
+            "progress": job["progress"]
+        }), 202
+    return jsonify(job["result"]), job["status_code"]
+
+@api_bp.route('/metrics/http', methods=['GET'])
+def http_metrics():
+    """
+    Report upstream request counts, failures, retries and latency per host.
+    """
+    return jsonify(get_http_client().metrics()), 200
+
+@api_bp.route('/metrics/sounding_cache', methods=['GET'])
+def sounding_cache_metrics():
+    """
+    Report sounding cache hits (memory and disk), misses, evictions and size.
+    """
+    return jsonify(get_sounding_cache().metrics()), 200
+
+@api_bp.route('/metrics/result_cache', methods=['GET'])
+def result_cache_metrics():
+    """
+    Report process_metar result cache hits, misses, stores, evictions and size.
+    """
+    return jsonify(get_result_cache().metrics()), 200
+
+@api_bp.route('/metrics/forecast_documents', methods=['GET'])
+def forecast_document_metrics():
+    """
+    Report forecast PDF cache hits, misses and the pages extracted and skipped.
+    """
+    return jsonify(get_forecast_document_cache().metrics()), 200
+
+@api_bp.route('/metrics/artifacts', methods=['GET'])
+def artifact_metrics():
+    """
+    Report registered result files per kind, the last retention sweep and its limits.
+    """
+    return jsonify(get_artifact_store().metrics()), 200
+
+
+def _send_artifact(file_path, mime_type, download_name):
+    """
+    Send a generated file, or its precompressed variant if the client accepts it.
+
+    send_file answers If-None-Match / If-Modified-Since with 304 and Range
+    requests with 206, and leaves the copy to the server: wsgi.file_wrapper
+    (sendfile under e.g. gunicorn), or the front-end server with USE_X_SENDFILE.
+    """
+    served_path, encoding = compressed_variant(file_path, request.accept_encodings)
+    # A downloaded file is kept for another ARTIFACT_MAX_AGE_SECONDS
+    store = get_artifact_store()
+    store.touch(file_path)
+    if served_path != file_path:
+        store.touch(served_path)
+
+    response = send_file(
+        served_path,
+        mimetype=mime_type,
+        as_attachment=True,
+        download_name=download_name,
+        conditional=True,
+        etag=True
+    )
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    return response
 
 @api_bp.route('/download/<file_type>', methods=['GET'])
 def download_file(file_type):
@@ -314,8 +1016,10 @@ def download_file(file_type):
     Download generated files.
     
     Parameters:
-        file_type: Type of file to download ('metar', 'metar_csv', 'comparison_csv')
+        file_type: Type of file to download ('metar', 'metar_csv', 'comparison_csv', 'merged_csv', 'batch_summary_csv', 'forecast_batch_csv', 'warning_report_csv')
         file_path: Path to the file (from the process_metar response)
+        format: 'csv' (default), or 'native' for the Parquet/Feather file itself.
+                The CSV of a Parquet/Feather result is written on its first download.
     """
     try:
         encoded_path = request.args.get('file_path')
@@ -352,20 +1056,20 @@ def download_file(file_type):
         if file_type == 'metar':
             mime_type = 'text/plain'
             filename = secure_filename(os.path.basename(file_path))
-        elif file_type in ['metar_csv', 'comparison_csv', 'merged_csv']:
-            mime_type = 'text/csv'
+        elif file_type in ['metar_csv', 'comparison_csv', 'merged_csv', 'batch_summary_csv', 'forecast_batch_csv', 'warning_report_csv']:
+            stored_format = artifact_format(file_path)
+            if stored_format != 'csv' and request.args.get('format') == 'native':
+                mime_type = 'application/vnd.apache.parquet' if stored_format == 'parquet' else 'application/vnd.apache.arrow.file'
+            else:
+                file_path = ensure_csv(file_path)
+                mime_type = 'text/csv'
             filename = secure_filename(os.path.basename(file_path))
         else:
             return jsonify({
-                "error": f"Invalid file type: {file_type}. Valid types are 'metar', 'metar_csv', 'comparison_csv', and 'merged_csv'."
+                "error": f"Invalid file type: {file_type}. Valid types are 'metar', 'metar_csv', 'comparison_csv', 'merged_csv', 'batch_summary_csv', 'forecast_batch_csv' and 'warning_report_csv'."
             }), 400
         
-        return send_file(
-            file_path,
-            mimetype=mime_type,
-            as_attachment=True,
-            download_name=filename
-        )
+        return _send_artifact(file_path, mime_type, filename)
         
     except Exception as e:
         print(f"Error in download_file: {str(e)}")
@@ -374,59 +1078,29 @@ def download_file(file_type):
         }), 500
 
 def parse_forecast_pdf(pdf_path):
-    reader = PdfReader(pdf_path)
-    text = "\n".join(page.extract_text() for page in reader.pages)
+    """
+    Read the sections of a local forecast PDF needed by the upper air verification.
 
-    # Extract UPPER WINDS section
-    match = re.search(r"UPPER WINDS(.*?)WEATHER", text, re.DOTALL)
-    if not match:
-        raise ValueError("Upper Winds section not found in PDF.")
-    upper_winds_text = match.group(1)
+    The PDF is parsed once per content (see app.utils.forecast_document).
 
-    icaoM = re.search(r"LOCAL FORECAST FOR(.*?)AND", text)
-    if not icaoM:
-        raise ValueError("ICAO code not found in PDF.")
-    icao = icaoM.group(1).strip()
-    print(f"ICAO code extracted: {icao}")
-
-    startDateTimeM = re.search(r"FROM(.*?)UTC", text,re.DOTALL)
-    if not startDateTimeM:
-        raise ValueError("Start date and time not found in PDF.")
-    
-    startDateTimeRaw = startDateTimeM.group(1).strip()
-    try:
-    # Example: if the PDF gives "01 Jan 2023 00:00"
-        dt = datetime.strptime(startDateTimeRaw, "%Y/%m/%d %H:%M")
-        startDateTime = dt.strftime("%Y%m%d%H%M")
-    except ValueError:
-    # Try another format if needed, or raise error
-        raise ValueError(f"Could not parse date/time: '{startDateTimeRaw}'")
+    Returns:
+        tuple: (upper winds DataFrame, weather text, start YYYYMMDDHHMM, end YYYYMMDDHHMM, ICAO code)
 
-    endDateTimeM = re.search(r"TO(.*?)UTC", text,re.DOTALL)
-    if not endDateTimeM:
+    Raises:
+        ValueError: If a section is missing from the PDF
+    """
+    document = load_forecast_document(pdf_path)
+    if document.upper_winds is None:
+        raise ValueError("Upper Winds section not found in PDF.")
+    if document.icao is None:
+        raise ValueError("ICAO code not found in PDF.")
+    print(f"ICAO code extracted: {document.icao}")
+    if document.valid_from is None:
         raise ValueError("Start date and time not found in PDF.")
-    
-    endDateTimeRaw = endDateTimeM.group(1).strip()
-    try:
-    # Example: if the PDF gives "01 Jan 2023 00:00"
-        dt = datetime.strptime(endDateTimeRaw, "%Y/%m/%d %H:%M")
-        endDateTime = dt.strftime("%Y%m%d%H%M")
-    except ValueError:
-    # Try another format if needed, or raise error
-        raise ValueError(f"Could not parse date/time: '{endDateTimeRaw}'")
-
+    if document.valid_to is None:
+        raise ValueError("End date and time not found in PDF.")
 
-    # Extract WEATHER section (from 'WEATHER' to end or next section)
-    weather_match = re.search(r"WEATHER(.*?)(?==)", text, re.DOTALL)
-    weather_text = weather_match.group(1).strip() if weather_match else ""
-
-    # Extract wind data
-    pattern = re.findall(r"(\d+)[Mm]\s+(\d{3})/(\d{2})\s+([+-]?\d{2})", upper_winds_text)
-    data = [(int(alt), dir, speed, temp) for alt, dir, speed, temp in pattern]
-    data.sort(reverse=True)
-
-    df = pd.DataFrame(data, columns=["Altitude (m)", "Wind Direction", "Wind Speed (kt)", "Temperature (°C)"])
-    return df, weather_text,startDateTime, endDateTime,icao
+    return document.upper_winds_frame(), document.weather or "", document.start, document.end, document.icao
 
 @api_bp.route('/get_upper_air', methods=['GET'])
 def get_upper_air():
@@ -455,171 +1129,285 @@ def get_upper_air():
 @api_bp.route('/process_upper_air', methods=['POST'])
 def process_upper_air():
     try:
-        station_id = request.form['station_id']
-        datetime_str = request.form.get('datetime')
-        # reference_temp = request.form.get('reference_temp', None)
-        # print(reference_temp)
-        # try:
-        #     reference_temp = float(reference_temp)
-        # except (TypeError, ValueError):
-        #     reference_temp = 2.0  # Default value
+        params = _prepare_process_upper_air()
 
-        observation_file = request.files.get('observation_file')
-        forecast_file = request.files.get('forecast_file')
+        if _async_requested():
+            return _queue_job('process_upper_air', run_process_upper_air, params)
 
-        # --- Handle Forecast File ---
-        forecast_df = None
-        if forecast_file:
-            forecast_filename = secure_filename(forecast_file.filename)
-            forecast_path = os.path.join(UPPER_AIR_DATA_DIR, 'uploads', forecast_filename)
-            forecast_file.save(forecast_path)
-            forecast_df,weather,startTime,endTime,icao = parse_forecast_pdf(forecast_path)
-            if hasattr(forecast_df, 'columns'):
-                forecast_df.columns = forecast_df.columns.str.strip()
-                forecast_df = forecast_df.applymap(lambda x: x.strip() if isinstance(x, str) else x)
-        # --- Handle Observation File or Fetch ---
-        if observation_file:
-            obs_path = os.path.join(UPPER_AIR_DOWNLOADS_DIR, secure_filename(observation_file.filename))
-            observation_file.save(obs_path)
-            actual_df = pd.read_csv(obs_path, skipinitialspace=True)
-            actual_df.columns = actual_df.columns.str.strip()
-            actual_df = actual_df.applymap(lambda x: x.strip() if isinstance(x, str) else x)
+        response_data, status_code = run_process_upper_air(params)
+        return jsonify(response_data), status_code
+
+    except Exception as e:
+        print(f"[ERROR] Exception in process_upper_air: {e}")
+        return jsonify({'error': str(e)}), 500
+
+def _prepare_process_upper_air():
+    """
+    Read a process_upper_air request and save its uploads.
+
+    Returns:
+        dict: Parameters for run_process_upper_air
+    """
+    station_id = request.form['station_id']
+    datetime_str = request.form.get('datetime')
+    # reference_temp = request.form.get('reference_temp', None)
+    # print(reference_temp)
+    # try:
+    #     reference_temp = float(reference_temp)
+    # except (TypeError, ValueError):
+    #     reference_temp = 2.0  # Default value
+
+    observation_file = request.files.get('observation_file')
+    forecast_file = request.files.get('forecast_file')
+
+    # Each request gets its own folder so concurrent jobs never overwrite each other
+    timestamp = f"{datetime.now().strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:8]}"
+    request_dir = os.path.join(UPPER_AIR_UPLOADS_DIR, timestamp)
+    os.makedirs(request_dir, exist_ok=True)
+
+    forecast_path = None
+    if forecast_file:
+        forecast_filename = secure_filename(forecast_file.filename)
+        forecast_path = os.path.join(request_dir, forecast_filename)
+        forecast_file.save(forecast_path)
+
+    obs_path = None
+    if observation_file:
+        obs_path = os.path.join(request_dir, secure_filename(observation_file.filename))
+        observation_file.save(obs_path)
+
+    return {
+        "station_id": station_id,
+        "datetime": datetime_str,
+        "timestamp": timestamp,
+        "forecast_path": forecast_path,
+        "obs_path": obs_path,
+    }
+
+def _read_upper_air_forecast(forecast_path, progress=None):
+    """
+    Stage of process_upper_air: read the forecast PDF.
+
+    Returns:
+        tuple: (forecast levels DataFrame, weather text, start, end, ICAO code)
+    """
+    if not forecast_path:
+        raise ValueError("Please upload the forecast PDF.")
+    # --- Handle Forecast File ---
+    _report_progress(progress, "Reading the forecast PDF")
+    forecast_df,weather,startTime,endTime,icao = parse_forecast_pdf(forecast_path)
+    if hasattr(forecast_df, 'columns'):
+        forecast_df.columns = forecast_df.columns.str.strip()
+        forecast_df = forecast_df.applymap(lambda x: x.strip() if isinstance(x, str) else x)
+    return forecast_df, weather, startTime, endTime, icao
+
+def _read_upper_air_observations(obs_path, datetime_str, station_id, progress=None):
+    """
+    Stage of process_upper_air: read the uploaded sounding, or fetch it from UWyo.
+    """
+    # --- Handle Observation File or Fetch ---
+    if obs_path:
+        actual_df = pd.read_csv(obs_path, skipinitialspace=True)
+        actual_df.columns = actual_df.columns.str.strip()
+        actual_df = actual_df.applymap(lambda x: x.strip() if isinstance(x, str) else x)
+    else:
+        _report_progress(progress, f"Fetching sounding for station {station_id}")
+        actual_df = load_upper_air_data(datetime_str, station_id)
+    return actual_df
+
+def _fetch_forecast_metar(forecast, progress=None):
+    """
+    Stage of process_upper_air: fetch the METAR reports of the forecast validity.
+
+    Returns:
+        str: Path of the METAR text file
+    """
+    _, _, startTime, endTime, icao = forecast
+    _report_progress(progress, f"Fetching METAR data for {icao}")
+    return OgimetAPI().save_metar_to_file(begin=startTime, end=endTime, icao=icao)
+
+def _verify_upper_air(forecast_df, actual_df, progress=None):
+    """
+    Stage of process_upper_air: match the forecast levels to the sounding.
+
+    Returns:
+        tuple: (matched levels DataFrame, temperature, wind speed and wind direction accuracy)
+    """
+    _report_progress(progress, "Comparing sounding with the forecast")
+    print(actual_df.head())
+
+    # --- Debug: Print columns to verify ---
+    print("actual_df columns:", actual_df.columns.tolist())
+    if forecast_df is not None:
+        print("forecast_df columns:", forecast_df.columns.tolist())
+
+    # --- Convert columns to numeric as needed ---
+    for col in ["geopotential height_m", "temperature_C", "wind speed_m/s"]:
+        if col in actual_df.columns:
+            actual_df[col] = pd.to_numeric(actual_df[col], errors="coerce")
         else:
-            file_path = fetch_upper_air_data(datetime_str, station_id)
-            actual_df = pd.read_csv(file_path, skipinitialspace=True)
-            actual_df.columns = actual_df.columns.str.strip()
-            actual_df = actual_df.applymap(lambda x: x.strip() if isinstance(x, str) else x)
-
-        print(actual_df.head())
-
-        # --- Debug: Print columns to verify ---
-        print("actual_df columns:", actual_df.columns.tolist())
-        if forecast_df is not None:
-            print("forecast_df columns:", forecast_df.columns.tolist())
-
-        # --- Convert columns to numeric as needed ---
-        for col in ["geopotential height_m", "temperature_C", "wind speed_m/s"]:
-            if col in actual_df.columns:
-                actual_df[col] = pd.to_numeric(actual_df[col], errors="coerce")
-            else:
-                raise KeyError(f"Column '{col}' not found in observation data.")
+            raise KeyError(f"Column '{col}' not found in observation data.")
 
-        for col in ["Altitude (m)", "Temperature (°C)", "Wind Speed (kt)"]:
-            if col in forecast_df.columns:
-                forecast_df[col] = pd.to_numeric(forecast_df[col], errors="coerce")
-            else:
-                raise KeyError(f"Column '{col}' not found in forecast data.")
-
-        # --- Merge and Calculate ---
-        # actual_df["key"] = 1
-        # forecast_df["key"] = 1
-
-        # merged = pd.merge(actual_df, forecast_df, on="key").drop("key", axis=1)
-        # merged["height_diff"] = (merged["geopotential height_m"] - merged["Altitude (m)"]).abs()
-        # min_pairs = merged.loc[merged.groupby("Altitude (m)")["height_diff"].idxmin()]
-
-        # min_pairs["wind speed_kt_actual"] = min_pairs["wind speed_m/s"] * 1.94384
-        # min_pairs["temp_diff"] = (min_pairs["Temperature (°C)"] - min_pairs["temperature_C"]).abs()
-        # min_pairs["wind_diff"] = (min_pairs["Wind Speed (kt)"] - min_pairs["wind speed_kt_actual"]).abs()
-        # if "wind direction_degree" in min_pairs.columns and "Wind Direction" in min_pairs.columns:
-        #     min_pairs["wind_dir_diff"] = min_pairs.apply(
-        #         lambda row: circular_difference(
-        #             float(row["wind direction_degree"]),
-        #             float(row["Wind Direction"])
-        #         ) if pd.notnull(row["wind direction_degree"]) and pd.notnull(row["Wind Direction"]) else np.nan,
-        #         axis=1
-        #     )
-
-        #     wind_dir_threshold = 30
-        #     min_pairs["wind_dir_correct"] = min_pairs["wind_dir_diff"].apply(
-        #         lambda diff: not pd.isnull(diff) and diff <= wind_dir_threshold
-        #     )       
-        #     wind_dir_accuracy = round(min_pairs["wind_dir_correct"].mean() * 100, 2)
-        # else:
-        #     wind_dir_accuracy = None
-
-        # Replaces merge + min_pairs logic
-
-        min_pairs = interpolate_temperature_only(actual_df, forecast_df)
+    for col in ["Altitude (m)", "Temperature (°C)", "Wind Speed (kt)"]:
+        if col in forecast_df.columns:
+            forecast_df[col] = pd.to_numeric(forecast_df[col], errors="coerce")
+        else:
+            raise KeyError(f"Column '{col}' not found in forecast data.")
+
+    # --- Merge and Calculate ---
+    # actual_df["key"] = 1
+    # forecast_df["key"] = 1
+
+    # merged = pd.merge(actual_df, forecast_df, on="key").drop("key", axis=1)
+    # merged["height_diff"] = (merged["geopotential height_m"] - merged["Altitude (m)"]).abs()
+    # min_pairs = merged.loc[merged.groupby("Altitude (m)")["height_diff"].idxmin()]
+
+    # min_pairs["wind speed_kt_actual"] = min_pairs["wind speed_m/s"] * 1.94384
+    # min_pairs["temp_diff"] = (min_pairs["Temperature (°C)"] - min_pairs["temperature_C"]).abs()
+    # min_pairs["wind_diff"] = (min_pairs["Wind Speed (kt)"] - min_pairs["wind speed_kt_actual"]).abs()
+    # if "wind direction_degree" in min_pairs.columns and "Wind Direction" in min_pairs.columns:
+    #     min_pairs["wind_dir_diff"] = min_pairs.apply(
+    #         lambda row: circular_difference(
+    #             float(row["wind direction_degree"]),
+    #             float(row["Wind Direction"])
+    #         ) if pd.notnull(row["wind direction_degree"]) and pd.notnull(row["Wind Direction"]) else np.nan,
+    #         axis=1
+    #     )
+
+    #     wind_dir_threshold = 30
+    #     min_pairs["wind_dir_correct"] = min_pairs["wind_dir_diff"].apply(
+    #         lambda diff: not pd.isnull(diff) and diff <= wind_dir_threshold
+    #     )       
+    #     wind_dir_accuracy = round(min_pairs["wind_dir_correct"].mean() * 100, 2)
+    # else:
+    #     wind_dir_accuracy = None
+
+    # Replaces merge + min_pairs logic
+
+    min_pairs = interpolate_temperature_only(actual_df, forecast_df)
 
 # Wind speed (converted)
-        min_pairs["wind speed_kt_actual"] = min_pairs["actual_wind_speed_m/s"] * 1.94384
+    min_pairs["wind speed_kt_actual"] = min_pairs["actual_wind_speed_m/s"] * 1.94384
 
 # Accuracy calculations
-        min_pairs["temp_diff"] = (min_pairs["Temperature (°C)"] - min_pairs["interp_temperature_C"]).abs()
-        min_pairs["wind_diff"] = (min_pairs["Wind Speed (kt)"] - min_pairs["wind speed_kt_actual"]).abs()
+    min_pairs["temp_diff"] = (min_pairs["Temperature (°C)"] - min_pairs["interp_temperature_C"]).abs()
+    min_pairs["wind_diff"] = (min_pairs["Wind Speed (kt)"] - min_pairs["wind speed_kt_actual"]).abs()
 
 # Wind direction difference (if both columns present)
-        if "Wind Direction" in min_pairs.columns and "actual_wind_direction" in min_pairs.columns:
-            min_pairs["wind_dir_diff"] = min_pairs.apply(
-                lambda row: circular_difference(
-                    float(row["actual_wind_direction"]),
-                    float(row["Wind Direction"])
-                ) if pd.notnull(row["actual_wind_direction"]) and pd.notnull(row["Wind Direction"]) else np.nan,
-                axis=1
-            )
-            min_pairs["wind_dir_correct"] = min_pairs["wind_dir_diff"] <= 30
-            wind_dir_accuracy = round(min_pairs["wind_dir_correct"].mean() * 100, 2)
-        else:
-            wind_dir_accuracy = None
+    if "Wind Direction" in min_pairs.columns and "actual_wind_direction" in min_pairs.columns:
+        min_pairs["wind_dir_diff"] = min_pairs.apply(
+            lambda row: circular_difference(
+                float(row["actual_wind_direction"]),
+                float(row["Wind Direction"])
+            ) if pd.notnull(row["actual_wind_direction"]) and pd.notnull(row["Wind Direction"]) else np.nan,
+            axis=1
+        )
+        min_pairs["wind_dir_correct"] = min_pairs["wind_dir_diff"] <= 30
+        wind_dir_accuracy = round(min_pairs["wind_dir_correct"].mean() * 100, 2)
+    else:
+        wind_dir_accuracy = None
 
 
 
-        min_pairs["temp_correct"] = min_pairs["temp_diff"] <= 2
-        min_pairs["wind_correct"] = min_pairs["wind_diff"] <= 10
+    min_pairs["temp_correct"] = min_pairs["temp_diff"] <= 2
+    min_pairs["wind_correct"] = min_pairs["wind_diff"] <= 10
 
-        temp_accuracy = round(min_pairs["temp_correct"].mean() * 100, 2)
-        wind_accuracy = round(min_pairs["wind_correct"].mean() * 100, 2)
+    temp_accuracy = round(min_pairs["temp_correct"].mean() * 100, 2)
+    wind_accuracy = round(min_pairs["wind_correct"].mean() * 100, 2)
 
 
-        result_csv = os.path.join(UPPER_AIR_DOWNLOADS_DIR, f"upper_air_verification_{station_id}.csv")
-        weather_accuracy_point = process_weather_accuracy_helper(weather, startTime, endTime, icao)
+    return min_pairs, temp_accuracy, wind_accuracy, wind_dir_accuracy
 
-        # Create header information with period and station details
-        with open(result_csv, 'w', newline='', encoding='utf-8') as f:
-            f.write(f"REPORT,")
-            f.write(f"{station_id},")
-            f.write(f"{icao},")
-            # Convert startTime and endTime from YYYYMMDDHHMM to human readable format and merge
-            start_dt = datetime.strptime(startTime, "%Y%m%d%H%M")
-            formatted_start = start_dt.strftime("%d/%m/%Y %H:%M UTC")
-            end_dt = datetime.strptime(endTime, "%Y%m%d%H%M")
-            formatted_end = end_dt.strftime("%d/%m/%Y %H:%M UTC")
-            f.write(f"{formatted_start} to {formatted_end},")
-            f.write("\n")  # Empty line separator
-            
-            # Add accuracy details
-            f.write("\n")  # Empty line
-            f.write(f"Temperature Accuracy, Wind Speed Accuracy, Wind Direction Accuracy, Weather Accuracy\n")
-            f.write(f"{temp_accuracy}, {wind_accuracy}, {wind_dir_accuracy}, {weather_accuracy_point}\n")
-            f.write(",\n")  # Empty line before data
-            f.write(",\n")
-            
-        # Append the actual data to the CSV
-        min_pairs.to_csv(result_csv, mode='a', index=False)
+def run_process_upper_air(params, progress=None):
+    """
+    Verify an upper air forecast for a prepared process_upper_air request.
 
+    The sounding is fetched while the forecast PDF is read, and the METAR
+    reports of the forecast validity while the sounding is compared (see
+    app.utils.stages); metadata.timings gives the seconds of every stage.
 
-        return jsonify({
-            'file_path': result_csv,
-            'temp_accuracy': temp_accuracy,
-            'wind_accuracy': wind_accuracy,
-            'wind_dir_accuracy': wind_dir_accuracy,
-            'weather_accuracy': weather_accuracy_point,
-            'metadata': {
-                'station_id': station_id,
-                'icao': icao,
-                'start_time': formatted_start,
-                'end_time': formatted_end
-            }
-        })
+    Args:
+        params: Dictionary returned by _prepare_process_upper_air
+        progress: Optional callback receiving short progress messages
 
-    except Exception as e:
-        print(f"[ERROR] Exception in process_upper_air: {e}")
-        return jsonify({'error': str(e)}), 500
+    Returns:
+        tuple: (response_data, status_code)
+    """
+    station_id = params["station_id"]
+    datetime_str = params["datetime"]
+    forecast_path = params["forecast_path"]
+    obs_path = params["obs_path"]
+
+    started = time.perf_counter()
+    results, timings = run_stages({
+        "forecast": Stage(lambda: _read_upper_air_forecast(forecast_path, progress)),
+        "sounding": Stage(lambda: _read_upper_air_observations(obs_path, datetime_str, station_id, progress)),
+        "metar": Stage(lambda forecast: _fetch_forecast_metar(forecast, progress), after=("forecast",)),
+        "verification": Stage(
+            lambda forecast, sounding: _verify_upper_air(forecast[0], sounding, progress),
+            after=("forecast", "sounding"),
+        ),
+        "weather": Stage(
+            lambda forecast, metar: process_weather_accuracy_helper(*forecast[1:], metar_path=metar),
+            after=("forecast", "metar"),
+        ),
+    })
+    _, weather, startTime, endTime, icao = results["forecast"]
+    min_pairs, temp_accuracy, wind_accuracy, wind_dir_accuracy = results["verification"]
+    weather_accuracy_point = results["weather"]
+
+    _report_progress(progress, "Writing result file")
+    write_started = time.perf_counter()
+    result_dir = os.path.join(UPPER_AIR_DOWNLOADS_DIR, params["timestamp"])
+    os.makedirs(result_dir, exist_ok=True)
+    result_csv = os.path.join(result_dir, secure_filename(f"upper_air_verification_{station_id}.csv"))
+
+    # Create header information with period and station details
+    with open(result_csv, 'w', newline='', encoding='utf-8') as f:
+        f.write(f"REPORT,")
+        f.write(f"{station_id},")
+        f.write(f"{icao},")
+        # Convert startTime and endTime from YYYYMMDDHHMM to human readable format and merge
+        start_dt = datetime.strptime(startTime, "%Y%m%d%H%M")
+        formatted_start = start_dt.strftime("%d/%m/%Y %H:%M UTC")
+        end_dt = datetime.strptime(endTime, "%Y%m%d%H%M")
+        formatted_end = end_dt.strftime("%d/%m/%Y %H:%M UTC")
+        f.write(f"{formatted_start} to {formatted_end},")
+        f.write("\n")  # Empty line separator
+        
+        # Add accuracy details
+        f.write("\n")  # Empty line
+        f.write(f"Temperature Accuracy, Wind Speed Accuracy, Wind Direction Accuracy, Weather Accuracy\n")
+        f.write(f"{temp_accuracy}, {wind_accuracy}, {wind_dir_accuracy}, {weather_accuracy_point}\n")
+        f.write(",\n")  # Empty line before data
+        f.write(",\n")
+        
+    # Append the actual data to the CSV
+    min_pairs.to_csv(result_csv, mode='a', index=False)
+    get_artifact_store().register("process_upper_air", result_csv, forecast_path, obs_path, *precompress(result_csv))
+    timings["write"] = round(time.perf_counter() - write_started, 3)
+    timings["total"] = round(time.perf_counter() - started, 3)
+    print(f"process_upper_air stage timings: {timings}")
+
+
+    return {
+        'file_path': result_csv,
+        'temp_accuracy': temp_accuracy,
+        'wind_accuracy': wind_accuracy,
+        'wind_dir_accuracy': wind_dir_accuracy,
+        'weather_accuracy': weather_accuracy_point,
+        'metadata': {
+            'station_id': station_id,
+            'icao': icao,
+            'start_time': formatted_start,
+            'end_time': formatted_end,
+            'timings': timings
+        }
+    }, 200
     
 @api_bp.route('download/upper_air_csv')
 def download_upper_air_csv():
     file_path = request.args.get('file_path')
     if file_path and os.path.exists(file_path):
-        return send_file(file_path, as_attachment=True)
+        return _send_artifact(file_path, 'text/csv', os.path.basename(file_path))
     return jsonify({'error': 'File not found'}), 404
\ No newline at end of file
@@ -475,10 +475,7 @@ document.addEventListener('DOMContentLoaded', function () {
 
             // Make API request to process METAR data
             showLoadingSection(); // Show loading before fetch
-            fetch('/api/process_metar', {
-                method: 'POST',
-                body: formData
-            })
+            runJob('/api/process_metar', formData)
                 .then(response => {
                     if (!response.ok) {
                         hideLoadingSection(); // Hide loading on error
@@ -926,10 +923,7 @@ upperAirVerifyBtn.addEventListener('click', function () {
     // Show loading, hide report
     upperAirReportSection.style.display = 'none';
 
-    fetch('/api/process_upper_air', {
-        method: 'POST',
-        body: formData
-    })
+    runJob('/api/process_upper_air', formData)
         .then(response => {
             if (!response.ok) return response.json().then(err => { throw new Error(err.error || 'Failed to process upper air data'); });
             return response.json();
@@ -978,6 +972,35 @@ upperAirVerifyBtn.addEventListener('click', function () {
         });
 });
 
+// Helper function to run a processing request as a background job.
+// Posts the form with async=true, polls the job status and resolves with the
+// job result response, so callers can handle it like a direct fetch.
+function runJob(url, formData, pollInterval = 1000) {
+    formData.append('async', 'true');
+    return fetch(url, {
+        method: 'POST',
+        body: formData
+    }).then(response => {
+        if (response.status !== 202) return response;
+        return response.json().then(job => new Promise((resolve, reject) => {
+            const poll = () => {
+                fetch(job.status_url)
+                    .then(statusResponse => statusResponse.json())
+                    .then(status => {
+                        if (status.status === 'finished' || status.status === 'failed') {
+                            resolve(fetch(job.result_url));
+                        } else {
+                            console.log(`Job ${job.job_id}: ${status.progress}`);
+                            setTimeout(poll, pollInterval);
+                        }
+                    })
+                    .catch(reject);
+            };
+            poll();
+        }));
+    });
+}
+
 // Helper function to populate the verification table
 function populateUpperAirVerificationTable(csvText) {
     const table = document.getElementById('verificationTable');
@@ -0,0 +1,303 @@
+"""
+Artifact store
+
+Uploads, fetched METAR files and result files are written under
+METAR_DATA_DIR and UPPER_AIR_DATA_DIR. Rather than wiping those directories
+on every start, the store keeps them bounded: a background sweep removes the
+files that have not been used for ARTIFACT_MAX_AGE_SECONDS, then the least
+recently used ones while the directories hold more than ARTIFACT_MAX_BYTES.
+
+Files the endpoints write are registered with the request kind that produced
+them, and downloads refresh their last use. Files nobody registered (e.g. from
+an older version) are aged by their modification time.
+
+Metadata is kept in a small SQLite database, so several server processes can
+share the directories: each runs a sweeper thread, but a lease row lets only
+one of them sweep at a time, and at most once per interval.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from app.config import (
+    ARTIFACT_DB_PATH,
+    ARTIFACT_MAX_AGE_SECONDS,
+    ARTIFACT_MAX_BYTES,
+    ARTIFACT_MIN_AGE_SECONDS,
+    ARTIFACT_SWEEP_INTERVAL_SECONDS,
+    METAR_DATA_DIR,
+    UPPER_AIR_DATA_DIR,
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS artifacts (
+    path TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    bytes INTEGER NOT NULL,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sweeps (
+    name TEXT PRIMARY KEY,
+    holder TEXT,
+    expires REAL NOT NULL,
+    started REAL,
+    finished REAL,
+    removed INTEGER,
+    freed INTEGER,
+    files INTEGER,
+    bytes INTEGER
+);
+"""
+
+# A sweeper that dies mid-sweep holds the lease this long at most
+_LEASE_SECONDS = 900
+
+
+class ArtifactStore:
+    """
+    Registry of generated files with age and size based retention.
+    """
+
+    def __init__(self, roots: Optional[List[str]] = None, path: str = ARTIFACT_DB_PATH,
+                 max_age: int = ARTIFACT_MAX_AGE_SECONDS, max_bytes: int = ARTIFACT_MAX_BYTES,
+                 min_age: int = ARTIFACT_MIN_AGE_SECONDS, interval: int = ARTIFACT_SWEEP_INTERVAL_SECONDS):
+        """
+        Args:
+            roots: Directories kept bounded (default: METAR_DATA_DIR and UPPER_AIR_DATA_DIR);
+                   the roots and their direct subdirectories are never removed
+            path: SQLite database of the artifact metadata
+            max_age: Seconds since its last use after which a file is removed
+            max_bytes: Total size of the files before the least recently used ones are removed
+            min_age: Files used more recently than this are never removed for size,
+                     so results are not swept while they are being written or served
+            interval: Seconds between sweeps; 0 disables the background sweeper
+        """
+        self.roots = [os.path.abspath(root) for root in (roots or [METAR_DATA_DIR, UPPER_AIR_DATA_DIR])]
+        self.path = path
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.min_age = min_age
+        self.interval = interval
+        self._holder = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+            conn.execute("INSERT OR IGNORE INTO sweeps (name, expires) VALUES ('retention', 0)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _managed(self, path: str) -> bool:
+        """True if path is a file under one of the roots."""
+        path = os.path.abspath(path)
+        return os.path.isfile(path) and any(path.startswith(root + os.sep) for root in self.roots)
+
+    def register(self, kind: str, *paths: Optional[str]) -> None:
+        """
+        Record files just written by a request; None, missing files and files
+        outside the roots are skipped.
+
+        Args:
+            kind: What produced the files, e.g. "process_metar"
+            paths: Files to register
+        """
+        now = time.time()
+        rows = []
+        for path in paths:
+            if path and self._managed(path):
+                rows.append((os.path.abspath(path), kind, os.path.getsize(path), now, now))
+        if not rows:
+            return
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO artifacts (path, kind, bytes, created, last_used) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def touch(self, path: str) -> None:
+        """
+        Mark a file as used now (e.g. downloaded); an unregistered file is registered.
+        """
+        if not self._managed(path):
+            return
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO artifacts (path, kind, bytes, created, last_used) VALUES (?, 'download', ?, ?, ?) "
+                "ON CONFLICT(path) DO UPDATE SET last_used = excluded.last_used, bytes = excluded.bytes",
+                (os.path.abspath(path), os.path.getsize(path), now, now),
+            )
+
+    def _acquire(self, now: float, force: bool) -> bool:
+        """Take the sweep lease unless another process holds it or swept less than an interval ago."""
+        swept_before = now if force else now - self.interval
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE sweeps SET holder = ?, expires = ?, started = ? "
+                "WHERE name = 'retention' AND expires < ? AND (finished IS NULL OR finished <= ?)",
+                (self._holder, now + _LEASE_SECONDS, now, now, swept_before),
+            )
+            return cursor.rowcount == 1
+
+    def _scan(self, last_used: Dict[str, float]):
+        """
+        List (last use, size, path) of every file under the roots, and the
+        (path, modification time) of their subdirectories, deepest first.
+        """
+        files, directories = [], []
+        for root in self.roots:
+            for dirpath, _, filenames in os.walk(root, topdown=False):
+                if dirpath != root and os.path.dirname(dirpath) != root:
+                    try:
+                        directories.append((dirpath, os.path.getmtime(dirpath)))
+                    except FileNotFoundError:
+                        continue
+                for name in filenames:
+                    path = os.path.join(dirpath, name)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    files.append((max(last_used.get(path, 0), stat.st_mtime), stat.st_size, path))
+        return files, directories
+
+    def sweep(self, force: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Remove expired files, then the least recently used ones above max_bytes.
+
+        Args:
+            force: Sweep even if another process swept less than an interval ago
+                   (a sweep in progress elsewhere is still waited for)
+
+        Returns:
+            dict: Files removed and freed bytes, and the files and bytes left;
+                  None if another process holds the sweep lease
+        """
+        now = time.time()
+        if not self._acquire(now, force):
+            return None
+        removed = freed = 0
+        try:
+            with self._connect() as conn:
+                last_used = dict(conn.execute("SELECT path, last_used FROM artifacts"))
+            files, directories = self._scan(last_used)
+            files.sort()
+            total = sum(size for _, size, _ in files)
+
+            expired = []
+            for used, size, path in files:
+                if used < now - self.max_age or (total > self.max_bytes and used < now - self.min_age):
+                    expired.append(path)
+                    total -= size
+            for path in expired:
+                try:
+                    freed += os.path.getsize(path)
+                    os.remove(path)
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+
+            # Request folders left empty, unless they changed recently and may be in use
+            for directory, modified in directories:
+                if modified < now - self.min_age:
+                    try:
+                        os.rmdir(directory)
+                    except OSError:
+                        pass
+
+            remaining = {path for _, _, path in files} - set(expired)
+            stats = {"removed": removed, "freed": freed, "files": len(remaining), "bytes": total}
+            with self._connect() as conn:
+                # Forget files that were swept, or removed by someone else
+                conn.executemany(
+                    "DELETE FROM artifacts WHERE path = ?",
+                    [(path,) for path in last_used if path not in remaining],
+                )
+                conn.execute(
+                    "UPDATE sweeps SET finished = ?, removed = ?, freed = ?, files = ?, bytes = ? "
+                    "WHERE name = 'retention'",
+                    (time.time(), removed, freed, len(remaining), total),
+                )
+            if removed:
+                print(f"Artifact sweep removed {removed} file(s), {freed / 1e6:.1f} MB")
+            return stats
+        finally:
+            with self._connect() as conn:
+                conn.execute(
+                    "UPDATE sweeps SET holder = NULL, expires = 0 WHERE name = 'retention' AND holder = ?",
+                    (self._holder,),
+                )
+
+    def start(self) -> None:
+        """
+        Start the background sweeper thread of this process (once).
+        """
+        with self._lock:
+            if self._thread is not None or self.interval <= 0:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="artifact-sweeper", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background sweeper thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"Error in artifact sweep: {e}")
+            self._stop.wait(self.interval)
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Return the registered files per kind, the last sweep and the retention limits.
+        """
+        with self._connect() as conn:
+            kinds = {
+                kind: {"files": files, "bytes": size}
+                for kind, files, size in conn.execute(
+                    "SELECT kind, COUNT(*), COALESCE(SUM(bytes), 0) FROM artifacts GROUP BY kind"
+                )
+            }
+            conn.row_factory = sqlite3.Row
+            sweep = conn.execute(
+                "SELECT started, finished, removed, freed, files, bytes FROM sweeps WHERE name = 'retention'"
+            ).fetchone()
+        return {
+            "registered": kinds,
+            "last_sweep": dict(sweep) if sweep["finished"] is not None else None,
+            "max_age_seconds": self.max_age,
+            "max_bytes": self.max_bytes,
+            "sweep_interval_seconds": self.interval,
+        }
+
+
+_store: Optional[ArtifactStore] = None
+_store_lock = threading.Lock()
+
+
+def get_artifact_store() -> ArtifactStore:
+    """
+    Return the artifact store shared by the whole process.
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ArtifactStore()
+        return _store
@@ -0,0 +1,307 @@
+"""
+Result artifacts
+
+The decoded METAR, merged and comparison results of process_metar are
+written as CSV, or as Parquet/Feather (Arrow) files when their name ends in
+.parquet or .feather and pyarrow is installed. Columnar artifacts keep the
+column types and can be memory-mapped by later analysis; the CSV of such an
+artifact is only written when it is first asked for (see ensure_csv).
+
+Artifacts are written a chunk at a time, so the pipeline stages can stream
+their output whatever the format.
+
+Text artifacts are also compressed once, right after they are written, into
+.gz (and .br with the brotli package) files beside them, so downloads can be
+served compressed without compressing on every request (see precompress).
+"""
+
+import gzip
+import io
+import os
+import shutil
+import tempfile
+from typing import Any, List, Optional, Tuple
+
+import pandas as pd
+
+from app.config import ARTIFACT_FORMAT
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional; artifacts are then always CSV
+    pa = None
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; downloads are then gzip compressed only
+    brotli = None
+
+# File extension of each artifact format
+ARTIFACT_EXTENSIONS = {"csv": ".csv", "parquet": ".parquet", "feather": ".feather"}
+
+# Content-Encoding and file suffix of the precompressed variants, preferred first
+COMPRESSED_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+# Smaller files are not worth a compressed variant
+PRECOMPRESS_MIN_BYTES = 1024
+
+# Schema metadata of columnar artifacts, used to write their CSV
+_PREAMBLE_KEY = b"csv_preamble"
+_NA_REP_KEY = b"csv_na_rep"
+
+
+def columnar_available() -> bool:
+    """True if pyarrow is installed, so Parquet/Feather artifacts can be written."""
+    return pa is not None
+
+
+def artifact_format(path: str) -> str:
+    """
+    Format of an artifact from its file extension: "parquet", "feather" or "csv".
+    """
+    extension = os.path.splitext(path)[1].lower()
+    for fmt, fmt_extension in ARTIFACT_EXTENSIONS.items():
+        if extension == fmt_extension:
+            return fmt
+    return "csv"
+
+
+def artifact_path(csv_path: str, fmt: Optional[str] = None) -> str:
+    """
+    Path of the artifact to write in place of csv_path.
+
+    Args:
+        csv_path: Path the CSV would have
+        fmt: "csv", "parquet" or "feather" (default: config.ARTIFACT_FORMAT);
+             CSV is used if pyarrow is not installed
+
+    Returns:
+        str: csv_path with the extension of the format
+    """
+    fmt = (fmt or ARTIFACT_FORMAT).lower()
+    if fmt not in ARTIFACT_EXTENSIONS:
+        raise ValueError(f"Unknown artifact format '{fmt}', expected one of {sorted(ARTIFACT_EXTENSIONS)}")
+    if fmt != "csv" and not columnar_available():
+        print(f"pyarrow is not installed, writing {os.path.basename(csv_path)} as CSV instead of {fmt}")
+        fmt = "csv"
+    return os.path.splitext(csv_path)[0] + ARTIFACT_EXTENSIONS[fmt]
+
+
+def _arrow_table(frame: pd.DataFrame, schema=None):
+    """
+    Convert a chunk to an Arrow table, with the schema of the first chunk.
+
+    Object columns are stored as text, since their Python values may differ
+    in type from row to row (e.g. 270 and "N/A"); categoricals get int32
+    dictionary indices so that every chunk fits the same schema.
+    """
+    frame = frame.copy(deep=False)
+    for name in frame.columns:
+        column = frame[name]
+        if column.dtype == object:
+            frame[name] = column.astype(str).where(column.notna(), None)
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    if schema is None:
+        fields = []
+        for field in table.schema:
+            if pa.types.is_dictionary(field.type):
+                value_type = pa.string() if pa.types.is_null(field.type.value_type) else field.type.value_type
+                field = field.with_type(pa.dictionary(pa.int32(), value_type))
+            elif pa.types.is_null(field.type):
+                field = field.with_type(pa.string())
+            fields.append(field)
+        schema = pa.schema(fields, metadata=table.schema.metadata)
+    return table.cast(schema).replace_schema_metadata(schema.metadata)
+
+
+class ArtifactWriter:
+    """
+    Writes a frame to an artifact one chunk at a time.
+
+    The format follows the file extension (see artifact_format). Columnar
+    artifacts keep the CSV preamble and missing value text in their metadata,
+    so that ensure_csv writes the same CSV as the CSV format would.
+    """
+
+    def __init__(self, path: str, na_rep: str = "", preamble: Optional[str] = None):
+        """
+        Args:
+            path: Artifact to (over)write
+            na_rep: Text of missing values in the CSV
+            preamble: Text written before the CSV header (e.g. a report title line)
+        """
+        self.path = path
+        self.format = artifact_format(path)
+        self.na_rep = na_rep
+        self.preamble = preamble
+        self.rows = 0
+        self._writer = None
+        self._schema = None
+        if self.format != "csv" and not columnar_available():
+            raise RuntimeError(f"pyarrow is required to write {path}")
+
+    def write(self, frame: pd.DataFrame) -> None:
+        """Append a chunk; the first chunk decides the columns."""
+        if self.format == "csv":
+            header = self._writer is None
+            if header:
+                self._writer = open(self.path, "w", newline="", encoding="utf-8")
+                self._writer.write(self.preamble or "")
+            frame.to_csv(self._writer, header=header, index=False, na_rep=self.na_rep)
+        else:
+            table = _arrow_table(frame, self._schema)
+            if self._writer is None:
+                metadata = dict(table.schema.metadata or {})
+                metadata[_PREAMBLE_KEY] = (self.preamble or "").encode()
+                metadata[_NA_REP_KEY] = self.na_rep.encode()
+                self._schema = table.schema.with_metadata(metadata)
+                table = table.replace_schema_metadata(metadata)
+                if self.format == "parquet":
+                    self._writer = pq.ParquetWriter(self.path, self._schema)
+                else:
+                    # Uncompressed, so readers can memory-map it without copying
+                    self._writer = pa.ipc.new_file(self.path, self._schema)
+            self._writer.write_table(table)
+        self.rows += len(frame)
+
+    def close(self) -> None:
+        """Finish the file."""
+        if self._writer is not None:
+            self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def write_artifact(frame: pd.DataFrame, path: str, na_rep: str = "", preamble: Optional[str] = None) -> str:
+    """
+    Write a whole frame as an artifact and return its path.
+    """
+    with ArtifactWriter(path, na_rep=na_rep, preamble=preamble) as writer:
+        writer.write(frame)
+    return path
+
+
+def _write_atomic(path: str, write) -> None:
+    """Write a file under a temporary name, so concurrent readers never see half of it."""
+    fd, temp_path = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(path) or ".")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+def _compress(path: str, encoding: str, target) -> None:
+    with open(path, "rb") as source:
+        if encoding == "gzip":
+            # mtime=0 so the same text always compresses to the same bytes
+            with gzip.GzipFile(fileobj=target, mode="wb", compresslevel=6, mtime=0) as compressed:
+                shutil.copyfileobj(source, compressed, 1 << 20)
+        else:
+            compressor = brotli.Compressor(quality=9)
+            for chunk in iter(lambda: source.read(1 << 20), b""):
+                target.write(compressor.process(chunk))
+            target.write(compressor.finish())
+
+
+def precompress(path: str) -> List[str]:
+    """
+    Write the compressed variants of a text artifact (CSV or METAR text).
+
+    Columnar artifacts are skipped; their CSV is compressed when ensure_csv
+    writes it. So are files under PRECOMPRESS_MIN_BYTES.
+
+    Args:
+        path: File to compress
+
+    Returns:
+        list: Paths of the variants written (path + ".gz", and path + ".br" with brotli)
+    """
+    if artifact_format(path) != "csv" or os.path.getsize(path) < PRECOMPRESS_MIN_BYTES:
+        return []
+    variants = []
+    for encoding, suffix in COMPRESSED_SUFFIXES.items():
+        if encoding == "br" and brotli is None:
+            continue
+        _write_atomic(path + suffix, lambda target: _compress(path, encoding, target))
+        variants.append(path + suffix)
+    return variants
+
+
+def compressed_variant(path: str, accept: Any) -> Tuple[str, Optional[str]]:
+    """
+    Choose the file to send for a download of path.
+
+    Args:
+        path: Requested file
+        accept: Quality of each content coding the client accepts, e.g.
+                request.accept_encodings
+
+    Returns:
+        tuple: (path of a precompressed variant, its Content-Encoding), or
+               (path, None) if the client accepts none that is up to date
+    """
+    modified = os.path.getmtime(path)
+    for encoding, suffix in COMPRESSED_SUFFIXES.items():
+        variant = path + suffix
+        if accept[encoding] and os.path.exists(variant) and os.path.getmtime(variant) >= modified:
+            return variant, encoding
+    return path, None
+
+
+def _read_table(path: str):
+    if artifact_format(path) == "parquet":
+        return pq.read_table(path, memory_map=True)
+    return feather.read_table(path, memory_map=True)
+
+
+def read_artifact(path: str) -> pd.DataFrame:
+    """
+    Read an artifact; Parquet and Feather files are memory-mapped.
+
+    A CSV preamble line (as in the comparison CSV) is skipped.
+    """
+    if artifact_format(path) == "csv":
+        with open(path, encoding="utf-8") as f:
+            first_line = f.readline()
+        skiprows = 1 if first_line.startswith("REPORT,") else 0
+        return pd.read_csv(path, skiprows=skiprows)
+    return _read_table(path).to_pandas()
+
+
+def ensure_csv(path: str) -> str:
+    """
+    Return the CSV of an artifact, writing it next to a columnar artifact on first use.
+
+    Args:
+        path: Artifact path
+
+    Returns:
+        str: path itself for a CSV artifact, otherwise the .csv file beside it
+    """
+    if artifact_format(path) == "csv":
+        return path
+    csv_path = os.path.splitext(path)[0] + ".csv"
+    if os.path.exists(csv_path) and os.path.getmtime(csv_path) >= os.path.getmtime(path):
+        return csv_path
+
+    table = _read_table(path)
+    metadata = table.schema.metadata or {}
+
+    def write(f):
+        text = io.TextIOWrapper(f, newline="", encoding="utf-8")
+        text.write(metadata.get(_PREAMBLE_KEY, b"").decode())
+        table.to_pandas().to_csv(text, index=False, na_rep=metadata.get(_NA_REP_KEY, b"").decode())
+        text.detach()
+
+    # Written under a temporary name so concurrent downloads never see half a file
+    _write_atomic(csv_path, write)
+    precompress(csv_path)
+    return csv_path
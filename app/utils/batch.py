@@ -0,0 +1,310 @@
+"""
+Batch verification
+
+Verifies the forecasts of several aerodromes in one run. METAR reports are
+fetched concurrently, and each station is decoded and compared in a worker
+process, so the run takes about as long as the slowest stations on the
+available cores rather than the sum of all stations.
+
+Command line usage:
+    python -m app.utils.batch --start 202309010000 --end 202309302330 \\
+        --station VABB=forecasts/VABB_01092023.txt --station VIDP=forecasts/VIDP_01092023.txt
+    python -m app.utils.batch --zip september.zip --start 202309010000 --end 202309302330
+"""
+
+import argparse
+import os
+import re
+import shutil
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import pandas as pd
+from werkzeug.utils import secure_filename
+
+from app.config import BATCH_FETCH_WORKERS, BATCH_WORKERS, METAR_DATA_DIR
+from app.utils.metar import (
+    compare_weather_data_chunked,
+    decode_metar_to_csv,
+    extract_data_from_file_with_day_and_wind,
+    extract_day_month_year_from_filename,
+)
+from app.utils.ogimet import OgimetAPI
+
+# Columns of the consolidated batch report
+BATCH_SUMMARY_COLUMNS = [
+    "ICAO", "Status", "Comparisons", "Wind Direction", "Wind Speed",
+    "Temperature", "QNH", "Overall", "Error",
+]
+
+_ICAO_RE = re.compile(r"^([A-Za-z]{4})(?:[_\-. ]|$)")
+_OBSERVATION_NAME_RE = re.compile(r"observation|metar", re.IGNORECASE)
+
+
+def stations_from_zip(zip_path: str, extract_dir: str) -> List[Dict[str, Any]]:
+    """
+    Read the (ICAO, forecast file) pairs of a batch from a zip archive.
+
+    Files are grouped by station either by folder (VABB/forecast_01092023.txt)
+    or by a filename prefix (VABB_forecast_01092023.txt). A file whose name
+    contains "observation" or "metar" is used as that station's observations
+    instead of fetching them from OGIMET.
+
+    Args:
+        zip_path: Path to the zip archive
+        extract_dir: Directory the files are extracted to
+
+    Returns:
+        List of station dictionaries for run_batch
+
+    Raises:
+        ValueError: If a station has no forecast file or the archive holds no station
+    """
+    stations: Dict[str, Dict[str, Any]] = {}
+    with zipfile.ZipFile(zip_path) as archive:
+        for entry in archive.infolist():
+            if entry.is_dir():
+                continue
+            parts = [part for part in entry.filename.replace("\\", "/").split("/") if part]
+            name = parts[-1]
+            if name.startswith(".") or "__MACOSX" in parts:
+                continue
+
+            match = None
+            for part in reversed(parts):
+                match = _ICAO_RE.match(part)
+                if match:
+                    break
+            if not match:
+                print(f"[WARN] Skipping {entry.filename}: no ICAO code in its name or folder")
+                continue
+            icao = match.group(1).upper()
+
+            station = stations.setdefault(icao, {"icao": icao, "forecast_path": None, "metar_path": None})
+            station_dir = os.path.join(extract_dir, icao)
+            os.makedirs(station_dir, exist_ok=True)
+            path = os.path.join(station_dir, secure_filename(name))
+            with archive.open(entry) as src, open(path, "wb") as dst:
+                shutil.copyfileobj(src, dst)
+
+            key = "metar_path" if _OBSERVATION_NAME_RE.search(name) else "forecast_path"
+            if station[key]:
+                raise ValueError(f"Station {icao} has more than one {key.split('_')[0]} file in the archive.")
+            station[key] = path
+
+    if not stations:
+        raise ValueError("No station files found in the archive.")
+    for station in stations.values():
+        if not station["forecast_path"]:
+            raise ValueError(f"No forecast file for station {station['icao']} in the archive.")
+    return list(stations.values())
+
+
+def _fetch_station(station: Dict[str, Any], start_date: str, end_date: str) -> Dict[str, Any]:
+    """Fetch the METAR reports of one station and return the station with metar_path set."""
+    metar_path = OgimetAPI().save_metar_to_file(begin=start_date, end=end_date, icao=station["icao"])
+    return {**station, "metar_path": metar_path}
+
+
+def _failed_station(icao: str, error: str) -> Dict[str, Any]:
+    return {"icao": icao, "status": "error", "error": error, "files": {}}
+
+
+def verify_station(station: Dict[str, Any], output_dir: str) -> Dict[str, Any]:
+    """
+    Decode, compare and write the result files of one station.
+
+    Runs in a worker process, so it only takes and returns plain data.
+
+    Args:
+        station: Dictionary with icao, forecast_path and metar_path, and optionally month and year
+        output_dir: Directory for the decoded, comparison and merged CSV files
+
+    Returns:
+        Dictionary with the station status, accuracy summary and file paths
+    """
+    icao = station["icao"]
+    try:
+        _, forecast_month, forecast_year, _ = extract_day_month_year_from_filename(
+            os.path.basename(station["forecast_path"])
+        )
+        metar_csv_path = os.path.join(output_dir, secure_filename(f"decoded_metar_{icao}.csv"))
+        df_metar = decode_metar_to_csv(
+            station["metar_path"],
+            metar_csv_path,
+            month=station.get("month") or forecast_month,
+            year=station.get("year") or forecast_year,
+            icao=icao,
+        )
+        if df_metar is None:
+            return _failed_station(icao, "Could not decode the METAR reports.")
+
+        df_forecast = extract_data_from_file_with_day_and_wind(station["forecast_path"])
+        merged_csv_path = os.path.join(output_dir, secure_filename(f"merged_{icao}.csv"))
+        comparison_df, merged_stats = compare_weather_data_chunked(df_metar, df_forecast, merged_csv_path)
+        if comparison_df.empty:
+            return _failed_station(icao, "No matching observation and forecast times.")
+
+        comparison_csv_path = os.path.join(output_dir, secure_filename(f"comparison_{icao}.csv"))
+        comparison_df.to_csv(comparison_csv_path, index=False)
+
+        whole_month = comparison_df[comparison_df["DAY"] == "Whole Month"].iloc[0]
+        return {
+            "icao": icao,
+            "status": "success",
+            "error": None,
+            "total_comparisons": merged_stats["rows"],
+            "accurate_predictions": merged_stats["accurate"],
+            "accuracy": {
+                label: whole_month[label]
+                for label in ["Wind Direction", "Wind Speed", "Temperature", "QNH", "Overall"]
+            },
+            "decode_stats": df_metar.attrs.get("decode_stats"),
+            "files": {
+                "metar_file": station["metar_path"],
+                "metar_csv": metar_csv_path,
+                "comparison_csv": comparison_csv_path,
+                "merged_csv": merged_csv_path,
+            },
+        }
+    except Exception as e:
+        print(f"Error verifying station {icao}: {e}")
+        return _failed_station(icao, str(e))
+
+
+def write_batch_summary(results: List[Dict[str, Any]], summary_path: str) -> pd.DataFrame:
+    """
+    Write the consolidated report with one row per station.
+
+    Returns:
+        pd.DataFrame: The report as written (columns in BATCH_SUMMARY_COLUMNS order)
+    """
+    rows = []
+    for result in results:
+        accuracy = result.get("accuracy") or {}
+        rows.append({
+            "ICAO": result["icao"],
+            "Status": result["status"],
+            "Comparisons": result.get("total_comparisons", 0),
+            **{label: accuracy.get(label, "") for label in BATCH_SUMMARY_COLUMNS[3:8]},
+            "Error": result.get("error") or "",
+        })
+    summary_df = pd.DataFrame(rows, columns=BATCH_SUMMARY_COLUMNS)
+    summary_df.to_csv(summary_path, index=False)
+    return summary_df
+
+
+def run_batch(stations: List[Dict[str, Any]], start_date: Optional[str] = None, end_date: Optional[str] = None,
+              output_dir: Optional[str] = None, max_workers: Optional[int] = BATCH_WORKERS,
+              fetch_workers: int = BATCH_FETCH_WORKERS,
+              progress: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+    """
+    Verify the forecasts of several stations concurrently.
+
+    Stations without a metar_path are fetched from OGIMET on a thread pool;
+    every station is then verified by verify_station on a process pool as soon
+    as its observations are available.
+
+    Args:
+        stations: Dictionaries with icao, forecast_path and optionally metar_path, month and year
+        start_date: Start of the METAR range (YYYYMMDDHHMM), needed for stations without observations
+        end_date: End of the METAR range (YYYYMMDDHHMM)
+        output_dir: Directory for the result files (default: a new folder under METAR_DATA_DIR/downloads)
+        max_workers: Number of worker processes (default: number of CPUs)
+        fetch_workers: Number of concurrent OGIMET fetches
+        progress: Optional callback receiving short progress messages
+
+    Returns:
+        Dictionary with per-station results (in input order), the summary CSV path and counts
+    """
+    if output_dir is None:
+        timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
+        output_dir = os.path.join(METAR_DATA_DIR, "downloads", f"batch_{timestamp}")
+    os.makedirs(output_dir, exist_ok=True)
+
+    def report(message):
+        print(f"[INFO] {message}")
+        if progress:
+            progress(message)
+
+    results: List[Optional[Dict[str, Any]]] = [None] * len(stations)
+    done = 0
+    with ProcessPoolExecutor(max_workers=max_workers) as pool, \
+            ThreadPoolExecutor(max_workers=fetch_workers, thread_name_prefix="batch-fetch") as fetcher:
+        verifications = {}
+        fetches = {}
+        for index, station in enumerate(stations):
+            if station.get("metar_path"):
+                verifications[pool.submit(verify_station, station, output_dir)] = index
+            elif start_date and end_date:
+                fetches[fetcher.submit(_fetch_station, station, start_date, end_date)] = index
+            else:
+                results[index] = _failed_station(station["icao"], "No observation file and no date range to fetch METAR data.")
+
+        report(f"Fetching METAR data for {len(fetches)} station(s)")
+        for future in as_completed(fetches):
+            index = fetches[future]
+            try:
+                station = future.result()
+            except Exception as e:
+                results[index] = _failed_station(stations[index]["icao"], f"METAR fetch failed: {e}")
+                continue
+            verifications[pool.submit(verify_station, station, output_dir)] = index
+
+        for future in as_completed(verifications):
+            index = verifications[future]
+            try:
+                results[index] = future.result()
+            except Exception as e:
+                results[index] = _failed_station(stations[index]["icao"], str(e))
+            done += 1
+            report(f"Verified {done} of {len(verifications)} station(s)")
+
+    summary_path = os.path.join(output_dir, "batch_summary.csv")
+    write_batch_summary(results, summary_path)
+    succeeded = sum(1 for result in results if result["status"] == "success")
+    return {
+        "stations": results,
+        "summary_csv": summary_path,
+        "output_dir": output_dir,
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Verify aerodrome forecasts of several stations at once.")
+    parser.add_argument("--station", action="append", default=[], metavar="ICAO=FORECAST[,OBSERVATIONS]",
+                        help="Station, forecast file and optional METAR observation file (repeatable)")
+    parser.add_argument("--zip", help="Zip archive with one forecast file (and optional observation file) per station")
+    parser.add_argument("--start", help="Start of the METAR range, YYYYMMDDHHMM")
+    parser.add_argument("--end", help="End of the METAR range, YYYYMMDDHHMM")
+    parser.add_argument("--output", help="Output directory (default: a new folder under the METAR downloads)")
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS, help="Number of worker processes")
+    args = parser.parse_args(argv)
+
+    output_dir = args.output or os.path.join(
+        METAR_DATA_DIR, "downloads", f"batch_{datetime.now().strftime('%Y%m%d%H%M%S')}"
+    )
+    stations = []
+    for spec in args.station:
+        icao, _, files = spec.partition("=")
+        forecast_path, _, metar_path = files.partition(",")
+        if not icao or not forecast_path:
+            parser.error(f"Invalid --station value: {spec}")
+        stations.append({"icao": icao.upper(), "forecast_path": forecast_path, "metar_path": metar_path or None})
+    if args.zip:
+        stations.extend(stations_from_zip(args.zip, os.path.join(output_dir, "uploads")))
+    if not stations:
+        parser.error("Give at least one --station or a --zip archive.")
+
+    result = run_batch(stations, args.start, args.end, output_dir=output_dir, max_workers=args.workers)
+    print(pd.read_csv(result["summary_csv"]).fillna("").to_string(index=False))
+    print(f"Results written to {result['output_dir']}")
+    return 0 if result["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
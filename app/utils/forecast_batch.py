@@ -0,0 +1,321 @@
+"""
+Bulk forecast weather verification
+
+Scores the weather of many local forecast PDFs (e.g. a month of daily
+forecasts) in one run. The PDFs are parsed in worker processes, the validity
+periods of each station are merged into as few METAR ranges as possible, and
+each range is fetched from OGIMET once instead of once per PDF. Every range is
+then indexed once (see WeatherIndex) and all the forecasts inside it are
+scored in a worker process. The result is one table with a row per PDF.
+
+Command line usage:
+    python -m app.utils.forecast_batch --dir pdf
+    python -m app.utils.forecast_batch --zip september_forecasts.zip --icao VABB
+"""
+
+import argparse
+import os
+import shutil
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+from werkzeug.utils import secure_filename
+
+from app.config import BATCH_FETCH_WORKERS, BATCH_WORKERS, FORECAST_BATCH_MAX_GAP_HOURS, METAR_DATA_DIR
+from app.utils.forecast_document import load_forecast_document
+from app.utils.ogimet import OgimetAPI, metar_line
+from app.utils.upper_air_weather import score_weather_forecast
+from app.utils.weather_index import WeatherIndex
+
+# Columns of the consolidated forecast weather report
+FORECAST_BATCH_COLUMNS = [
+    "File", "ICAO", "Valid From", "Valid To", "Weather", "Accuracy", "Status", "Error",
+]
+
+
+def forecast_pdfs_from_dir(directory: str) -> List[str]:
+    """
+    Return the forecast PDFs of a directory and its subdirectories, sorted by path.
+    """
+    paths = []
+    for dirpath, _, filenames in os.walk(directory):
+        for name in filenames:
+            if name.lower().endswith(".pdf") and not name.startswith("."):
+                paths.append(os.path.join(dirpath, name))
+    return sorted(paths)
+
+
+def forecast_pdfs_from_zip(zip_path: str, extract_dir: str) -> List[str]:
+    """
+    Extract the forecast PDFs of a zip archive.
+
+    PDFs in different folders of the archive may share a name, so each keeps
+    its folder under extract_dir.
+
+    Returns:
+        List of the extracted PDF paths, in archive order
+
+    Raises:
+        ValueError: If the archive holds no PDF
+    """
+    paths = []
+    with zipfile.ZipFile(zip_path) as archive:
+        for entry in archive.infolist():
+            parts = [part for part in entry.filename.replace("\\", "/").split("/") if part]
+            if entry.is_dir() or not parts or "__MACOSX" in parts:
+                continue
+            if parts[-1].startswith(".") or not parts[-1].lower().endswith(".pdf"):
+                continue
+            folder = os.path.join(extract_dir, *[secure_filename(part) or "_" for part in parts[:-1]])
+            os.makedirs(folder, exist_ok=True)
+            path = os.path.join(folder, secure_filename(parts[-1]))
+            with archive.open(entry) as src, open(path, "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            paths.append(path)
+    if not paths:
+        raise ValueError("No forecast PDF found in the archive.")
+    return paths
+
+
+def read_forecast(path: str, icao: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Read the station, validity and weather of one forecast PDF.
+
+    Runs in a worker process, so it only takes and returns plain data.
+
+    Args:
+        path: Forecast PDF
+        icao: Station of a PDF that does not name one
+
+    Returns:
+        Dictionary with file, icao, start, end (datetimes) and weather, or with
+        status "error" and the error message
+    """
+    forecast = {"file": path, "icao": icao, "start": None, "end": None, "weather": None}
+    try:
+        document = load_forecast_document(path)
+        if document.weather is None:
+            raise ValueError("Weather section not found")
+        if document.valid_from is None or document.valid_to is None:
+            raise ValueError("Date range not found")
+        forecast.update(
+            icao=(document.icao or icao or "").upper() or None,
+            start=document.valid_from,
+            end=document.valid_to,
+            weather=document.weather,
+        )
+        if not forecast["icao"]:
+            raise ValueError("ICAO code not found in PDF")
+        return {**forecast, "status": "success", "error": None}
+    except Exception as e:
+        print(f"Error reading forecast {path}: {e}")
+        return {**forecast, "status": "error", "error": str(e)}
+
+
+def merge_ranges(forecasts: List[Dict[str, Any]],
+                 max_gap: timedelta = timedelta(hours=FORECAST_BATCH_MAX_GAP_HOURS)) -> List[Dict[str, Any]]:
+    """
+    Merge the validity periods of the forecasts into METAR ranges to fetch.
+
+    Periods of the same station are merged when they overlap or are less than
+    max_gap apart, so a month of daily forecasts becomes one range.
+
+    Args:
+        forecasts: Forecasts read by read_forecast (status "success")
+        max_gap: Largest gap between two periods fetched as one range
+
+    Returns:
+        List of dictionaries with icao, start, end and the indexes of the
+        forecasts inside the range, by station and time
+    """
+    ranges: List[Dict[str, Any]] = []
+    order = sorted(range(len(forecasts)), key=lambda i: (forecasts[i]["icao"], forecasts[i]["start"]))
+    for i in order:
+        forecast = forecasts[i]
+        last = ranges[-1] if ranges else None
+        if last and last["icao"] == forecast["icao"] and forecast["start"] - last["end"] <= max_gap:
+            last["end"] = max(last["end"], forecast["end"])
+            last["forecasts"].append(i)
+        else:
+            ranges.append({"icao": forecast["icao"], "start": forecast["start"], "end": forecast["end"],
+                           "forecasts": [i]})
+    return ranges
+
+
+def fetch_range(icao: str, start: datetime, end: datetime, output_dir: str) -> Tuple[str, int]:
+    """
+    Fetch the METAR reports of a range into a file.
+
+    Every line carries its YYYYMMDDHHMM observation time, so reports of a
+    range spanning several months are placed correctly.
+
+    Returns:
+        tuple: (path of the file, number of reports)
+    """
+    rows = OgimetAPI().get_metar(begin=start, end=end, icao=icao)
+    path = os.path.join(output_dir, secure_filename(f"metar_{icao}_{start:%Y%m%d%H%M}_{end:%Y%m%d%H%M}.txt"))
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for row in rows:
+            line = metar_line(row)
+            if line:
+                f.write(f"{line}\n")
+                count += 1
+    return path, count
+
+
+def score_range(metar_path: str, start: datetime, forecasts: List[Dict[str, Any]]) -> List[int]:
+    """
+    Score the weather of forecasts against the METAR reports of their range.
+
+    Runs in a worker process; the reports are indexed once for all the forecasts.
+
+    Returns:
+        List of the accuracy points of the forecasts, in order
+    """
+    index = WeatherIndex.from_file(metar_path, reference=start)
+    return [
+        score_weather_forecast(forecast["weather"], forecast["start"], forecast["end"], index)
+        for forecast in forecasts
+    ]
+
+
+def write_forecast_batch_report(forecasts: List[Dict[str, Any]], report_path: str) -> pd.DataFrame:
+    """
+    Write the consolidated report with one row per forecast PDF.
+
+    Returns:
+        pd.DataFrame: The report as written (columns in FORECAST_BATCH_COLUMNS order)
+    """
+    rows = []
+    for forecast in forecasts:
+        rows.append({
+            "File": os.path.basename(forecast["file"]),
+            "ICAO": forecast["icao"] or "",
+            "Valid From": forecast["start"].strftime("%Y/%m/%d %H:%MUTC") if forecast["start"] else "",
+            "Valid To": forecast["end"].strftime("%Y/%m/%d %H:%MUTC") if forecast["end"] else "",
+            "Weather": forecast["weather"] or "",
+            "Accuracy": forecast.get("accuracy", ""),
+            "Status": forecast["status"],
+            "Error": forecast["error"] or "",
+        })
+    report_df = pd.DataFrame(rows, columns=FORECAST_BATCH_COLUMNS)
+    report_df.to_csv(report_path, index=False)
+    return report_df
+
+
+def run_forecast_batch(paths: List[str], icao: Optional[str] = None, output_dir: Optional[str] = None,
+                       max_workers: Optional[int] = BATCH_WORKERS, fetch_workers: int = BATCH_FETCH_WORKERS,
+                       progress: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+    """
+    Score the weather of many forecast PDFs with one METAR fetch per merged range.
+
+    Args:
+        paths: Forecast PDFs
+        icao: Station of the PDFs that do not name one
+        output_dir: Directory for the METAR files and the report
+                    (default: a new folder under METAR_DATA_DIR/downloads)
+        max_workers: Number of worker processes (default: number of CPUs)
+        fetch_workers: Number of concurrent OGIMET fetches
+        progress: Optional callback receiving short progress messages
+
+    Returns:
+        Dictionary with per-forecast results (in input order), the METAR ranges
+        fetched, the report CSV path, counts and the mean accuracy
+    """
+    if output_dir is None:
+        timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
+        output_dir = os.path.join(METAR_DATA_DIR, "downloads", f"forecast_batch_{timestamp}")
+    os.makedirs(output_dir, exist_ok=True)
+
+    def report(message):
+        print(f"[INFO] {message}")
+        if progress:
+            progress(message)
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool, \
+            ThreadPoolExecutor(max_workers=fetch_workers, thread_name_prefix="forecast-fetch") as fetcher:
+        report(f"Reading {len(paths)} forecast PDF(s)")
+        forecasts = list(pool.map(read_forecast, paths, [icao] * len(paths)))
+        readable = [forecast for forecast in forecasts if forecast["status"] == "success"]
+
+        ranges = merge_ranges(readable)
+        report(f"Fetching METAR data for {len(ranges)} range(s)")
+        fetches = {
+            fetcher.submit(fetch_range, metar_range["icao"], metar_range["start"], metar_range["end"], output_dir):
+                metar_range
+            for metar_range in ranges
+        }
+        scores = {}
+        for future in as_completed(fetches):
+            metar_range = fetches[future]
+            members = [readable[i] for i in metar_range["forecasts"]]
+            try:
+                metar_range["metar_path"], metar_range["reports"] = future.result()
+            except Exception as e:
+                for forecast in members:
+                    forecast.update(status="error", error=f"METAR fetch failed: {e}")
+                continue
+            scores[pool.submit(score_range, metar_range["metar_path"], metar_range["start"], members)] = members
+
+        done = 0
+        for future in as_completed(scores):
+            members = scores[future]
+            try:
+                for forecast, accuracy in zip(members, future.result()):
+                    forecast["accuracy"] = accuracy
+            except Exception as e:
+                for forecast in members:
+                    forecast.update(status="error", error=str(e))
+            done += len(members)
+            report(f"Scored {done} of {len(readable)} forecast(s)")
+
+    report_path = os.path.join(output_dir, "forecast_batch_report.csv")
+    write_forecast_batch_report(forecasts, report_path)
+    scored = [forecast["accuracy"] for forecast in forecasts if forecast["status"] == "success"]
+    return {
+        "forecasts": forecasts,
+        "ranges": [
+            {key: metar_range.get(key) for key in ("icao", "start", "end", "metar_path", "reports")}
+            for metar_range in ranges
+        ],
+        "report_csv": report_path,
+        "output_dir": output_dir,
+        "succeeded": len(scored),
+        "failed": len(forecasts) - len(scored),
+        "mean_accuracy": round(sum(scored) / len(scored), 2) if scored else None,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Verify the weather of many local forecast PDFs at once.")
+    parser.add_argument("--dir", action="append", default=[], help="Directory of forecast PDFs (repeatable)")
+    parser.add_argument("--zip", action="append", default=[], help="Zip archive of forecast PDFs (repeatable)")
+    parser.add_argument("--icao", help="Station of the PDFs that do not name one")
+    parser.add_argument("--output", help="Output directory (default: a new folder under the METAR downloads)")
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS, help="Number of worker processes")
+    args = parser.parse_args(argv)
+
+    output_dir = args.output or os.path.join(
+        METAR_DATA_DIR, "downloads", f"forecast_batch_{datetime.now().strftime('%Y%m%d%H%M%S')}"
+    )
+    paths = []
+    for directory in args.dir:
+        paths.extend(forecast_pdfs_from_dir(directory))
+    for number, zip_path in enumerate(args.zip):
+        paths.extend(forecast_pdfs_from_zip(zip_path, os.path.join(output_dir, "uploads", str(number))))
+    if not paths:
+        parser.error("Give a --dir or --zip with at least one forecast PDF.")
+
+    result = run_forecast_batch(paths, icao=args.icao, output_dir=output_dir, max_workers=args.workers)
+    print(pd.read_csv(result["report_csv"]).fillna("").to_string(index=False))
+    print(f"Mean accuracy: {result['mean_accuracy']}")
+    print(f"Results written to {result['output_dir']}")
+    return 0 if result["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,194 @@
+"""
+Forecast documents
+
+The local forecast PDFs used by the upper air verification ("LOCAL FORECAST
+FOR VABB AND ...") are read into a ForecastDocument once: page text is
+extracted one page at a time and reading stops as soon as every section has
+been found, usually on the first page.
+
+Parsed documents are cached in memory by the SHA-256 of the file, so the same
+PDF uploaded again (or read by several code paths of one request) is not
+extracted again.
+"""
+
+import hashlib
+import io
+import os
+import re
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import IO, Dict, NamedTuple, Optional, Tuple, Union
+
+import pandas as pd
+from PyPDF2 import PdfReader
+
+from app.config import FORECAST_CACHE_ITEMS
+
+UPPER_WIND_COLUMNS = ["Altitude (m)", "Wind Direction", "Wind Speed (kt)", "Temperature (°C)"]
+
+# Sections of the document. Each is a literal, the shortest text and a closing
+# literal, so the first match in the first pages is also the first match in
+# the whole document and reading can stop there.
+_SECTION_RES = {
+    "upper_winds": re.compile(r"UPPER WINDS(.*?)WEATHER", re.DOTALL),
+    "icao": re.compile(r"LOCAL FORECAST FOR(.*?)AND"),
+    "valid_from": re.compile(r"FROM(.*?)UTC", re.DOTALL),
+    "valid_to": re.compile(r"TO(.*?)UTC", re.DOTALL),
+    "weather": re.compile(r"WEATHER(.*?)(?==)", re.DOTALL),
+}
+# Upper wind rows, e.g. "600M 270/15 +25"
+_UPPER_WIND_RE = re.compile(r"(\d+)[Mm]\s+(\d{3})/(\d{2})\s+([+-]?\d{2})")
+
+
+class ForecastDocument(NamedTuple):
+    """
+    Sections of a local forecast PDF; a section missing from the document is None.
+    """
+    icao: Optional[str]
+    valid_from: Optional[datetime]
+    valid_to: Optional[datetime]
+    # Weather group text up to the closing "=", on one line
+    weather: Optional[str]
+    # (altitude m, direction, speed kt, temperature C) rows, highest first;
+    # the values are kept as written in the document
+    upper_winds: Optional[Tuple[Tuple[int, str, str, str], ...]]
+    digest: str
+    pages_read: int
+    page_count: int
+
+    @property
+    def start(self) -> Optional[str]:
+        """Start of the validity as YYYYMMDDHHMM."""
+        return self.valid_from.strftime("%Y%m%d%H%M") if self.valid_from else None
+
+    @property
+    def end(self) -> Optional[str]:
+        """End of the validity as YYYYMMDDHHMM."""
+        return self.valid_to.strftime("%Y%m%d%H%M") if self.valid_to else None
+
+    def upper_winds_frame(self) -> pd.DataFrame:
+        """Upper winds as the forecast table of the upper air verification."""
+        return pd.DataFrame(list(self.upper_winds or ()), columns=UPPER_WIND_COLUMNS)
+
+
+def _parse_datetime(raw: str) -> datetime:
+    raw = raw.strip()
+    try:
+        return datetime.strptime(raw, "%Y/%m/%d %H:%M")
+    except ValueError:
+        raise ValueError(f"Could not parse date/time: '{raw}'")
+
+
+def _parse_sections(reader: PdfReader, digest: str) -> ForecastDocument:
+    found: Dict[str, str] = {}
+    text = ""
+    pages_read = 0
+    for page in reader.pages:
+        text += ("\n" if pages_read else "") + page.extract_text()
+        pages_read += 1
+        for name, pattern in _SECTION_RES.items():
+            if name not in found:
+                match = pattern.search(text)
+                if match:
+                    found[name] = match.group(1)
+        if len(found) == len(_SECTION_RES):
+            break
+
+    upper_winds = None
+    if "upper_winds" in found:
+        rows = [(int(alt), direction, speed, temp)
+                for alt, direction, speed, temp in _UPPER_WIND_RE.findall(found["upper_winds"])]
+        upper_winds = tuple(sorted(rows, reverse=True))
+    weather = found.get("weather")
+    return ForecastDocument(
+        icao=found["icao"].strip() if "icao" in found else None,
+        valid_from=_parse_datetime(found["valid_from"]) if "valid_from" in found else None,
+        valid_to=_parse_datetime(found["valid_to"]) if "valid_to" in found else None,
+        weather=weather.strip().replace("\n", " ") if weather is not None else None,
+        upper_winds=upper_winds,
+        digest=digest,
+        pages_read=pages_read,
+        page_count=len(reader.pages),
+    )
+
+
+class ForecastDocumentCache:
+    """
+    In-memory LRU cache of parsed forecast documents, keyed by content hash.
+    """
+
+    def __init__(self, max_items: int = FORECAST_CACHE_ITEMS):
+        self.max_items = max_items
+        self._documents: "OrderedDict[str, ForecastDocument]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "pages_read": 0, "pages_skipped": 0}
+
+    def load(self, source: Union[str, os.PathLike, bytes, IO[bytes]]) -> ForecastDocument:
+        """
+        Parse a forecast PDF, or return the cached document of the same content.
+
+        Args:
+            source: Path to the PDF, its bytes, or an open binary stream (e.g. an upload)
+
+        Returns:
+            ForecastDocument
+
+        Raises:
+            ValueError: If the validity dates cannot be parsed
+        """
+        if isinstance(source, (str, os.PathLike)):
+            with open(source, "rb") as f:
+                data = f.read()
+        elif isinstance(source, bytes):
+            data = source
+        else:
+            data = source.read()
+        digest = hashlib.sha256(data).hexdigest()
+
+        with self._lock:
+            document = self._documents.get(digest)
+            if document is not None:
+                self._documents.move_to_end(digest)
+                self.stats["hits"] += 1
+                return document
+
+        # Parsed outside the lock; two threads may parse the same new file once each
+        document = _parse_sections(PdfReader(io.BytesIO(data)), digest)
+        with self._lock:
+            self.stats["misses"] += 1
+            self.stats["pages_read"] += document.pages_read
+            self.stats["pages_skipped"] += document.page_count - document.pages_read
+            self._documents[digest] = document
+            while len(self._documents) > self.max_items:
+                self._documents.popitem(last=False)
+        return document
+
+    def metrics(self) -> Dict[str, int]:
+        """
+        Return hit/miss counters, pages extracted and skipped, and the number of cached documents.
+        """
+        with self._lock:
+            return {**self.stats, "documents": len(self._documents), "max_items": self.max_items}
+
+
+_cache: Optional[ForecastDocumentCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_forecast_document_cache() -> ForecastDocumentCache:
+    """
+    Return the forecast document cache shared by the whole process.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ForecastDocumentCache()
+        return _cache
+
+
+def load_forecast_document(source: Union[str, os.PathLike, bytes, IO[bytes]]) -> ForecastDocument:
+    """
+    Parse a forecast PDF through the shared cache (see ForecastDocumentCache.load).
+    """
+    return get_forecast_document_cache().load(source)
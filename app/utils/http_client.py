@@ -0,0 +1,194 @@
+"""
+Shared HTTP client
+
+All upstream fetches (OGIMET, University of Wyoming) go through one pooled
+requests session with timeouts, retries with exponential backoff, a cap on
+concurrent requests per host and simple latency/retry metrics.
+"""
+
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional, Tuple, Union
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from app.config import (
+    HTTP_BACKOFF_FACTOR,
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_MAX_BACKOFF,
+    HTTP_MAX_PER_HOST,
+    HTTP_MAX_RETRIES,
+    HTTP_READ_TIMEOUT,
+)
+
+# Responses worth trying again: rate limited or a temporary upstream failure
+RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+
+def _retry_after_seconds(response: requests.Response) -> Optional[float]:
+    """
+    Return the delay asked for by a Retry-After header, or None if there is none.
+    """
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class HttpClient:
+    """
+    Pooled, retrying HTTP client shared between threads.
+
+    Connections are kept alive and reused per host. At most max_per_host
+    requests to the same host run at once; further callers wait for a slot.
+    A request waiting to be retried gives up its slot until the retry.
+    """
+
+    def __init__(self,
+                 timeout: Tuple[float, float] = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT),
+                 max_retries: int = HTTP_MAX_RETRIES,
+                 backoff_factor: float = HTTP_BACKOFF_FACTOR,
+                 max_backoff: float = HTTP_MAX_BACKOFF,
+                 max_per_host: int = HTTP_MAX_PER_HOST):
+        """
+        Args:
+            timeout: (connect, read) timeout in seconds for each attempt
+            max_retries: Number of retries after the first attempt
+            backoff_factor: Delay before the first retry in seconds, doubled on every retry
+            max_backoff: Upper bound for any delay, including Retry-After
+            max_per_host: Maximum number of concurrent requests per host
+        """
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.max_per_host = max_per_host
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=8, pool_maxsize=max_per_host)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._lock = threading.Lock()
+        self._host_slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._metrics: Dict[str, Dict[str, Any]] = {}
+
+    def _slot(self, host: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(self.max_per_host)
+            return self._host_slots[host]
+
+    def _record(self, host: str, latency: float, retries: int, status: Optional[int]) -> None:
+        with self._lock:
+            stats = self._metrics.setdefault(host, {
+                "requests": 0, "failures": 0, "retries": 0,
+                "total_latency": 0.0, "max_latency": 0.0, "last_status": None,
+            })
+            stats["requests"] += 1
+            stats["retries"] += retries
+            stats["total_latency"] += latency
+            stats["max_latency"] = max(stats["max_latency"], latency)
+            stats["last_status"] = status
+            if status is None or status >= 400:
+                stats["failures"] += 1
+
+    def _backoff(self, attempt: int, response: Optional[requests.Response]) -> float:
+        delay = self.backoff_factor * (2 ** attempt)
+        delay += random.uniform(0, delay / 2)
+        if response is not None:
+            retry_after = _retry_after_seconds(response)
+            if retry_after is not None:
+                delay = max(delay, retry_after)
+        return min(delay, self.max_backoff)
+
+    def get(self, url: str, params: Optional[Dict[str, Any]] = None,
+            timeout: Optional[Union[float, Tuple[float, float]]] = None) -> requests.Response:
+        """
+        GET a URL, retrying connection errors, timeouts and 429/5xx responses.
+
+        Args:
+            url: Full URL to fetch
+            params: Query parameters (optional)
+            timeout: Timeout overriding the client default (optional)
+
+        Returns:
+            The last response received; its status code is not checked
+
+        Raises:
+            requests.RequestException: If every attempt failed without a response
+        """
+        host = urlsplit(url).netloc
+        retries = 0
+        started = time.monotonic()
+        slot = self._slot(host)
+        slot.acquire()
+        try:
+            while True:
+                response, error = None, None
+                try:
+                    response = self.session.get(url, params=params, timeout=timeout or self.timeout)
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    error = e
+
+                retryable = error is not None or response.status_code in RETRY_STATUS_CODES
+                if not retryable or retries >= self.max_retries:
+                    break
+
+                delay = self._backoff(retries, response)
+                print(f"[WARN] GET {host} failed ({error or response.status_code}), retrying in {delay:.1f}s")
+                if response is not None:
+                    response.close()
+                # Backing off can take up to max_backoff; let other requests to the host run meanwhile
+                slot.release()
+                try:
+                    time.sleep(delay)
+                finally:
+                    slot.acquire()
+                retries += 1
+        finally:
+            slot.release()
+
+        self._record(host, time.monotonic() - started, retries, response.status_code if response is not None else None)
+        if error is not None:
+            raise error
+        return response
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Return per-host request counts, failures, retries and latency (seconds).
+        """
+        with self._lock:
+            result = {}
+            for host, stats in self._metrics.items():
+                result[host] = {
+                    **stats,
+                    "avg_latency": stats["total_latency"] / stats["requests"] if stats["requests"] else 0.0,
+                }
+            return result
+
+
+_client: Optional[HttpClient] = None
+_client_lock = threading.Lock()
+
+
+def get_http_client() -> HttpClient:
+    """
+    Return the HTTP client shared by the whole process.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient()
+        return _client
@@ -0,0 +1,195 @@
+"""
+Background jobs
+
+Runs long processing requests on a bounded thread pool so the HTTP request can
+return a job id right away. Job state is kept in a small SQLite database, so
+any worker process sharing the instance directory can answer status requests.
+
+A job only runs in the process that queued it. When a queue starts, the jobs
+left queued or running by a process that is no longer alive (e.g. before a
+restart) are marked as failed, so their clients stop polling. Jobs with the id
+of the starting process are from before a restart too (a container restart
+often gives the server the same process id), so a process should not start
+two queues on the same database.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.config import JOB_DB_PATH, JOB_MAX_PENDING, JOB_RETENTION_SECONDS, JOB_WORKERS
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    progress TEXT,
+    status_code INTEGER,
+    result TEXT,
+    error TEXT,
+    created REAL NOT NULL,
+    started REAL,
+    finished REAL,
+    pid INTEGER
+);
+"""
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+FINISHED = "finished"
+FAILED = "failed"
+
+
+class JobQueueFull(Exception):
+    """Raised when too many jobs are waiting or running in this process."""
+
+
+def _process_alive(pid: Optional[int]) -> bool:
+    """True if a process with this id is running (always False on Windows, where it cannot be probed safely)."""
+    if not pid or os.name == "nt":
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobQueue:
+    """
+    Bounded pool of background jobs.
+
+    A job function is called as func(*args, progress=callback) and returns a
+    (response_data, status_code) tuple, the same shape as a JSON endpoint. The
+    callback stores a short progress message for status requests.
+    """
+
+    def __init__(self, path: str = JOB_DB_PATH, max_workers: int = JOB_WORKERS,
+                 max_pending: int = JOB_MAX_PENDING, retention: int = JOB_RETENTION_SECONDS):
+        self.path = path
+        self.max_pending = max_pending
+        self.retention = retention
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._pending = 0
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+            # Databases of older versions lack the pid column
+            if "pid" not in {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}:
+                conn.execute("ALTER TABLE jobs ADD COLUMN pid INTEGER")
+        self._recover()
+
+    def _recover(self) -> int:
+        """
+        Mark the jobs left queued or running by processes that are gone as failed.
+
+        Returns:
+            int: Number of jobs marked as failed
+        """
+        message = "Interrupted by a restart of the server, please submit the request again"
+        with self._connect() as conn:
+            unfinished = conn.execute(
+                "SELECT id, pid FROM jobs WHERE status IN (?, ?)", (QUEUED, RUNNING)
+            ).fetchall()
+            interrupted = [(job_id,) for job_id, pid in unfinished if pid == os.getpid() or not _process_alive(pid)]
+            conn.executemany(
+                "UPDATE jobs SET status = ?, progress = ?, status_code = ?, result = ?, error = ?, finished = ? "
+                "WHERE id = ?",
+                [(FAILED, "Interrupted", 500, json.dumps({"error": message}), message, time.time(), job_id)
+                 for job_id, in interrupted],
+            )
+        if interrupted:
+            print(f"Marked {len(interrupted)} interrupted job(s) as failed")
+        return len(interrupted)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _update(self, job_id: str, **fields) -> None:
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._connect() as conn:
+            conn.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+
+    def submit(self, kind: str, func: Callable[..., Tuple[Dict[str, Any], int]], *args) -> str:
+        """
+        Queue func(*args, progress=...) and return the new job id.
+
+        Raises:
+            JobQueueFull: If max_pending jobs are already queued or running
+        """
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise JobQueueFull(f"{self._pending} jobs are already in progress")
+            self._pending += 1
+
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "DELETE FROM jobs WHERE finished IS NOT NULL AND finished < ?",
+                (now - self.retention,),
+            )
+            conn.execute(
+                "INSERT INTO jobs (id, kind, status, progress, created, pid) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, kind, QUEUED, "Waiting for a free worker", now, os.getpid()),
+            )
+        self._executor.submit(self._run, job_id, func, args)
+        return job_id
+
+    def _run(self, job_id: str, func: Callable[..., Tuple[Dict[str, Any], int]], args) -> None:
+        self._update(job_id, status=RUNNING, progress="Started", started=time.time())
+        try:
+            data, status_code = func(*args, progress=lambda message: self._update(job_id, progress=message))
+            self._update(
+                job_id,
+                status=FINISHED if status_code < 400 else FAILED,
+                progress="Done",
+                status_code=status_code,
+                result=json.dumps(data),
+                error=data.get("error") if isinstance(data, dict) else None,
+                finished=time.time(),
+            )
+        except Exception as e:
+            print(f"Error in job {job_id}: {e}")
+            traceback.print_exc()
+            self._update(
+                job_id,
+                status=FAILED,
+                progress="Failed",
+                status_code=500,
+                result=json.dumps({"error": f"An error occurred while processing the job: {str(e)}"}),
+                error=str(e),
+                finished=time.time(),
+            )
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the state of a job, or None if it is unknown or has expired.
+
+        The dictionary holds id, kind, status, progress, status_code, result
+        (decoded response data once the job has ended), error and the
+        created/started/finished timestamps.
+        """
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
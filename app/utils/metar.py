@@ -1,78 +1,100 @@
-import metar.Metar as mt
+import numpy as np
 import pandas as pd
 import re
 from datetime import datetime
+import os
+from app.utils.artifacts import ArtifactWriter
+from app.utils.metar_decoder import MetarDecoder, concat_decoded, decoded_frame, utc_minutes
+from app.utils.metar_reader import iter_metar_reports
 
 def clean_metar_inplace(file_path):
     """
     Cleans METAR data by removing trailing '=' characters and newlines.
 
+    The file is rewritten line by line through a temporary file next to it.
+
     Args:
         file_path (str): Path to the METAR file to clean.
     """
-    with open(file_path, "r") as infile:
-        lines = infile.readlines()
-
-    with open(file_path, "w") as outfile:
-        for line in lines:
+    temp_path = f"{file_path}.tmp"
+    with open(file_path, "r") as infile, open(temp_path, "w") as outfile:
+        for line in infile:
             outfile.write(line.rstrip("=\n") + "\n")
+    os.replace(temp_path, file_path)
 
     print("METAR data cleaned in place.")
 
 
-def decode_metar_to_csv(input_file, output_file):
-    try:
-        with open(input_file, "r") as file:
-            metar_text = file.read().strip()
+# Decoded rows buffered before they are appended to the CSV file
+DECODE_CHUNK_SIZE = 10000
 
-        metar_reports = re.split(r"\nMETAR ", metar_text)
-        data_list = []
 
-        for metar_code in metar_reports:
-            metar_code = metar_code.strip()
-            if not metar_code:
-                continue
+def decode_metar_to_csv(input_file, output_file, month=None, year=None, icao=None,
+                        chunk_size=DECODE_CHUNK_SIZE, return_frame=True):
+    """
+    Decodes METAR reports from a text file or stream and saves them as CSV.
 
-            if not metar_code.startswith("METAR"):
-                metar_code = "METAR " + metar_code
+    Reports are read one at a time (see iter_metar_reports) and decoded by the
+    fast regex decoder; those it cannot handle are parsed with python-metar, and
+    reports neither can decode are counted as failures. Decoded rows are written
+    to the output every chunk_size rows. The TIMESTAMP column holds the observation
+    time in UTC minutes since 1970-01-01 (Int64, missing when the month and year
+    of a report are unknown).
 
-            nosig_present = "NOSIG" in metar_code
-            metar_code = metar_code.replace("NOSIG", "")
+    The frame is typed (see metar_decoder.DECODED_DTYPES): numbers are float32
+    with NaN for missing values, and WIND_VRB/WIND_MISSING mark variable and
+    missing wind. Missing values are written to the CSV as "N/A".
 
-            try:
-                report = mt.Metar(metar_code, month=9)
-                # Adjust the observation date safely
-                # corrected_time = adjust_metar_date(report.time.day)
-                # print("corrected_time = ", corrected_time)
-
-                data = {
-                    # "Station": getattr(report, "station", "Mumbai/Chhatrapati Shivaji Intl"),
-                    # "Location": getattr(report, "name", "India 19.07N 072.51E"),
-                    "DAY": report.time.strftime("%d"),
-                    "TIME": f"{report.time.hour:02}{report.time.minute:02}Z",
-                    # "Wind Speed (m/s)": report.wind_speed.value("MPS") if report.wind_speed else "N/A",
-                    "WIND_DIR": report.wind_dir.value() if report.wind_dir else "N/A",
-                    "WIND_SPEED": (
-                        report.wind_speed.value("KT") if report.wind_speed else "N/A"
-                    ),
-                    # "Visibility (m)": report.vis.value() if report.vis else "N/A",
-                    # "Present Weather": report.present_weather() if report.present_weather() else "None",
-                    # "Clouds": report.sky_conditions() if report.sky_conditions() else "No Significant Cloud",
-                    "TEMP": report.temp.value("C") if report.temp else "N/A",
-                    # "Dew-Point Temperature (°C)": report.dewpt.value("C") if report.dewpt else "N/A",
-                    "QNH": report.press.value("hPa") if report.press else "N/A",
-                    # "Significant Change": "No significant change" if nosig_present else metar_code.split()[-1],
-                }
-
-                data_list.append(data)
-
-            except Exception as e:
-                pass
-                # print(f"Error decoding METAR: {e}\nProblematic METAR: {metar_code}")
-
-        df = pd.DataFrame(data_list)
-        df.to_csv(output_file, index=False)
-        # print(df)
+    The output is CSV, or Parquet/Feather if output_file ends in .parquet or
+    .feather (see app.utils.artifacts).
+
+    Args:
+        input_file (str or file): Path to the METAR text file, or an open stream.
+        output_file (str): Path to the CSV (or .parquet/.feather) file to write.
+        month (int): Month of reports without an OGIMET timestamp (default: python-metar's current month).
+        year (int): Year of reports without an OGIMET timestamp (default: python-metar's current year).
+        icao (str): Only decode reports from this station (default: all stations).
+        chunk_size (int): Number of decoded rows written to the CSV at a time.
+        return_frame (bool): Set to False to only write the CSV and keep memory flat.
+
+    Returns:
+        pd.DataFrame: Decoded reports (empty if return_frame is False).
+        df.attrs["decode_stats"] holds the number of reports, how many used the
+        fast path or python-metar, how many failed and how many were from other stations.
+    """
+    try:
+        decoder = MetarDecoder(
+            month=int(month) if month else None,
+            year=int(year) if year else None,
+            icao=icao,
+        )
+        chunks = []
+
+        def write_chunk():
+            chunk = decoded_frame(decoder.take_columns())
+            writer.write(chunk)
+            if return_frame:
+                chunks.append(chunk)
+
+        with ArtifactWriter(output_file, na_rep="N/A") as writer:
+            for report, timestamp in iter_metar_reports(input_file):
+                if timestamp:
+                    decoder.add(report, month=int(timestamp[4:6]), year=int(timestamp[:4]))
+                else:
+                    decoder.add(report)
+                if len(decoder) >= chunk_size:
+                    write_chunk()
+            if not writer.rows or len(decoder):
+                write_chunk()
+
+        df = concat_decoded(chunks)
+        df.attrs["decode_stats"] = decoder.stats
+        stats = decoder.stats
+        print(
+            f"Decoded {stats['fast'] + stats['fallback']} of {stats['reports']} METAR reports "
+            f"({stats['fallback']} via python-metar, {stats['failed']} failed, "
+            f"{stats['other_station']} from other stations skipped)"
+        )
         print(f"Decoded METAR data saved to {output_file}")
         return df
     except Exception as e:
@@ -180,6 +202,9 @@ import os
 def extract_data_from_file_with_day_and_wind(file_path):
     """
     Extracts data from a file, including day (from filename or file content), time, and separated wind direction/speed.
+
+    When the filename gives the month and year, each row also gets a TIMESTAMP
+    in UTC minutes since 1970-01-01, as in the decoded METAR data.
     """
     data = []
 
@@ -216,7 +241,7 @@ def extract_data_from_file_with_day_and_wind(file_path):
                 if match:
                     time, wind_str, temp, qfe, qnh = match.groups()
                     wind_dir, wind_speed = extract_wind_data(wind_str)
-                    data.append({
+                    row = {
                         "DAY": current_day,
                         "MONTH": month_from_name,
                         "YEAR": year_from_name,
@@ -226,7 +251,13 @@ def extract_data_from_file_with_day_and_wind(file_path):
                         "TEMP": int(temp),
                         "QFE": int(qfe),
                         "QNH": int(qnh),
-                    })
+                    }
+                    if month_from_name and year_from_name:
+                        row["TIMESTAMP"] = utc_minutes(
+                            int(year_from_name), int(month_from_name), int(current_day),
+                            int(time[:2]), int(time[2:4]),
+                        )
+                    data.append(row)
 
         return pd.DataFrame(data)
 
@@ -387,264 +418,529 @@ def extract_month_year_from_date(date_str, format_str="%Y%m%d%H%M"):
     except ValueError:
         return None, None, None,None
 
-def compare_weather_data(
-    df1,
-    df2,
+# pandas infer_dtype results for columns holding no strings
+_NUMERIC_KINDS = ("empty", "integer", "floating", "mixed-integer-float", "decimal", "boolean")
+
+
+def _numeric_values(column, integer=False, skip_tokens=("N/A",)):
+    """
+    Converts a METAR/forecast column to floats without touching rows one by one.
+
+    Mirrors the per-value int()/float() parsing of the comparison: values in
+    skip_tokens or NaN/None are missing, strings that int()/float() would reject
+    are invalid, and integer columns are truncated like int().
+
+    Returns:
+        tuple: (values, missing, invalid) as NumPy arrays
+    """
+    missing = column.isna().to_numpy()
+    if column.dtype == object:
+        missing |= column.isin(skip_tokens).to_numpy()
+
+    values = pd.to_numeric(column.where(~missing), errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+    invalid = ~missing & np.isnan(values)
+
+    if integer and column.dtype == object:
+        # int() rejects strings such as "280.0" that to_numeric accepts
+        present = column[~missing]
+        if pd.api.types.infer_dtype(present, skipna=True) not in _NUMERIC_KINDS:
+            not_int = present.map(lambda v: isinstance(v, str)) & ~present.astype(str).str.fullmatch(r"\s*[+-]?\d+\s*")
+            invalid[~missing] |= not_int.to_numpy()
+
+    values = np.where(invalid, np.nan, values)
+    if integer:
+        values = np.trunc(values)
+    return values, missing, invalid
+
+
+def _reason_text(mask, prefix, diffs, fmt, suffix):
+    """
+    Builds '<prefix><diff><suffix>' for rows where mask is set and '' elsewhere.
+    """
+    text = np.full(len(mask), "", dtype=object)
+    if mask.any():
+        text[mask] = [f"{prefix}{diff:{fmt}}{suffix}" for diff in diffs[mask]]
+    return text
+
+
+def _accuracy_flags(
+    merged_df,
     wind_dir_threshold=30,
     wind_speed_threshold=5,
     temp_threshold=1,
     qnh_threshold=1,
 ):
     """
-    Compares weather data from two DataFrames based on matching 'DAY' and 'TIME'.
+    Computes the per-parameter accuracy flags and inaccuracy reasons for a merged
+    METAR/forecast frame using array operations.
 
     Args:
-        df1 (pd.DataFrame): Actual (METAR) data with 'TIME', 'WIND_DIR', 'WIND_SPEED', 'TEMP', 'QNH', and 'DAY'.
-        df2 (pd.DataFrame): Forecast data with 'TIME', 'WIND_DIR', 'WIND_SPEED', 'TEMP', 'QNH', and 'DAY'.
-        wind_dir_threshold (int): Threshold for wind direction accuracy in degrees.
-        wind_speed_threshold (int): Threshold for wind speed accuracy in knots.
-        temp_threshold (int): Threshold for temperature accuracy in °C.
-        qnh_threshold (int): Threshold for QNH accuracy in hPa.
+        merged_df (pd.DataFrame): Output of the DATETIME merge with _actual/_forecast columns.
 
     Returns:
-        pd.DataFrame: Daily accuracy summary with counts in parentheses.
+        tuple: (flags, reasons) where flags maps DIR/SPD/TEMP/QNH_Accurate to boolean
+               arrays and reasons is an object array of "Inaccuracy_Reason" strings.
+    """
+    n = len(merged_df)
+    flags = {}
+    reason_parts = []
+
+    # Wind direction: variable or missing direction counts as accurate
+    actual, a_missing, a_invalid = _numeric_values(
+        merged_df["WIND_DIR_actual"], integer=True, skip_tokens=("N/A", "VRB")
+    )
+    forecast, f_missing, f_invalid = _numeric_values(
+        merged_df["WIND_DIR_forecast"], integer=True, skip_tokens=("N/A", "VRB")
+    )
+    skipped = a_missing | f_missing
+    invalid = ~skipped & (a_invalid | f_invalid)
+    diff = np.abs(forecast - actual)
+    diff = np.minimum(diff, 360 - diff)
+    within = diff <= wind_dir_threshold
+    flags["DIR_Accurate"] = skipped | (~invalid & within)
+    off = ~skipped & ~invalid & ~within
+    text = _reason_text(off, "Wind Direction off by ", diff, ".1f", "°")
+    text[invalid] = "Wind Direction - Invalid data"
+    reason_parts.append(text)
+    if invalid.any():
+        print(f"Warning: Invalid wind direction for {invalid.sum()} DATETIME(s).")
+
+    # Wind speed, temperature and QNH: missing data counts as inaccurate
+    numeric_checks = [
+        ("SPD_Accurate", "WIND_SPEED", True, wind_speed_threshold, "Wind Speed", "Wind Speed off by ", "d", " knots"),
+        ("TEMP_Accurate", "TEMP", False, temp_threshold, "Temperature", "Temperature off by ", ".1f", "°C"),
+        ("QNH_Accurate", "QNH", False, qnh_threshold, "QNH", "QNH off by ", ".1f", " hPa"),
+    ]
+    for flag, column, integer, threshold, label, prefix, fmt, suffix in numeric_checks:
+        actual, a_missing, a_invalid = _numeric_values(merged_df[f"{column}_actual"], integer=integer)
+        forecast, f_missing, f_invalid = _numeric_values(merged_df[f"{column}_forecast"], integer=integer)
+        missing = a_missing | f_missing
+        invalid = ~missing & (a_invalid | f_invalid)
+        diff = np.abs(forecast - actual)
+        within = diff <= threshold
+        flags[flag] = ~missing & ~invalid & within
+        off = ~missing & ~invalid & ~within
+        # Wind speed differences are whole knots, as with int() arithmetic
+        diffs = np.where(off, diff, 0).astype(np.int64) if integer else diff
+        text = _reason_text(off, prefix, diffs, fmt, suffix)
+        text[invalid] = f"{label} - Invalid data"
+        text[missing] = f"{label} - Missing data"
+        reason_parts.append(text)
+        if missing.any():
+            print(f"Warning: Missing {label} data for {missing.sum()} DATETIME(s).")
+        if invalid.any():
+            print(f"Warning: Invalid {label} data for {invalid.sum()} DATETIME(s).")
+
+    reasons = np.full(n, "", dtype=object)
+    for text in reason_parts:
+        has_text = text != ""
+        both = has_text & (reasons != "")
+        reasons = np.where(both, reasons + " | " + text, np.where(has_text, text, reasons))
+    reasons[reasons == ""] = "All Accurate"
+    return flags, reasons
+
+
+def _format_accuracy(correct, total):
+    """
+    Formats an accuracy cell as "<percent>% (<count>)".
+    """
+    correct = np.int64(correct)
+    return f"{round(100 * correct / total, 1)}% ({correct})"
+
+
+# Days of data compared at a time by compare_weather_data_chunked (about a month)
+COMPARE_CHUNK_DAYS = 31
+
+MINUTES_PER_DAY = 1440
+
+_SUMMARY_COLUMNS = {
+    "DIR_Accurate": "Wind Direction",
+    "SPD_Accurate": "Wind Speed",
+    "TEMP_Accurate": "Temperature",
+    "QNH_Accurate": "QNH",
+    "Overall": "Overall",
+}
+
+_ICAO_REQUIREMENTS = {
+    "DAY": "ICAO Requirement",
+    "Wind Direction": "80%",
+    "Wind Speed": "80%",
+    "Temperature": "80%",
+    "QNH": "80%",
+    "Overall": "80%",
+}
+
+
+def _check_frames(df1, df2):
     """
+    Checks the METAR and forecast frames have the columns needed for a comparison.
 
+    Returns:
+        bool: True if they can be compared (the problem is printed otherwise)
+    """
     if not isinstance(df1, pd.DataFrame) or not isinstance(df2, pd.DataFrame):
         print("Error: Input arguments must be Pandas DataFrames.")
-        return pd.DataFrame()
+        return False
 
     required_columns = ["TIME", "WIND_DIR", "WIND_SPEED", "TEMP", "QNH", "DAY"]
-
-    # Check if all required columns are in df1
     if not all(col in df1.columns for col in required_columns):
         missing_cols = [col for col in required_columns if col not in df1.columns]
         print(f"Error: METAR DataFrame is missing columns: {missing_cols}")
-        return pd.DataFrame()
+        return False
 
-    # Check if all required columns except QNH are in df2
+    # QNH may be missing from the forecast if QFE can stand in for it
     forecast_required = ["TIME", "WIND_DIR", "WIND_SPEED", "TEMP", "DAY"]
     if not all(col in df2.columns for col in forecast_required):
         missing_cols = [col for col in forecast_required if col not in df2.columns]
         print(f"Error: Forecast DataFrame is missing columns: {missing_cols}")
-        return pd.DataFrame()
+        return False
 
-    # If QNH is not in df2 but QFE is, use QFE as QNH
-    if "QNH" not in df2.columns and "QFE" in df2.columns:
-        df2["QNH"] = df2["QFE"]
-    elif "QNH" not in df2.columns:
+    if "QNH" not in df2.columns and "QFE" not in df2.columns:
         print(
             "Error: Forecast DataFrame is missing QNH column and no QFE column to substitute."
         )
-        return pd.DataFrame()
+        return False
+    return True
 
-    # Combine DAY and TIME for unique identification
-    df1["DATETIME"] = (
-        df1["DAY"].astype(str).str.zfill(2) + " " + df1["TIME"].astype(str)
-    )
-    df2["DATETIME"] = (
-        df2["DAY"].astype(str).str.zfill(2) + " " + df2["TIME"].astype(str)
-    )
 
-    # Remove duplicate date-times, keeping the first occurrence
-    df1_unique = df1.drop_duplicates(subset="DATETIME", keep="first")
-    df2_unique = df2.drop_duplicates(subset="DATETIME", keep="first")
+def _day_time_keys(df):
+    """
+    Returns DAY/TIME keys (minutes since the start of day 0) of a METAR or forecast frame.
 
-    merged_df = pd.merge(
-        df1_unique,
-        df2_unique,
-        on="DATETIME",
-        suffixes=("_actual", "_forecast"),
-        how="inner",
+    Rows whose DAY or TIME cannot be read get -1.
+    """
+    # Parse each distinct DAY and TIME once instead of building strings for every row
+    day_codes, days = pd.factorize(df["DAY"], use_na_sentinel=False)
+    time_codes, times = pd.factorize(df["TIME"], use_na_sentinel=False)
+    days = pd.to_numeric(pd.Series(days, dtype=object), errors="coerce").to_numpy(dtype=float)
+    times = pd.Series(times, dtype=object).astype(str)
+    hours = pd.to_numeric(times.str[:2], errors="coerce").to_numpy(dtype=float)
+    minutes = pd.to_numeric(times.str[2:4], errors="coerce").to_numpy(dtype=float)
+    keys = days[day_codes] * MINUTES_PER_DAY + (hours * 60 + minutes)[time_codes]
+    return np.where(np.isnan(keys), -1, keys).astype(np.int64)
+
+
+def _timestamps(df):
+    """
+    Returns the TIMESTAMP column as int64, or None if it is absent or incomplete.
+    """
+    if "TIMESTAMP" not in df.columns or df.empty:
+        return None
+    timestamps = pd.to_numeric(df["TIMESTAMP"], errors="coerce")
+    if timestamps.isna().any():
+        return None
+    return timestamps.to_numpy(dtype=np.int64)
+
+
+def _comparison_keys(df1, df2):
+    """
+    Returns integer minute keys for the rows of both frames.
+
+    The UTC TIMESTAMP columns are used when both frames have them for every
+    row, otherwise keys are built from DAY and TIME.
+
+    Returns:
+        tuple: (keys1, keys2, timestamped)
+    """
+    timestamps1, timestamps2 = _timestamps(df1), _timestamps(df2)
+    if timestamps1 is not None and timestamps2 is not None:
+        return timestamps1, timestamps2, True
+    return _day_time_keys(df1), _day_time_keys(df2), False
+
+
+def _match_rows(keys1, keys2, tolerance=0):
+    """
+    Pairs METAR rows with forecast rows by a sorted merge of their keys.
+
+    Only the first row of each key takes part. Without a tolerance keys must be
+    equal; with one, each forecast is paired with the nearest observation at
+    most tolerance minutes away (the earlier one on a tie), so an observation
+    can serve several forecasts.
+
+    Returns:
+        tuple: (rows1, rows2) row positions of the pairs, in key order
+    """
+    def first_rows(keys):
+        valid = np.flatnonzero(keys >= 0)
+        unique, first = np.unique(keys[valid], return_index=True)
+        return unique, valid[first]
+
+    unique1, first1 = first_rows(keys1)
+    unique2, first2 = first_rows(keys2)
+    if not tolerance:
+        _, i1, i2 = np.intersect1d(unique1, unique2, assume_unique=True, return_indices=True)
+        return first1[i1], first2[i2]
+
+    if not len(unique1):
+        return first1, first1
+    after = np.minimum(np.searchsorted(unique1, unique2), len(unique1) - 1)
+    before = np.maximum(after - 1, 0)
+    nearest = np.where(
+        np.abs(unique1[after] - unique2) < np.abs(unique2 - unique1[before]), after, before
     )
+    within = np.abs(unique1[nearest] - unique2) <= tolerance
+    return first1[nearest[within]], first2[within]
 
-    if merged_df.empty:
-        print("No matching day and times found between the DataFrames.")
-        return pd.DataFrame()
 
-    # Track parameter-wise individual accuracies
-    dir_accuracy_flags = []
-    speed_accuracy_flags = []
-    temp_accuracy_flags = []
-    qnh_accuracy_flags = []
-    overall_accuracy = []
-    inaccuracy_reasons = []
+def _day_labeller(keys, timestamped):
+    """
+    Returns a function giving the DAY label of matched METAR keys.
 
-    for _, row in merged_df.iterrows():
-        actual_dir = row["WIND_DIR_actual"]
-        forecast_dir = row["WIND_DIR_forecast"]
-        actual_speed = row["WIND_SPEED_actual"]
-        forecast_speed = row["WIND_SPEED_forecast"]
-        actual_temp = row["TEMP_actual"]
-        forecast_temp = row["TEMP_forecast"]
-        actual_qnh = row["QNH_actual"]
-        forecast_qnh = row["QNH_forecast"]
+    Labels are the zero-padded day of the month, or YYYY-MM-DD when the
+    timestamped observations span more than one month.
+    """
+    if not timestamped:
+        return lambda chunk_keys: _format_days(chunk_keys // MINUTES_PER_DAY, lambda day: str(day).zfill(2))
 
-        dir_accurate = False
-        speed_accurate = False
-        temp_accurate = False
-        qnh_accurate = False
-        reasons = []
+    months = np.unique(keys.astype("datetime64[m]").astype("datetime64[M]"))
+    iso_date = len(months) > 1
 
-        # Handle direction accuracy
-        if (
-            actual_dir == "VRB"
-            or forecast_dir == "VRB"
-            or actual_dir == "N/A"
-            or forecast_dir == "N/A"
-            or pd.isna(actual_dir)
-            or pd.isna(forecast_dir)
-        ):
-            dir_accurate = True
-        else:
-            try:
-                dir_diff = circular_difference(int(forecast_dir), int(actual_dir))
-                dir_accurate = dir_diff is not None and dir_diff <= wind_dir_threshold
-                if not dir_accurate and dir_diff is not None:
-                    reasons.append(f"Wind Direction off by {dir_diff:.1f}°")
-            except (ValueError, TypeError):
-                print(
-                    f"Warning: Invalid wind direction for DATETIME {row['DATETIME']}."
-                )
-                reasons.append("Wind Direction - Invalid data")
+    def label(day):
+        date = str(np.datetime64(day, "D"))
+        return date if iso_date else date[-2:]
+    return lambda chunk_keys: _format_days(chunk_keys // MINUTES_PER_DAY, label)
 
-        # Handle speed accuracy
-        if (
-            pd.notna(actual_speed)
-            and pd.notna(forecast_speed)
-            and actual_speed != "N/A"
-            and forecast_speed != "N/A"
-        ):
-            try:
-                speed_diff = abs(int(forecast_speed) - int(actual_speed))
-                speed_accurate = speed_diff <= wind_speed_threshold
-                if not speed_accurate:
-                    reasons.append(f"Wind Speed off by {speed_diff} knots")
-            except (ValueError, TypeError):
-                print(f"Warning: Invalid wind speed for DATETIME {row['DATETIME']}.")
-                reasons.append("Wind Speed - Invalid data")
-        else:
-            print(f"Warning: Missing wind speed for DATETIME {row['DATETIME']}.")
-            reasons.append("Wind Speed - Missing data")
 
-        # Handle temperature accuracy
-        if (
-            pd.notna(actual_temp)
-            and pd.notna(forecast_temp)
-            and actual_temp != "N/A"
-            and forecast_temp != "N/A"
-        ):
-            try:
-                temp_diff = abs(float(forecast_temp) - float(actual_temp))
-                temp_accurate = temp_diff <= temp_threshold
-                if not temp_accurate:
-                    reasons.append(f"Temperature off by {temp_diff:.1f}°C")
-            except (ValueError, TypeError):
-                print(f"Warning: Invalid temperature for DATETIME {row['DATETIME']}.")
-                reasons.append("Temperature - Invalid data")
-        else:
-            print(f"Warning: Missing temperature for DATETIME {row['DATETIME']}.")
-            reasons.append("Temperature - Missing data")
+def _format_days(days, label):
+    # Each distinct day is formatted once
+    unique_days, codes = np.unique(days, return_inverse=True)
+    return np.array([label(int(day)) for day in unique_days], dtype=object)[codes]
 
-        # Handle QNH accuracy
-        if (
-            pd.notna(actual_qnh)
-            and pd.notna(forecast_qnh)
-            and actual_qnh != "N/A"
-            and forecast_qnh != "N/A"
-        ):
-            try:
-                qnh_diff = abs(float(forecast_qnh) - float(actual_qnh))
-                qnh_accurate = qnh_diff <= qnh_threshold
-                if not qnh_accurate:
-                    reasons.append(f"QNH off by {qnh_diff:.1f} hPa")
-            except (ValueError, TypeError):
-                print(f"Warning: Invalid QNH for DATETIME {row['DATETIME']}.")
-                reasons.append("QNH - Invalid data")
-        else:
-            print(f"Warning: Missing QNH for DATETIME {row['DATETIME']}.")
-            reasons.append("QNH - Missing data")
-
-        # Store individual accuracy flags
-        dir_accuracy_flags.append(dir_accurate)
-        speed_accuracy_flags.append(speed_accurate)
-        temp_accuracy_flags.append(temp_accurate)
-        qnh_accuracy_flags.append(qnh_accurate)
-
-        # Overall accuracy
-        overall_accuracy.append(
-            "Accurate"
-            if all([dir_accurate, speed_accurate, temp_accurate, qnh_accurate])
-            else "Not Accurate"
-        )
-        
-        # Store inaccuracy reasons
-        inaccuracy_reasons.append(" | ".join(reasons) if reasons else "All Accurate")
-
-    # Add accuracy flags to DataFrame
-    merged_df["DIR_Accurate"] = dir_accuracy_flags
-    merged_df["SPD_Accurate"] = speed_accuracy_flags
-    merged_df["TEMP_Accurate"] = temp_accuracy_flags
-    merged_df["QNH_Accurate"] = qnh_accuracy_flags
-    merged_df["Accuracy"] = overall_accuracy
-    merged_df["Inaccuracy_Reason"] = inaccuracy_reasons
-
-    # Group-wise summary per DAY
-    merged_df["DAY"] = merged_df["DATETIME"].str.split().str[0]  # Extract day again
-
-    # Calculate daily accuracy percentages with counts
-    daily_accuracy = (
-        merged_df.groupby("DAY")
-        .agg(
-            {
-                "DIR_Accurate": lambda x: f"{round(100 * x.sum() / len(x), 1)}% ({x.sum()})",
-                "SPD_Accurate": lambda x: f"{round(100 * x.sum() / len(x), 1)}% ({x.sum()})",
-                "TEMP_Accurate": lambda x: f"{round(100 * x.sum() / len(x), 1)}% ({x.sum()})",
-                "QNH_Accurate": lambda x: f"{round(100 * x.sum() / len(x), 1)}% ({x.sum()})",
-                "Accuracy": lambda x: f"{round(100 * (x == 'Accurate').sum() / len(x), 1)}% ({(x == 'Accurate').sum()})",
-            }
-        )
-        .rename(
-            columns={
-                "DIR_Accurate": "Wind Direction",
-                "SPD_Accurate": "Wind Speed",
-                "TEMP_Accurate": "Temperature",
-                "QNH_Accurate": "QNH",
-                "Accuracy": "Overall",
-            }
-        )
-        .reset_index()
+
+def _merge_rows(df1, df2, rows1, rows2):
+    """
+    Builds the merged METAR/forecast frame of the matched rows (_actual/_forecast suffixes).
+    """
+    left = df1.iloc[rows1].reset_index(drop=True)
+    right = df2.iloc[rows2].reset_index(drop=True)
+    if "QNH" not in right.columns:
+        right["QNH"] = right["QFE"]
+    # Filled in by _score_rows; the forecast's own DATETIME (if any) is dropped
+    left["DATETIME"] = ""
+    right = right.drop(columns="DATETIME", errors="ignore")
+    return pd.merge(left, right, left_index=True, right_index=True, suffixes=("_actual", "_forecast"))
+
+
+def _score_rows(merged_df, day_labels, wind_dir_threshold, wind_speed_threshold, temp_threshold, qnh_threshold):
+    """
+    Adds the DATETIME, accuracy and DAY columns to a merged frame.
+
+    Returns:
+        dict: Boolean accuracy flags, keyed like _SUMMARY_COLUMNS
+    """
+    # Parameter-wise accuracy flags and reasons, computed column-wise
+    flags, reasons = _accuracy_flags(
+        merged_df,
+        wind_dir_threshold=wind_dir_threshold,
+        wind_speed_threshold=wind_speed_threshold,
+        temp_threshold=temp_threshold,
+        qnh_threshold=qnh_threshold,
+    )
+    flags["Overall"] = (
+        flags["DIR_Accurate"] & flags["SPD_Accurate"] & flags["TEMP_Accurate"] & flags["QNH_Accurate"]
     )
 
-    # Calculate whole month accuracy
-    total_records = len(merged_df)
-    whole_month = {
-        "DAY": "Whole Month",
-        "Wind Direction": f"{round(100 * merged_df['DIR_Accurate'].sum() / total_records, 1)}% ({merged_df['DIR_Accurate'].sum()})",
-        "Wind Speed": f"{round(100 * merged_df['SPD_Accurate'].sum() / total_records, 1)}% ({merged_df['SPD_Accurate'].sum()})",
-        "Temperature": f"{round(100 * merged_df['TEMP_Accurate'].sum() / total_records, 1)}% ({merged_df['TEMP_Accurate'].sum()})",
-        "QNH": f"{round(100 * merged_df['QNH_Accurate'].sum() / total_records, 1)}% ({merged_df['QNH_Accurate'].sum()})",
-        "Overall": f"{round(100 * (merged_df['Accuracy'] == 'Accurate').sum() / total_records, 1)}% ({(merged_df['Accuracy'] == 'Accurate').sum()})",
-    }
-
-    # Add ICAO requirements row
-    icao_requirements = {
-        "DAY": "ICAO Requirement",
-        "Wind Direction": "80%",
-        "Wind Speed": "80%",
-        "Temperature": "80%",
-        "QNH": "80%",
-        "Overall": "80%",
-    }
+    merged_df["DATETIME"] = day_labels + " " + merged_df["TIME_actual"].astype(str).to_numpy()
+    merged_df["DIR_Accurate"] = flags["DIR_Accurate"]
+    merged_df["SPD_Accurate"] = flags["SPD_Accurate"]
+    merged_df["TEMP_Accurate"] = flags["TEMP_Accurate"]
+    merged_df["QNH_Accurate"] = flags["QNH_Accurate"]
+    merged_df["Accuracy"] = np.where(flags["Overall"], "Accurate", "Not Accurate")
+    merged_df["Inaccuracy_Reason"] = reasons
+    merged_df["DAY"] = day_labels
+    return flags
+
+
+def _iter_comparisons(df1, df2, tolerance, chunk_days, thresholds):
+    """
+    Matches the METAR and forecast rows and yields (merged_df, flags) for
+    chunk_days days of matched rows at a time (all of them if chunk_days is None).
+    """
+    keys1, keys2, timestamped = _comparison_keys(df1, df2)
+    rows1, rows2 = _match_rows(keys1, keys2, tolerance)
+    if not len(rows1):
+        return
+
+    matched = keys1[rows1]
+    day_labels = _day_labeller(matched, timestamped)
+    if chunk_days:
+        # Pairs are in key order, so each chunk is a contiguous run
+        _, starts = np.unique(matched // MINUTES_PER_DAY // chunk_days, return_index=True)
+        bounds = list(starts[1:]) + [len(rows1)]
+        chunks = zip(starts, bounds)
+    else:
+        chunks = [(0, len(rows1))]
+
+    for start, stop in chunks:
+        merged_df = _merge_rows(df1, df2, rows1[start:stop], rows2[start:stop])
+        flags = _score_rows(merged_df, day_labels(matched[start:stop]), **thresholds)
+        yield merged_df, flags
+
+
+def _accuracy_summary(counts, totals, total_records):
+    """
+    Builds the daily accuracy table from per-day [sum, count] pairs of each
+    flag, followed by the whole month and ICAO requirement rows.
+    """
+    # Columns of the counts are (flag, sum), (flag, count) in _SUMMARY_COLUMNS order
+    daily_accuracy = pd.DataFrame({"DAY": sorted(counts)})
+    for i, label in enumerate(_SUMMARY_COLUMNS.values()):
+        daily_accuracy[label] = [
+            _format_accuracy(counts[day][2 * i], counts[day][2 * i + 1]) for day in daily_accuracy["DAY"]
+        ]
+
+    whole_month = {"DAY": "Whole Month"}
+    for flag, label in _SUMMARY_COLUMNS.items():
+        whole_month[label] = _format_accuracy(totals[flag], total_records)
 
     # Append whole month and ICAO requirements to daily accuracy
-    daily_accuracy = pd.concat(
+    return pd.concat(
         [
             daily_accuracy,
             pd.DataFrame([whole_month]),
-            pd.DataFrame([icao_requirements]),
+            pd.DataFrame([_ICAO_REQUIREMENTS]),
         ],
         ignore_index=True,
     )
 
-    return daily_accuracy, merged_df
+
+def _compare(df1, df2, merged_output, tolerance, chunk_days, thresholds):
+    """
+    Shared body of compare_weather_data and compare_weather_data_chunked.
+
+    Returns:
+        tuple: (daily_accuracy, merged_frames, total_records, accurate); daily_accuracy
+               is None if no rows matched
+    """
+    counts = {}
+    total_records = 0
+    totals = dict.fromkeys(_SUMMARY_COLUMNS, 0)
+    merged_frames = []
+    # The file is only created once there are merged rows to write
+    writer = ArtifactWriter(merged_output) if merged_output else None
+    try:
+        for merged_df, flags in _iter_comparisons(df1, df2, tolerance, chunk_days, thresholds):
+            if writer is not None:
+                writer.write(merged_df)
+            else:
+                merged_frames.append(merged_df)
+
+            chunk_counts = (
+                pd.DataFrame(flags, index=merged_df.index)
+                .assign(DAY=merged_df["DAY"])
+                .groupby("DAY")
+                .agg(["sum", "count"])
+            )
+            for day, row in zip(chunk_counts.index, chunk_counts.to_numpy(dtype=np.int64)):
+                counts[day] = counts[day] + row if day in counts else row
+            total_records += len(merged_df)
+            for flag in _SUMMARY_COLUMNS:
+                totals[flag] += int(flags[flag].sum())
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if not total_records:
+        print("No matching day and times found between the DataFrames.")
+        return None, merged_frames, 0, 0
+    return _accuracy_summary(counts, totals, total_records), merged_frames, total_records, totals["Overall"]
+
+
+def compare_weather_data(
+    df1,
+    df2,
+    wind_dir_threshold=30,
+    wind_speed_threshold=5,
+    temp_threshold=1,
+    qnh_threshold=1,
+    tolerance=0,
+):
+    """
+    Compares weather data from two DataFrames based on matching observation times.
+
+    Rows are joined on their UTC TIMESTAMP (minutes since 1970-01-01) when both
+    frames have one, otherwise on DAY and TIME, by a sorted merge of integer
+    keys. The input frames are not modified.
+
+    Args:
+        df1 (pd.DataFrame): Actual (METAR) data with 'TIME', 'WIND_DIR', 'WIND_SPEED', 'TEMP', 'QNH', and 'DAY'.
+        df2 (pd.DataFrame): Forecast data with 'TIME', 'WIND_DIR', 'WIND_SPEED', 'TEMP', 'QNH', and 'DAY'.
+        wind_dir_threshold (int): Threshold for wind direction accuracy in degrees.
+        wind_speed_threshold (int): Threshold for wind speed accuracy in knots.
+        temp_threshold (int): Threshold for temperature accuracy in °C.
+        qnh_threshold (int): Threshold for QNH accuracy in hPa.
+        tolerance (int): Match each forecast with the nearest observation at most this
+                         many minutes away, e.g. 30 to verify an hourly forecast against
+                         a METAR at HH:30 or a SPECI (default: exact times only).
+
+    Returns:
+        tuple: (daily_accuracy, merged_df) with the daily accuracy summary (counts in
+               parentheses) and the merged rows. An empty DataFrame is returned
+               instead if nothing can be compared.
+    """
+    if not _check_frames(df1, df2):
+        return pd.DataFrame()
+
+    thresholds = dict(
+        wind_dir_threshold=wind_dir_threshold,
+        wind_speed_threshold=wind_speed_threshold,
+        temp_threshold=temp_threshold,
+        qnh_threshold=qnh_threshold,
+    )
+    daily_accuracy, merged_frames, _, _ = _compare(df1, df2, None, tolerance, None, thresholds)
+    if daily_accuracy is None:
+        return pd.DataFrame()
+    return daily_accuracy, merged_frames[0]
+
+
+def compare_weather_data_chunked(
+    df1,
+    df2,
+    merged_output,
+    wind_dir_threshold=30,
+    wind_speed_threshold=5,
+    temp_threshold=1,
+    qnh_threshold=1,
+    tolerance=0,
+    chunk_days=COMPARE_CHUNK_DAYS,
+):
+    """
+    Compares weather data like compare_weather_data, a few days at a time.
+
+    Rows are matched on their integer keys up front and the matched rows are
+    compared chunk_days days at a time. The merged rows of each chunk are
+    appended to merged_output and the daily and whole month counts are
+    accumulated, so only one chunk of merged rows is in memory at once. This
+    bounds the merged detail rows only: both input frames are held in full, so
+    peak memory still grows with the decoded METAR period. The input frames are
+    not modified.
+
+    Args:
+        df1 (pd.DataFrame): Actual (METAR) data with 'TIME', 'WIND_DIR', 'WIND_SPEED', 'TEMP', 'QNH', and 'DAY'.
+        df2 (pd.DataFrame): Forecast data with 'TIME', 'WIND_DIR', 'WIND_SPEED', 'TEMP', 'QNH' (or 'QFE'), and 'DAY'.
+        merged_output (str): Path of the CSV (or .parquet/.feather) file receiving the merged rows
+                             (the merged_df of compare_weather_data).
+        tolerance (int): Nearest-observation tolerance in minutes, as in compare_weather_data.
+        chunk_days (int): Number of days compared at a time.
+
+    Returns:
+        tuple: (daily_accuracy, merged_stats) where daily_accuracy is the same summary
+               as compare_weather_data and merged_stats holds the number of merged
+               rows ("rows") and of accurate rows ("accurate"). daily_accuracy is
+               an empty DataFrame, with zero counts, if nothing can be compared.
+    """
+    if not _check_frames(df1, df2):
+        return pd.DataFrame(), {"rows": 0, "accurate": 0}
+
+    thresholds = dict(
+        wind_dir_threshold=wind_dir_threshold,
+        wind_speed_threshold=wind_speed_threshold,
+        temp_threshold=temp_threshold,
+        qnh_threshold=qnh_threshold,
+    )
+    daily_accuracy, _, total_records, accurate = _compare(
+        df1, df2, merged_output, tolerance, chunk_days, thresholds
+    )
+    if daily_accuracy is None:
+        return pd.DataFrame(), {"rows": 0, "accurate": 0}
+    return daily_accuracy, {"rows": total_records, "accurate": accurate}
@@ -0,0 +1,175 @@
+"""
+Local METAR archive
+
+Keeps every METAR report fetched from OGIMET in a SQLite database indexed by
+station and UTC observation minute, together with the time ranges that have
+already been fetched for each station. OgimetAPI consults the archive first
+and only goes upstream for the sub-ranges that are still missing.
+"""
+
+import os
+import sqlite3
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from app.config import METAR_ARCHIVE_PATH
+
+# Column names of the OGIMET getmetar CSV, in order
+ARCHIVE_FIELDS = ["ICAOIND", "ANO", "MES", "DIA", "HORA", "MIN", "PARTE"]
+
+# Reports keep trickling in for a while after the observation time, so
+# the most recent minutes are never marked as fully fetched.
+SETTLE_MINUTES = 180
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    icao TEXT NOT NULL,
+    obs_minute INTEGER NOT NULL,
+    report TEXT NOT NULL,
+    PRIMARY KEY (icao, obs_minute, report)
+);
+CREATE TABLE IF NOT EXISTS coverage (
+    icao TEXT NOT NULL,
+    start_minute INTEGER NOT NULL,
+    end_minute INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS coverage_icao_start ON coverage (icao, start_minute);
+"""
+
+
+def to_epoch_minute(value: Union[str, datetime]) -> int:
+    """
+    Convert a YYYYMMDDHHmm string or datetime (taken as UTC) to minutes since the epoch.
+    """
+    if not isinstance(value, datetime):
+        value = datetime.strptime(value, "%Y%m%d%H%M")
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp()) // 60
+
+
+def from_epoch_minute(minute: int) -> str:
+    """
+    Convert minutes since the epoch back to a YYYYMMDDHHmm string (UTC).
+    """
+    return datetime.fromtimestamp(minute * 60, tz=timezone.utc).strftime("%Y%m%d%H%M")
+
+
+def row_to_record(row: List[str]) -> Optional[Tuple[str, int, str]]:
+    """
+    Convert one getmetar CSV row into an (icao, obs_minute, report) record.
+
+    Returns:
+        The record, or None if the row is not a report (e.g. a header line)
+    """
+    if len(row) < len(ARCHIVE_FIELDS):
+        return None
+    try:
+        obs_time = datetime(*(int(x) for x in row[1:6]), tzinfo=timezone.utc)
+    except ValueError:
+        return None
+    report = ",".join(row[6:]).strip()
+    return row[0].strip(), int(obs_time.timestamp()) // 60, report
+
+
+class MetarArchive:
+    """
+    SQLite-backed store of METAR reports keyed by ICAO and observation minute.
+
+    Each operation opens its own connection, so a single instance can be shared
+    between threads and several worker processes can use the same file.
+    """
+
+    def __init__(self, path: str = METAR_ARCHIVE_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def missing_ranges(self, icao: str, begin: int, end: int) -> List[Tuple[int, int]]:
+        """
+        Find the parts of [begin, end] (inclusive epoch minutes) not yet fetched for a station.
+
+        Returns:
+            Sorted list of (start_minute, end_minute) gaps
+        """
+        with self._connect() as conn:
+            covered = conn.execute(
+                "SELECT start_minute, end_minute FROM coverage "
+                "WHERE icao = ? AND start_minute <= ? AND end_minute >= ? "
+                "ORDER BY start_minute",
+                (icao, end, begin),
+            ).fetchall()
+
+        gaps = []
+        cursor = begin
+        for start, stop in covered:
+            if start > cursor:
+                gaps.append((cursor, start - 1))
+            cursor = max(cursor, stop + 1)
+        if cursor <= end:
+            gaps.append((cursor, end))
+        return gaps
+
+    def store(self, icao: str, begin: int, end: int, records: Iterable[Tuple[str, int, str]]) -> None:
+        """
+        Insert fetched reports and mark [begin, end] as fetched for the station.
+
+        The covered range is clipped to SETTLE_MINUTES before the current time so
+        that recent hours are fetched again on the next request.
+        """
+        settled = int(time.time()) // 60 - SETTLE_MINUTES
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO reports (icao, obs_minute, report) VALUES (?, ?, ?)",
+                ((icao, minute, report) for _, minute, report in records),
+            )
+            end = min(end, settled)
+            if end < begin:
+                return
+
+            # Merge with every overlapping or adjacent range already recorded
+            overlapping = conn.execute(
+                "SELECT rowid, start_minute, end_minute FROM coverage "
+                "WHERE icao = ? AND start_minute <= ? AND end_minute >= ?",
+                (icao, end + 1, begin - 1),
+            ).fetchall()
+            for rowid, start, stop in overlapping:
+                begin = min(begin, start)
+                end = max(end, stop)
+                conn.execute("DELETE FROM coverage WHERE rowid = ?", (rowid,))
+            conn.execute(
+                "INSERT INTO coverage (icao, start_minute, end_minute) VALUES (?, ?, ?)",
+                (icao, begin, end),
+            )
+
+    def query(self, icao: str, begin: int, end: int) -> List[Dict[str, Any]]:
+        """
+        Return archived reports for a station in [begin, end], ordered by time.
+
+        Returns:
+            List of dictionaries keyed like the OGIMET getmetar CSV (see ARCHIVE_FIELDS)
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT obs_minute, report FROM reports "
+                "WHERE icao = ? AND obs_minute BETWEEN ? AND ? "
+                "ORDER BY obs_minute, rowid",
+                (icao, begin, end),
+            ).fetchall()
+
+        result = []
+        for minute, report in rows:
+            stamp = from_epoch_minute(minute)
+            result.append(dict(zip(ARCHIVE_FIELDS, [
+                icao, stamp[0:4], stamp[4:6], stamp[6:8], stamp[8:10], stamp[10:12], report
+            ])))
+        return result
@@ -0,0 +1,287 @@
+"""
+Fast METAR decoder
+
+Decodes the groups used for verification (time, wind, visibility, weather,
+clouds, temperature/dew point and QNH) with compiled regular expressions and
+collects them column by column. Reports with groups the fast path does not
+understand are handed to python-metar instead.
+
+Decoded columns are turned into a typed frame (see DECODED_DTYPES): float32
+numbers with NaN for missing values, a nullable wind direction with explicit
+masks for variable and missing wind, and categoricals for the repeated codes.
+"""
+
+import calendar
+import re
+from datetime import date
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+import metar.Metar as mt
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from app.utils.metar_reader import report_station
+
+# Fields decoded from each report, in order
+FIELD_COLUMNS = [
+    "DAY", "TIME", "WIND_DIR", "WIND_SPEED", "TEMP", "QNH",
+    "GUST", "DEWPT", "VIS", "WEATHER", "CLOUDS",
+]
+
+# Columns of the decoded METAR frame, in order, and their types. WIND_DIR is
+# missing when the wind is variable (WIND_VRB) or not reported (WIND_MISSING).
+DECODED_COLUMNS = FIELD_COLUMNS + ["TIMESTAMP", "WIND_VRB", "WIND_MISSING"]
+DECODED_DTYPES = {
+    "DAY": "category",
+    "TIME": "category",
+    "WIND_DIR": "UInt16",
+    "WIND_SPEED": "float32",
+    "TEMP": "float32",
+    "QNH": "float32",
+    "GUST": "float32",
+    "DEWPT": "float32",
+    "VIS": "float32",
+    "WEATHER": "category",
+    "CLOUDS": "category",
+    "TIMESTAMP": "Int64",
+    "WIND_VRB": "bool",
+    "WIND_MISSING": "bool",
+}
+_CATEGORY_COLUMNS = [name for name, dtype in DECODED_DTYPES.items() if dtype == "category"]
+
+# Number of failed reports kept in the decode statistics for inspection
+MAX_FAILED_SAMPLES = 10
+
+_WEATHER_GROUP = (
+    r"(?=\S*[A-Z]{2})(?:[-+]|VC)?(?:MI|PR|BC|DR|BL|SH|TS|FZ)?(?:DZ|RA|SN|SG|IC|PL|GR|GS|UP)*"
+    r"(?:BR|FG|FU|VA|DU|SA|HZ|PY)?(?:PO|SQ|FC|SS|DS)?"
+)
+_CLOUD_GROUP = r"(?:(?:FEW|SCT|BKN|OVC)\d{3}(?:CB|TCU)?|VV\d{3}|NSC|NCD|SKC|CLR)"
+
+# Body of a standard report up to the QNH group; anything after it (recent
+# weather, wind shear, trend) is not needed for verification.
+_REPORT_RE = re.compile(
+    r"(?:(?:METAR|SPECI)\s+)?(?:COR\s+|AMD\s+)?"
+    r"[A-Z][A-Z0-9]{3}\s+"
+    r"(?P<day>\d{2})(?P<hour>[01]\d|2[0-3])(?P<minute>[0-5]\d)Z\s+"
+    r"(?:(?:AUTO|COR)\s+)?"
+    r"(?:(?P<wind_dir>\d{3}|VRB)(?P<wind_speed>\d{2,3})(?:G(?P<gust>\d{2,3}))?KT\s+(?:\d{3}V\d{3}\s+)?)?"
+    r"(?:(?P<cavok>CAVOK)\s+|(?P<vis>\d{4})(?:NDV)?\s+(?:\d{4}(?:N|NE|E|SE|S|SW|W|NW)\s+)?)?"
+    r"(?:R\d{2}[LCR]?/[PM]?\d{4}(?:V[PM]?\d{4})?(?:FT)?[UDN]?\s+)*"
+    r"(?P<weather>(?:" + _WEATHER_GROUP + r"\s+)*)"
+    r"(?P<clouds>(?:" + _CLOUD_GROUP + r"\s+)*)"
+    r"(?P<temp>M?\d{2})/(?P<dewpt>M?\d{2})?\s+"
+    r"Q(?P<qnh>\d{4})(?=[\s=]|$)"
+)
+
+
+@lru_cache(maxsize=None)
+def _days_in_month(year: int, month: int) -> int:
+    return calendar.monthrange(year, month)[1]
+
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+@lru_cache(maxsize=None)
+def _month_start_minutes(year: int, month: int) -> int:
+    return (date(year, month, 1).toordinal() - _EPOCH_ORDINAL) * 1440
+
+
+def utc_minutes(year: int, month: int, day: int, hour: int, minute: int) -> int:
+    """
+    Minutes since 1970-01-01 00:00 UTC, the TIMESTAMP of decoded METAR and forecast rows.
+
+    Days past the end of the month roll over into the next month.
+    """
+    return _month_start_minutes(year, month) + (day - 1) * 1440 + hour * 60 + minute
+
+
+def _signed(value: str) -> float:
+    return -float(value[1:]) if value[0] == "M" else float(value)
+
+
+def parse_metar_fields(report: str, month: Optional[int] = None, year: Optional[int] = None) -> Optional[List[Any]]:
+    """
+    Decode one METAR/SPECI report with the fast path.
+
+    Args:
+        report: Report text, optionally starting with METAR/SPECI and ending with '='
+        month: Month of the observation, used to validate the day (optional)
+        year: Year of the observation, used to validate the day (optional)
+
+    Returns:
+        List of values in FIELD_COLUMNS order (None if missing, "VRB" for a
+        variable wind direction), or None if the report contains groups that
+        should be decoded by python-metar instead
+    """
+    match = _REPORT_RE.match(report)
+    if not match:
+        return None
+
+    day, hour, minute, wind_dir, wind_speed, gust, cavok, vis, weather, clouds, temp, dewpt, qnh = match.groups()
+    if month and year and not 1 <= int(day) <= _days_in_month(year, month):
+        return None
+
+    if vis:
+        vis = 10000.0 if vis == "9999" else float(vis)
+    return [
+        day,
+        f"{hour}{minute}Z",
+        wind_dir if wind_dir == "VRB" else float(wind_dir) if wind_dir else None,
+        float(wind_speed) if wind_speed else None,
+        _signed(temp),
+        float(qnh),
+        float(gust) if gust else None,
+        _signed(dewpt) if dewpt else None,
+        10000.0 if cavok else vis or None,
+        " ".join(weather.split()),
+        " ".join(clouds.split()),
+    ]
+
+
+def metar_fields_from_report(report: mt.Metar) -> List[Any]:
+    """
+    Extract the FIELD_COLUMNS values from a python-metar report object.
+
+    A direction that is variable or not reported while the speed is counts as "VRB".
+    """
+    weather = ["".join(part or "" for part in group) for group in report.weather]
+    clouds = []
+    for cover, height, cloud in report.sky:
+        if height is not None:
+            cover = f"{cover}{int(height.value('FT')) // 100:03d}"
+        clouds.append(f"{cover}{cloud or ''}")
+    return [
+        report.time.strftime("%d"),
+        f"{report.time.hour:02}{report.time.minute:02}Z",
+        report.wind_dir.value() if report.wind_dir else "VRB" if report.wind_speed else None,
+        report.wind_speed.value("KT") if report.wind_speed else None,
+        report.temp.value("C") if report.temp else None,
+        report.press.value("hPa") if report.press else None,
+        report.wind_gust.value("KT") if report.wind_gust else None,
+        report.dewpt.value("C") if report.dewpt else None,
+        report.vis.value("M") if report.vis else None,
+        " ".join(weather),
+        " ".join(clouds),
+    ]
+
+
+class MetarDecoder:
+    """
+    Decodes a stream of METAR reports into columns.
+
+    Reports go through the fast regex path first and fall back to python-metar;
+    reports neither can decode are counted as failures.
+    """
+
+    def __init__(self, month: Optional[int] = None, year: Optional[int] = None, icao: Optional[str] = None):
+        """
+        Args:
+            month: Month of reports without a timestamp of their own
+            year: Year of reports without a timestamp of their own
+            icao: Only decode reports from this station (default: all stations)
+        """
+        self.month = month
+        self.year = year
+        self.icao = icao.upper() if icao else None
+        self.stats = {
+            "reports": 0, "fast": 0, "fallback": 0, "failed": 0,
+            "other_station": 0, "failed_samples": [],
+        }
+        self.columns: Dict[str, List[Any]] = {}
+        self.take_columns()
+
+    def __len__(self) -> int:
+        """Number of decoded rows not yet taken."""
+        return len(self.columns["DAY"])
+
+    def add(self, report: str, month: Optional[int] = None, year: Optional[int] = None) -> bool:
+        """
+        Decode one report and append it to the columns.
+
+        Args:
+            report: Report text
+            month: Month of this report (default: the decoder's month)
+            year: Year of this report (default: the decoder's year)
+
+        Returns:
+            True if the report was decoded, False if it was skipped or counted as a failure
+        """
+        if self.icao and report_station(report) != self.icao:
+            self.stats["other_station"] += 1
+            return False
+
+        month = month or self.month
+        year = year or self.year
+        self.stats["reports"] += 1
+        values = parse_metar_fields(report, month, year)
+        if values is not None:
+            self.stats["fast"] += 1
+        else:
+            try:
+                code = report.replace("NOSIG", "").rstrip("= ")
+                if not code.startswith(("METAR", "SPECI")):
+                    code = "METAR " + code
+                values = metar_fields_from_report(mt.Metar(code, month=month, year=year))
+                self.stats["fallback"] += 1
+            except Exception:
+                self.stats["failed"] += 1
+                if len(self.stats["failed_samples"]) < MAX_FAILED_SAMPLES:
+                    self.stats["failed_samples"].append(report)
+                return False
+
+        for append, value in zip(self._appenders, values):
+            append(value)
+        time = values[1]
+        self._append_timestamp(
+            utc_minutes(year, month, int(values[0]), int(time[:2]), int(time[2:4])) if month and year else None
+        )
+        return True
+
+    def take_columns(self) -> Dict[str, List[Any]]:
+        """
+        Return the decoded columns and start new, empty ones (statistics are kept).
+        """
+        columns = self.columns
+        self.columns = {name: [] for name in FIELD_COLUMNS + ["TIMESTAMP"]}
+        self._appenders = [self.columns[name].append for name in FIELD_COLUMNS]
+        self._append_timestamp = self.columns["TIMESTAMP"].append
+        return columns
+
+
+def decoded_frame(columns: Dict[str, List[Any]]) -> pd.DataFrame:
+    """
+    Build the typed decoded METAR frame from MetarDecoder.take_columns() output.
+    """
+    wind_dir = columns["WIND_DIR"]
+    variable = np.array([value == "VRB" for value in wind_dir], dtype=bool)
+    data = {
+        "WIND_DIR": pd.array([None if value == "VRB" else value for value in wind_dir], dtype="UInt16"),
+        "TIMESTAMP": pd.array(columns["TIMESTAMP"], dtype="Int64"),
+        "WIND_VRB": variable,
+    }
+    for name in FIELD_COLUMNS:
+        if name in data:
+            continue
+        if DECODED_DTYPES[name] == "category":
+            data[name] = pd.Categorical(columns[name])
+        else:
+            data[name] = np.array(columns[name], dtype=DECODED_DTYPES[name])
+    data["WIND_MISSING"] = np.isnan(data["WIND_SPEED"]) & ~variable
+    return pd.DataFrame(data, columns=DECODED_COLUMNS)
+
+
+def concat_decoded(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Concatenate decoded frames, keeping the categorical columns categorical.
+    """
+    if not frames:
+        return decoded_frame({name: [] for name in FIELD_COLUMNS + ["TIMESTAMP"]})
+    df = pd.concat(frames, ignore_index=True)
+    for name in _CATEGORY_COLUMNS:
+        # Chunks have their own categories; concat would fall back to object
+        df[name] = union_categoricals([frame[name] for frame in frames])
+    return df
@@ -0,0 +1,97 @@
+"""
+Streaming METAR reader
+
+Reads METAR/SPECI reports one at a time from a file or an upload stream
+without loading the whole input. Both the plain format ("METAR VABB
+040800Z ...=") and the OGIMET line format with a timestamp prefix written by
+OgimetAPI.save_metar_to_file ("202309040800 METAR VABB 040800Z ...=") are
+supported, and reports may be wrapped over several lines.
+"""
+
+import io
+import os
+import re
+from typing import IO, Iterator, Optional, Tuple, Union
+
+_TIMESTAMP_RE = re.compile(r"(\d{12})\s+")
+_REPORT_START_RE = re.compile(r"(?:METAR|SPECI)\b")
+_STATION_RE = re.compile(r"(?:(?:METAR|SPECI)\s+)?(?:(?:COR|AMD)\s+)?([A-Z][A-Z0-9]{3})\b")
+
+
+def _normalize(parts) -> str:
+    return " ".join(" ".join(parts).split()).rstrip("=").rstrip()
+
+
+def iter_text_lines(source: Union[str, os.PathLike, IO]) -> Iterator[str]:
+    """
+    Yield the lines of a text file or an open text or binary stream.
+
+    Binary streams (e.g. uploads) are decoded as UTF-8 and left open.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "r", encoding="utf-8", errors="replace") as f:
+            yield from f
+        return
+
+    stream = source
+    if isinstance(source.read(0), bytes):
+        stream = io.TextIOWrapper(source, encoding="utf-8", errors="replace")
+    try:
+        yield from stream
+    finally:
+        # Leave the caller's binary stream open
+        if stream is not source:
+            stream.detach()
+
+
+def iter_metar_reports(source: Union[str, os.PathLike, IO]) -> Iterator[Tuple[str, Optional[str]]]:
+    """
+    Yield normalized METAR/SPECI reports one at a time.
+
+    A report starts on a line beginning with METAR/SPECI or a timestamp and ends
+    with '=', a blank line or the start of the next report; other lines continue
+    the current report.
+
+    Args:
+        source: Path to a text file, or an open text or binary stream (e.g. an upload)
+
+    Yields:
+        tuple: (report, timestamp) where report has single spaces and no trailing '=',
+               and timestamp is the YYYYMMDDHHMM prefix of the report line or None
+    """
+    parts, timestamp = [], None
+    for line in iter_text_lines(source):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            if parts:
+                yield _normalize(parts), timestamp
+                parts = []
+            continue
+
+        line_timestamp = None
+        match = _TIMESTAMP_RE.match(line)
+        if match:
+            line_timestamp = match.group(1)
+            line = line[match.end():]
+
+        if parts and (line_timestamp or _REPORT_START_RE.match(line)):
+            yield _normalize(parts), timestamp
+            parts = []
+        if not parts:
+            timestamp = line_timestamp
+
+        parts.append(line)
+        if line.endswith("="):
+            yield _normalize(parts), timestamp
+            parts = []
+
+    if parts:
+        yield _normalize(parts), timestamp
+
+
+def report_station(report: str) -> Optional[str]:
+    """
+    Return the ICAO station of a report, or None if it cannot be found.
+    """
+    match = _STATION_RE.match(report)
+    return match.group(1) if match else None
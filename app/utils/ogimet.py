@@ -4,7 +4,6 @@ OGIMET API Documentation
 This module provides access to meteorological data from OGIMET.
 """
 
-import requests
 import csv
 import io
 from datetime import datetime
@@ -12,7 +11,26 @@ from typing import List, Dict, Optional, Union, Any
 import random
 import string
 import os
-from app.config import METAR_DATA_DIR
+from app.config import METAR_DATA_DIR, OGIMET_BASE_URL
+from app.utils.http_client import HttpClient, get_http_client
+from app.utils.metar_archive import ARCHIVE_FIELDS, MetarArchive, row_to_record, to_epoch_minute, from_epoch_minute
+
+
+def metar_line(row: Dict[str, Any]) -> Optional[str]:
+    """
+    Format a getmetar row as "YYYYMMDDHHMM <report>", the OGIMET line format.
+
+    The observation time prefix lets readers (see app.utils.metar_reader) date
+    every report, also in ranges spanning several months.
+
+    Returns:
+        The line without a newline, or None if the row holds no report
+    """
+    if "PARTE" not in row:
+        return None
+    stamp = "".join(str(row[key]).zfill(width)
+                    for key, width in (("ANO", 4), ("MES", 2), ("DIA", 2), ("HORA", 2), ("MIN", 2)))
+    return f"{stamp} {row['PARTE']}"
 
 class OgimetAPI:
     """
@@ -22,11 +40,22 @@ class OgimetAPI:
     This class allows retrieving METAR reports and other meteorological data.
     """
     
-    BASE_URL = "http://www.ogimet.com/cgi-bin"
+    BASE_URL = OGIMET_BASE_URL
     
-    def __init__(self):
-        """Initialize the OGIMET API client."""
-        pass
+    def __init__(self, archive: Optional[MetarArchive] = None, use_archive: bool = True,
+                 http: Optional[HttpClient] = None):
+        """
+        Initialize the OGIMET API client.
+        
+        Args:
+            archive: Local METAR archive to read from and fill (default: the shared archive)
+            use_archive: Set to False to always fetch the whole range from OGIMET
+            http: HTTP client to use (default: the shared pooled client)
+        """
+        if use_archive and archive is None:
+            archive = MetarArchive()
+        self.archive = archive if use_archive else None
+        self.http = http or get_http_client()
     
     def get_metar(self, 
                  begin: Union[str, datetime],
@@ -38,6 +67,9 @@ class OgimetAPI:
         """
         Retrieve METAR (Meteorological Aerodrome Report) data from OGIMET.
         
+        Requests for a single ICAO station are answered from the local METAR
+        archive; only the parts of the range not fetched before go to OGIMET.
+        
         Args:
             begin: Start date/time in format YYYYMMDDHHmm or datetime object
             end: End date/time in format YYYYMMDDHHmm or datetime object (default: current time)
@@ -71,7 +103,38 @@ class OgimetAPI:
             begin = begin.strftime("%Y%m%d%H%M")
         if end and isinstance(end, datetime):
             end = end.strftime("%Y%m%d%H%M")
-            
+
+        # Single-station requests are served from the local archive
+        if self.archive is not None and icao and len(icao) == 4 and not state:
+            return self._get_metar_archived(begin, end, icao.upper(), lang)
+
+        return self._fetch_metar(begin, end, icao, state, lang, header)
+
+    def _get_metar_archived(self, begin: str, end: Optional[str], icao: str, lang: str) -> List[Dict[str, Any]]:
+        """
+        Serve a single-station request from the archive, fetching only missing sub-ranges.
+        """
+        begin_minute = to_epoch_minute(begin)
+        end_minute = to_epoch_minute(end) if end else to_epoch_minute(datetime.utcnow())
+
+        for gap_begin, gap_end in self.archive.missing_ranges(icao, begin_minute, end_minute):
+            # Raises on an error reply, so the gap is only marked as fetched for real data
+            rows = self._fetch_metar_rows(from_epoch_minute(gap_begin), from_epoch_minute(gap_end), icao, None, lang, False)
+            records = [record for record in map(row_to_record, rows) if record]
+            self.archive.store(icao, gap_begin, gap_end, records)
+
+        return self.archive.query(icao, begin_minute, end_minute)
+
+    def _fetch_metar_rows(self, begin: str, end: Optional[str], icao: Optional[str],
+                          state: Optional[str], lang: str, header: bool) -> List[List[str]]:
+        """
+        Request getmetar from OGIMET and return the raw CSV rows.
+
+        Raises:
+            ValueError: If the reply is not a getmetar CSV (OGIMET sends quota and
+                        error messages such as "#Sorry, Your quota limit..." with
+                        status 200); an empty CSV is a valid reply
+        """
         # Build request parameters
         params = {
             "begin": begin,
@@ -88,15 +151,30 @@ class OgimetAPI:
             params["header"] = "yes"
             
         # Make the request
-        response = requests.get(f"{self.BASE_URL}/getmetar", params=params)
+        response = self.http.get(f"{self.BASE_URL}/getmetar", params=params)
         response.raise_for_status()
         
         # Parse CSV response
-        csv_data = csv.reader(io.StringIO(response.text))
+        rows = list(csv.reader(io.StringIO(response.text)))
+        for row in rows:
+            if not row or not "".join(row).strip():
+                continue
+            if row[0].strip() == ARCHIVE_FIELDS[0] or row_to_record(row):
+                continue
+            message = ",".join(row).strip().lstrip("#").strip()
+            raise ValueError(f"OGIMET did not return METAR data: {message[:200]}")
+        return rows
+
+    def _fetch_metar(self, begin: str, end: Optional[str], icao: Optional[str],
+                     state: Optional[str], lang: str, header: bool) -> List[Dict[str, Any]]:
+        """
+        Fetch the whole range from OGIMET without consulting the archive.
+        """
+        csv_data = iter(self._fetch_metar_rows(begin, end, icao, state, lang, header))
         
         # Convert to list of dictionaries
         result = []
-        headers = next(csv_data) if header else ["ICAOIND", "YEAR", "MONTH", "DAY", "HOUR", "MIN", "REPORT"]
+        headers = next(csv_data, []) if header else ["ICAOIND", "YEAR", "MONTH", "DAY", "HOUR", "MIN", "REPORT"]
         
         for row in csv_data:
             if len(row) >= len(headers):
@@ -108,6 +186,9 @@ class OgimetAPI:
                           icao: Optional[str] = None) -> str:
         """
         Retrieve METAR data and save it to a text file with a random filename.
+
+        Each report is written on its own line behind its YYYYMMDDHHMM
+        observation time (see metar_line).
         
         Args:
             begin: Start date/time in format YYYYMMDDHHmm or datetime object
@@ -128,14 +209,15 @@ class OgimetAPI:
         random_string = ''.join(random.choices(string.ascii_lowercase + string.digits, k=8))
         random_filename = f"metar_data_{random_string}.txt"
         
-        # Save PARTE column values to a text file in METAR_DATA_DIR
+        # Save the timestamped PARTE column values to a text file in METAR_DATA_DIR
         file_path = os.path.join(METAR_DATA_DIR, random_filename)
 
         if res and len(res) > 0:
             with open(file_path, 'w') as txtfile:
                 for item in res:
-                    if 'PARTE' in item:
-                        txtfile.write(f"{item['PARTE']}\n")
+                    line = metar_line(item)
+                    if line:
+                        txtfile.write(f"{line}\n")
                 print(f"METAR data for station {icao} saved to {file_path}")
         else:
             print(f"No METAR data found for station {icao}")
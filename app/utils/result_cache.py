@@ -0,0 +1,206 @@
+"""
+Result cache
+
+The same forecast file and date range are often submitted to process_metar
+again, e.g. after a browser refresh. Responses are kept in a small SQLite
+database keyed by a hash of everything that determines the result, so a
+repeat request is answered at once with the files already generated.
+
+Entries expire after a TTL (a short one while the date range is recent, as
+OGIMET may still receive reports for it), and the least recently used entries
+are evicted when their result files grow past a size limit. An evicted entry
+takes its result files with it; an entry whose files have disappeared is
+dropped on lookup.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import IO, Any, Dict, List, Optional
+
+from app.config import (
+    RESULT_CACHE_DB_PATH,
+    RESULT_CACHE_MAX_BYTES,
+    RESULT_CACHE_RECENT_TTL_SECONDS,
+    RESULT_CACHE_TTL_SECONDS,
+)
+
+# Part of every key; bump it when a change to the pipeline changes its results
+RESULT_CACHE_VERSION = "1"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    response TEXT NOT NULL,
+    files TEXT NOT NULL,
+    bytes INTEGER NOT NULL,
+    created REAL NOT NULL,
+    expires REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+"""
+
+
+def stream_digest(stream: IO[bytes], chunk_size: int = 1 << 16) -> str:
+    """
+    SHA-256 of an upload stream, read in chunks and rewound afterwards.
+    """
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: stream.read(chunk_size), b""):
+        digest.update(chunk)
+    stream.seek(0)
+    return digest.hexdigest()
+
+
+def result_key(**params: Any) -> str:
+    """
+    Cache key of a request: a hash of its JSON-serializable parameters, e.g.
+    the digests and names of the uploaded files, the ICAO code and the dates.
+    """
+    text = json.dumps({"version": RESULT_CACHE_VERSION, **params}, sort_keys=True)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class ResultCache:
+    """
+    TTL and size bounded cache of process_metar responses.
+    """
+
+    def __init__(self, path: str = RESULT_CACHE_DB_PATH, ttl: int = RESULT_CACHE_TTL_SECONDS,
+                 recent_ttl: int = RESULT_CACHE_RECENT_TTL_SECONDS, max_bytes: int = RESULT_CACHE_MAX_BYTES):
+        """
+        Args:
+            path: SQLite database of the cache
+            ttl: Seconds an entry is kept
+            recent_ttl: Seconds an entry is kept if its date range ended less than a day ago
+            max_bytes: Total size of the result files before the least recently used entries are evicted
+        """
+        self.path = path
+        self.ttl = ttl
+        self.recent_ttl = recent_ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self.stats[name] += n
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the cached response of a request, or None on a miss.
+
+        The response metadata gets a "cache" entry with the age of the result.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT response, files, created FROM results WHERE key = ? AND expires > ?", (key, now)
+            ).fetchone()
+            if row and all(os.path.exists(path) for path in json.loads(row[1])):
+                conn.execute("UPDATE results SET last_used = ? WHERE key = ?", (now, key))
+            elif row:
+                # Result files were removed behind the cache's back
+                conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                row = None
+        if row is None:
+            self._count("misses")
+            return None
+
+        self._count("hits")
+        response = json.loads(row[0])
+        response.setdefault("metadata", {})["cache"] = {
+            "hit": True,
+            "key": key,
+            "age_seconds": round(now - row[2], 1),
+            **self.metrics(),
+        }
+        return response
+
+    def put(self, key: str, response: Dict[str, Any], files: List[str], end_date: Optional[str] = None) -> None:
+        """
+        Store a response and the result files it links to, then evict old entries.
+
+        Args:
+            key: Cache key (see result_key)
+            response: JSON response data
+            files: Result files owned by the entry; a hit needs all of them
+            end_date: End of the date range (YYYYMMDDHHMM); ranges ending less than
+                      a day ago expire after recent_ttl
+        """
+        now = time.time()
+        ttl = self.ttl
+        if end_date:
+            end = datetime.strptime(end_date, "%Y%m%d%H%M")
+            if end > datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=1):
+                ttl = min(ttl, self.recent_ttl)
+        size = sum(os.path.getsize(path) for path in files if os.path.exists(path))
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO results (key, response, files, bytes, created, expires, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, json.dumps(response), json.dumps(files), size, now, now + ttl, now),
+            )
+        self._count("stores")
+        self._evict(keep=key)
+
+    def _evict(self, keep: str) -> None:
+        """Remove expired entries, then the least recently used ones above max_bytes."""
+        now = time.time()
+        with self._connect() as conn:
+            rows = conn.execute("SELECT key, files, bytes, expires FROM results ORDER BY last_used").fetchall()
+            total = sum(row[2] for row in rows if row[3] > now)
+            evicted = []
+            for key, files, size, expires in rows:
+                if expires > now:
+                    if total <= self.max_bytes or key == keep:
+                        continue
+                    total -= size
+                evicted.append((key, files))
+            conn.executemany("DELETE FROM results WHERE key = ?", [(key,) for key, _ in evicted])
+
+        for _, files in evicted:
+            for path in json.loads(files):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+        if evicted:
+            self._count("evictions", len(evicted))
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Return hit/miss/store/eviction counters of this process and the size of the cache.
+        """
+        with self._connect() as conn:
+            entries, size = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM results WHERE expires > ?", (time.time(),)
+            ).fetchone()
+        with self._lock:
+            return {**self.stats, "entries": entries, "bytes": size, "max_bytes": self.max_bytes}
+
+
+_cache: Optional[ResultCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> ResultCache:
+    """
+    Return the result cache shared by the whole process.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResultCache()
+        return _cache
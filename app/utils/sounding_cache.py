@@ -0,0 +1,187 @@
+"""
+Sounding cache
+
+A published sounding never changes, so every UWyo CSV is kept on disk under
+the instance directory, keyed by station, launch time and format. The disk
+tier is bounded in size and evicts the least recently used soundings; a small
+in-memory tier keeps recently parsed DataFrames so repeat requests skip both
+the download and the CSV parse.
+"""
+
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+import pandas as pd
+from werkzeug.utils import secure_filename
+
+from app.config import SOUNDING_CACHE_DIR, SOUNDING_CACHE_MAX_BYTES, SOUNDING_CACHE_MEMORY_ITEMS
+
+
+def sounding_key(datetime_str: str, station_id: str, data_type: str = "TEXT:CSV") -> str:
+    """
+    Build the cache key of a sounding, e.g. "upper_air_43003_20230901_000000".
+
+    The key is also the name of the cached file, so downloads keep the name
+    fetch_upper_air_data has always used.
+
+    Args:
+        datetime_str: Launch time, e.g. "2023-09-01 00:00:00"
+        station_id: WMO station ID
+        data_type: UWyo format type
+    """
+    dt = datetime_str.replace(":", "").replace("-", "").replace(" ", "_")
+    key = f"upper_air_{station_id}_{dt}"
+    if data_type != "TEXT:CSV":
+        key += "_" + re.sub(r"\W", "-", data_type)
+    return secure_filename(key)
+
+
+def parse_sounding_csv(path: str) -> pd.DataFrame:
+    """
+    Read a UWyo sounding CSV with column names and text values stripped.
+    """
+    df = pd.read_csv(path, skipinitialspace=True)
+    df.columns = df.columns.str.strip()
+    return df.map(lambda x: x.strip() if isinstance(x, str) else x)
+
+
+class SoundingCache:
+    """
+    Size-bounded LRU cache of sounding CSV files with an in-memory parsed tier.
+    """
+
+    def __init__(self, directory: str = SOUNDING_CACHE_DIR, max_bytes: int = SOUNDING_CACHE_MAX_BYTES,
+                 memory_items: int = SOUNDING_CACHE_MEMORY_ITEMS):
+        """
+        Args:
+            directory: Directory holding the cached CSV files
+            max_bytes: Total size of the cached files before the oldest are evicted
+            memory_items: Number of parsed DataFrames kept in memory
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.memory_items = memory_items
+        os.makedirs(directory, exist_ok=True)
+        self._frames: "OrderedDict[str, pd.DataFrame]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.csv")
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+
+    def get_path(self, key: str) -> Optional[str]:
+        """
+        Return the cached file of a sounding, or None on a miss.
+
+        A hit marks the file as recently used.
+        """
+        path = self._path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            self._count("misses")
+            return None
+        self._count("disk_hits")
+        return path
+
+    def put(self, key: str, text: str) -> str:
+        """
+        Store a downloaded sounding and evict old ones if the cache is too large.
+
+        Returns:
+            Path of the cached file
+        """
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._frames.pop(key, None)
+        self._evict(keep=path)
+        return path
+
+    def _evict(self, keep: str) -> None:
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".csv"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            total -= size
+            key = os.path.basename(path)[:-len(".csv")]
+            with self._lock:
+                self._frames.pop(key, None)
+                self.stats["evictions"] += 1
+
+    def get_frame(self, key: str, fetch: Callable[[], str]) -> pd.DataFrame:
+        """
+        Return the parsed sounding, from memory, disk or by calling fetch.
+
+        Args:
+            key: Cache key (see sounding_key)
+            fetch: Called on a disk miss; downloads the sounding and returns the cached file path
+
+        Returns:
+            pd.DataFrame: A copy of the parsed sounding, safe to modify
+        """
+        with self._lock:
+            frame = self._frames.get(key)
+            if frame is not None:
+                self._frames.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return frame.copy()
+
+        path = self.get_path(key) or fetch()
+        frame = parse_sounding_csv(path)
+        with self._lock:
+            self._frames[key] = frame
+            self._frames.move_to_end(key)
+            while len(self._frames) > self.memory_items:
+                self._frames.popitem(last=False)
+        return frame.copy()
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Return hit/miss/eviction counters and the current size of both tiers.
+        """
+        files = [entry for entry in os.scandir(self.directory) if entry.name.endswith(".csv")]
+        with self._lock:
+            return {
+                **self.stats,
+                "files": len(files),
+                "bytes": sum(entry.stat().st_size for entry in files),
+                "max_bytes": self.max_bytes,
+                "memory_items": len(self._frames),
+            }
+
+
+_cache: Optional[SoundingCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_sounding_cache() -> SoundingCache:
+    """
+    Return the sounding cache shared by the whole process.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = SoundingCache()
+        return _cache
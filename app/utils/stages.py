@@ -0,0 +1,70 @@
+"""
+Request stages
+
+A request made of several slow steps, some of which do not depend on each
+other (e.g. two upstream fetches), is written as named stages together with
+the stages each one needs. A stage starts on a thread pool as soon as the
+stages it needs have finished, so independent fetches overlap and the request
+takes about as long as its slowest chain of stages instead of the sum of all
+of them. The time of every stage is recorded.
+"""
+
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple
+
+
+class Stage(NamedTuple):
+    """
+    One step of a request: func is called with the results of the stages named
+    in after, as keyword arguments of the same names.
+    """
+    func: Callable[..., Any]
+    after: Tuple[str, ...] = ()
+
+
+def run_stages(stages: Dict[str, Stage],
+               max_workers: Optional[int] = None) -> Tuple[Dict[str, Any], Dict[str, float]]:
+    """
+    Run stages as soon as the stages they depend on have finished.
+
+    Args:
+        stages: Stages by name
+        max_workers: Stages run at the same time (default: all of them)
+
+    Returns:
+        tuple: (result of every stage, seconds taken by every stage finished), by stage name
+
+    Raises:
+        ValueError: If a stage depends on an unknown stage, or stages depend on each other
+        Exception: The first exception raised by a stage; stages not started yet are skipped
+    """
+    for name, stage in stages.items():
+        unknown = set(stage.after) - set(stages)
+        if unknown:
+            raise ValueError(f"Stage '{name}' depends on unknown stage(s) {sorted(unknown)}")
+
+    results: Dict[str, Any] = {}
+    timings: Dict[str, float] = {}
+
+    def run(name: str, stage: Stage) -> Any:
+        start = time.perf_counter()
+        try:
+            return stage.func(**{dependency: results[dependency] for dependency in stage.after})
+        finally:
+            timings[name] = round(time.perf_counter() - start, 3)
+
+    pending = dict(stages)
+    with ThreadPoolExecutor(max_workers=max_workers or len(stages) or 1, thread_name_prefix="stage") as pool:
+        running = {}
+        while pending or running:
+            for name, stage in list(pending.items()):
+                if all(dependency in results for dependency in stage.after):
+                    running[pool.submit(run, name, stage)] = name
+                    del pending[name]
+            if not running:
+                raise ValueError(f"Stages {sorted(pending)} depend on each other")
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[running.pop(future)] = future.result()
+    return results, timings
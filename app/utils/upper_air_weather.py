@@ -2,7 +2,10 @@ import os
 from PyPDF2 import PdfReader
 import re
 from datetime import datetime, timedelta
+from app.utils.forecast_document import load_forecast_document
 from app.utils.ogimet import OgimetAPI
+from app.utils.warning_bulletin import resolve_near
+from app.utils.weather_index import WeatherIndex
 
 
 def get_pdf_text(pdf_path):
@@ -154,218 +157,128 @@ def get_bcmg_temp_data(weather_text):
     return changes
 
 
-def check_if_date_is_in_range(
-    start_time, end_time, total_start_time: datetime, total_end_time: datetime
-):
+def get_change_window(change, total_start_time: datetime, total_end_time: datetime):
     """
-    Check if the given time range overlaps with more than half of the total time range.
+    Period in which the weather of a BECMG/TEMPO group is expected.
 
     Args:
-        start_time (str): Start time in DDHH format
-        end_time (str): End time in DDHH format
-        total_start_time (datetime): Total range start time
-        total_end_time (datetime): Total range end time
+        change (dict): Group from get_bcmg_temp_data
+        total_start_time (datetime): Start of the forecast validity
+        total_end_time (datetime): End of the forecast validity
 
     Returns:
-        bool: True if time range overlaps with more than half of total range
+        tuple: (start, end) datetimes; a TEMPO group holds for its own period,
+               a BECMG group from its start to the end of the validity
     """
-    # Convert DDHH strings to datetime objects
-    start_day = int(start_time[:2])
-    start_hour = int(start_time[2:])
-    end_day = int(end_time[:2])
-    end_hour = int(end_time[2:])
+    start = resolve_near(change["start_time"] + "00", total_start_time)
+    if change["change_type"] == "BECMG":
+        return start, total_end_time
+    return start, resolve_near(change["end_time"] + "00", total_start_time)
 
-    # Create datetime objects using the base date from total_start_time
-    base_date = total_start_time.replace(hour=0, minute=0, second=0, microsecond=0)
 
-    # Calculate the actual datetime by adding days and hours to base date
-    range_start = base_date + timedelta(days=start_day - 1, hours=start_hour)
-    range_end = base_date + timedelta(days=end_day - 1, hours=end_hour)
-
-    # Handle case where end time is before start time (crosses month boundary)
-    if range_end <= range_start:
-        range_end += timedelta(days=30)  # Assume next month
+def check_if_date_is_in_range(change, total_start_time: datetime, total_end_time: datetime):
+    """
+    Check if the window of a BECMG/TEMPO group lasts more than half of the validity.
 
-    # Calculate the duration of the given time range in seconds
-    range_duration = (range_end - range_start).total_seconds()
+    Args:
+        change (dict): Group from get_bcmg_temp_data
+        total_start_time (datetime): Start of the forecast validity
+        total_end_time (datetime): End of the forecast validity
 
-    # Calculate the duration of the total time range in seconds
-    total_duration = (total_end_time - total_start_time).total_seconds()
-    print(range_duration, total_duration, total_start_time, total_end_time)
-    # Check if the given range duration is more than half of the total duration
-    return range_duration > total_duration / 2
+    Returns:
+        bool: True if the group's window (see get_change_window) is longer than
+              half of the validity
+    """
+    window_start, window_end = get_change_window(change, total_start_time, total_end_time)
+    return window_end - window_start > (total_end_time - total_start_time) / 2
 
 
-def is_accurate_weather_data(weather_data, metar_data):
+def score_weather_forecast(weather_text, start_date: datetime, end_date: datetime, index: WeatherIndex):
     """
-    Check if weather data matches any line in the METAR data.
+    Score the forecast weather against the present weather observed during its validity.
 
     Args:
-        weather_data (list): List of weather conditions to check.
-        metar_data (str): Raw METAR data as multiline string.
+        weather_text (str): Weather section of the forecast
+        start_date (datetime): Start of the validity
+        end_date (datetime): End of the validity
+        index (WeatherIndex): Present weather of the METAR reports of the validity
 
     Returns:
-        bool: True if any weather condition is found in METAR data, False otherwise.
+        int: 100 if the main weather was observed during the validity, 50 if the
+             weather of a BECMG/TEMPO group covering most of the validity was
+             observed during that group's period, otherwise 0
     """
-    for line in metar_data.split("\n"):
-        for item in weather_data:
-            # Special case: if item is RA or SHRA, check for both
-            if item == "RA" or item == "SHRA":
-                if "RA" in line or "SHRA" in line:
-                    print(line)
-                    print(item)
-                    return True
-            elif item in line:
-                print(line)
-                print(item)
-                return True
-    return False
-
-def process_weather_accuracy_helper(weather_text, start_datetime, end_datetime, icao):
-    accuracy_point = 0
-
-
-    ins = OgimetAPI()
-    file = ins.save_metar_to_file(begin=start_datetime, end=end_datetime, icao=icao)
-    with open(file, "r") as f:
-        metar_data = f.read()
-
     weather_data = format_weather_text(weather_text)
+    if index.first_observed(weather_data, start_date, end_date):
+        return 100
 
-    print(weather_text + " " + str(weather_data))
-    print(
-        f"From {start_datetime} to {end_datetime}"
-    )
+    for item in get_bcmg_temp_data(weather_text=weather_text):
+        if check_if_date_is_in_range(item, start_date, end_date):
+            window_start, window_end = get_change_window(item, start_date, end_date)
+            if index.first_observed(item["weather_data"], window_start, window_end):
+                return 50
+    return 0
 
-    if is_accurate_weather_data(weather_data, metar_data):
-        accuracy_point = 100
 
-    if accuracy_point == 0:
-        print("Not accurate in 1st attempt")
-
-        temp_data = get_bcmg_temp_data(weather_text=weather_text)
+def process_weather_accuracy_helper(weather_text, start_datetime, end_datetime, icao, metar_path=None):
+    """
+    Score the forecast weather against the METAR reports of its validity.
 
-        for item in temp_data:
+    Args:
+        weather_text (str): Weather section of the forecast
+        start_datetime (str): Start of the validity, YYYYMMDDHHMM
+        end_datetime (str): End of the validity, YYYYMMDDHHMM
+        icao (str): ICAO code of the aerodrome
+        metar_path (str): METAR text file of the validity, if already fetched
+                          (default: fetched from OGIMET here)
 
-            if check_if_date_is_in_range(
-                item["start_time"], item["end_time"], start_datetime, end_datetime
-            ):
-                print(item)
-                weather_data = item["weather_data"]
+    Returns:
+        int: See score_weather_forecast
+    """
+    if metar_path is None:
+        ins = OgimetAPI()
+        metar_path = ins.save_metar_to_file(begin=start_datetime, end=end_datetime, icao=icao)
 
-                if is_accurate_weather_data(weather_data, metar_data):
-                    accuracy_point = 50
-                    break
+    start_date = datetime.strptime(start_datetime, "%Y%m%d%H%M")
+    end_date = datetime.strptime(end_datetime, "%Y%m%d%H%M")
+    index = WeatherIndex.from_file(metar_path, reference=start_date)
 
-    return accuracy_point
+    print(weather_text + " " + str(format_weather_text(weather_text)))
+    print(
+        f"From {start_datetime} to {end_datetime}"
+    )
+    return score_weather_forecast(weather_text, start_date, end_date, index)
 
 def process_single_file(forecast_file_path, icao="VABB"):
-    accuracy_point = 0
-    text = get_pdf_text(forecast_file_path)
+    # Parsed once per PDF content, pages read only until the sections are found
+    document = load_forecast_document(forecast_file_path)
+    if document.weather is None:
+        raise ValueError("Weather section not found")
+    if document.valid_from is None or document.valid_to is None:
+        raise ValueError("Date range not found")
 
-    weather_text = parse_weather_section(text)
+    weather_text = document.weather
     # weather_text = "FY BECMG 1100/1102 HZ FU TEMPO 1101/1103 HZ FU BECMG 1104/1109 FU"
     weather_data = format_weather_text(weather_text)
-    start_date, end_date = get_date_range(text)
+    start_date, end_date = document.valid_from, document.valid_to
 
     begin = start_date.strftime("%Y%m%d%H%M")
     end = end_date.strftime("%Y%m%d%H%M")
 
     ins = OgimetAPI()
     file = ins.save_metar_to_file(begin=begin, end=end, icao=icao)
-
-    with open(file, "r") as f:
-        metar_data = f.read()
+    index = WeatherIndex.from_file(file, reference=start_date)
 
     print(weather_data)
     print(
         f"From {start_date.strftime('%Y/%m/%d %H:%MUTC')} to {end_date.strftime('%Y/%m/%d %H:%MUTC')}"
     )
-
-    if is_accurate_weather_data(weather_data, metar_data):
-        accuracy_point = 100
-
-    if accuracy_point == 0:
-        print("Not accurate in 1st attempt")
-
-        temp_data = get_bcmg_temp_data(weather_text=weather_text)
-
-        for item in temp_data:
-
-            if check_if_date_is_in_range(
-                item["start_time"], item["end_time"], start_date, end_date
-            ):
-                print(item)
-                weather_data = item["weather_data"]
-
-                if is_accurate_weather_data(weather_data, metar_data):
-                    accuracy_point = 50
-                    break
-
-    return accuracy_point
+    return score_weather_forecast(weather_text, start_date, end_date, index)
 
 
 if __name__ == "__main__":
-    def main():
-        """
-        Main function to process weather forecasts and compare with METAR data.
-
-        The function:
-        1. Reads PDF files from 'pdf' directory
-        2. Extracts weather data and date ranges
-        3. Fetches corresponding METAR data
-        4. Compares forecast accuracy
-        5. Handles BECMG/TEMPO conditions if initial comparison fails
-
-        Prints accuracy scores (0, 50, or 100) for each processed file.
-        """
-        for file in os.listdir("pdf"):
-            accuracy_point = 0
-            text = get_pdf_text(f"pdf/{file}")
-
-            weather_text = parse_weather_section(text)
-            weather_text = (
-                "FY BECMG 1100/1102 HZ FU TEMPO 1101/1103 HZ FU BECMG 1104/1109 FU"
-            )
-            weather_data = format_weather_text(weather_text)
-            start_date, end_date = get_date_range(text)
-
-            begin = start_date.strftime("%Y%m%d%H%M")
-            end = end_date.strftime("%Y%m%d%H%M")
-
-            ins = OgimetAPI()
-            file = ins.save_metar_to_file(begin=begin, end=end, icao="VABB")
-
-            with open(file, "r") as f:
-                metar_data = f.read()
-
-            print(weather_data)
-            print(
-                f"From {start_date.strftime('%Y/%m/%d %H:%MUTC')} to {end_date.strftime('%Y/%m/%d %H:%MUTC')}"
-            )
-
-            if is_accurate_weather_data(weather_data, metar_data):
-                accuracy_point = 100
-
-            if accuracy_point == 0:
-                print("Not accurate in 1st attempt")
-
-                temp_data = get_bcmg_temp_data(weather_text=weather_text)
-
-                for item in temp_data:
-
-                    if check_if_date_is_in_range(
-                        item["start_time"], item["end_time"], start_date, end_date
-                    ):
-                        print(item)
-                        weather_data = item["weather_data"]
-
-                        if is_accurate_weather_data(weather_data, metar_data):
-                            accuracy_point = 50
-                            break
-
-            print(f"Accurare point:", accuracy_point)
-            print("--------------------------------")
-
+    # Score every forecast PDF of the 'pdf' directory, with one METAR fetch per
+    # station and period (see app.utils.forecast_batch)
+    from app.utils.forecast_batch import main
 
-    main()
+    raise SystemExit(main(["--dir", "pdf", "--icao", "VABB"]))
@@ -1,33 +1,47 @@
-import requests
 from urllib.parse import quote
-from app.config import UPPER_AIR_DATA_DIR 
-import os
-from werkzeug.utils import secure_filename
+import numpy as np
+import pandas as pd
+from app.config import UWYO_SOUNDING_URL
+from app.utils.http_client import get_http_client
+from app.utils.sounding_cache import get_sounding_cache, sounding_key
 
 
-def fetch_upper_air_data(datetime_str: str, station_id: str, src: str = 'UNKNOWN', data_type: str = 'TEXT:CSV') -> str:
+def fetch_upper_air_data(datetime_str: str, station_id: str, src: str = 'UNKNOWN', data_type: str = 'TEXT:CSV',
+                         use_cache: bool = True) -> str:
     """
     Fetch upper air sounding data from University of Wyoming's weather site.
 
+    Soundings are kept in the sounding cache, so a station/launch time is only
+    downloaded once.
+
     Args:
         datetime_str (str): DateTime in format "YYYY-MM-DD HH:MM:SS"
         station_id (str): 5-digit WMO station ID (e.g. "43003")
         src (str): Source (default is 'UNKNOWN')
         data_type (str): Format type (default is 'TEXT:CSV')
+        use_cache (bool): Set to False to download the sounding again
 
     Returns:
-        str: Raw upper air data as plain text
+        str: Path of the file holding the raw upper air data
 
     Raises:
         Exception: If data not available or fetch fails
     """
-    base_url = "https://weather.uwyo.edu/wsgi/sounding"
+    cache = get_sounding_cache()
+    key = sounding_key(datetime_str, station_id, data_type)
+    if use_cache:
+        cached_path = cache.get_path(key)
+        if cached_path:
+            print(f"[INFO] Using cached sounding {cached_path}")
+            return cached_path
+
+    base_url = UWYO_SOUNDING_URL
     datetime_encoded = quote(datetime_str)
     full_url = f"{base_url}?datetime={datetime_encoded}&id={station_id}&src={src}&type={data_type}"
 
     print(f"[DEBUG] Called fetch_upper_air_data with datetime_str={datetime_str}, station_id={station_id}")
     print(f"[DEBUG] Fetching from URL: {full_url}")
-    response = requests.get(full_url)
+    response = get_http_client().get(full_url)
 
     print(f"[DEBUG] Response status: {response.status_code}")
     print(f"[DEBUG] Response first 100 chars: {response.text[:100]}")
@@ -35,56 +49,99 @@ def fetch_upper_air_data(datetime_str: str, station_id: str, src: str = 'UNKNOWN
     if response.status_code == 200:
         if '<html>' in response.text.lower():
             raise Exception("HTML page received: likely no data available for this datetime/station.")
-        # Save to file
-        download_dir = os.path.join(UPPER_AIR_DATA_DIR, 'downloads')
-        os.makedirs(download_dir, exist_ok=True)
-        dt = datetime_str.replace(":", "").replace("-", "").replace(" ", "_")
-        filename = secure_filename(f"upper_air_{station_id}_{dt}.csv")
-        file_path = os.path.join(download_dir, filename)
-        print(f"[DEBUG] Saving to: {file_path}")
-        with open(file_path, "w", encoding="utf-8") as f:
-            f.write(response.text)
+        # Save to the sounding cache
+        file_path = cache.put(key, response.text)
         print(f"[INFO] Data saved to {file_path}")
         return file_path
     else:
         raise Exception(f"Failed to fetch data. HTTP Status Code: {response.status_code}")
-    
-import pandas as pd
-def interpolate_temperature_only(actual_df, forecast_df):
-    results = []
 
-    for _, forecast_row in forecast_df.iterrows():
-        forecast_alt = forecast_row["Altitude (m)"]
 
-        # Get two actual levels above and below
-        below = actual_df[actual_df["geopotential height_m"] <= forecast_alt]
-        above = actual_df[actual_df["geopotential height_m"] >= forecast_alt]
+def load_upper_air_data(datetime_str: str, station_id: str) -> pd.DataFrame:
+    """
+    Return the parsed sounding of a station and launch time.
+
+    Recently used soundings are kept parsed in memory, so repeat requests skip
+    both the download and the CSV parse.
+
+    Args:
+        datetime_str (str): DateTime in format "YYYY-MM-DD HH:MM:SS"
+        station_id (str): 5-digit WMO station ID (e.g. "43003")
 
-        if below.empty or above.empty:
-            continue  # Skip if interpolation not possible
+    Returns:
+        pd.DataFrame: Sounding with stripped column names and values (a copy, safe to modify)
+    """
+    return get_sounding_cache().get_frame(
+        sounding_key(datetime_str, station_id),
+        lambda: fetch_upper_air_data(datetime_str, station_id, use_cache=False),
+    )
+    
 
-        lower = below.iloc[-1]
-        upper = above.iloc[0]
+def _wind_components(speed, direction):
+    """
+    Split wind speed and meteorological direction (degrees, wind from) into u/v components.
+    """
+    radians = np.deg2rad(direction)
+    return -speed * np.sin(radians), -speed * np.cos(radians)
 
-        h1, h2 = lower["geopotential height_m"], upper["geopotential height_m"]
-        print(f"[DEBUG] Lower level: {h1} m, Upper level: {h2} m for forecast altitude {forecast_alt} m")
-        t1, t2 = lower["temperature_C"], upper["temperature_C"]
 
-        # Interpolate temperature
-        interp_temp = ((h2 - forecast_alt) * t1 + (forecast_alt - h1) * t2) / (h2 - h1)
-        print(f"[DEBUG] Interpolated temperature at {forecast_alt} m: {interp_temp:.2f} C")
+def interpolate_temperature_only(actual_df, forecast_df, interpolate_wind=False):
+    """
+    Match every forecast level to the sounding and interpolate the temperature.
 
-        # For other parameters, take the closer one (nearest actual level)
-        if abs(h1 - forecast_alt) <= abs(h2 - forecast_alt):
-            nearest_row = lower
-        else:
-            nearest_row = upper
+    The sounding is sorted by height once and the levels bracketing each
+    forecast altitude are found with a binary search, so all forecast levels
+    are handled in one pass. Forecast levels outside the sounding are skipped.
 
-        results.append({
-            **forecast_row.to_dict(),
-            "interp_temperature_C": interp_temp,
-            "actual_wind_speed_m/s": nearest_row["wind speed_m/s"],
-            "actual_wind_direction": nearest_row.get("wind direction_degree")
-        })
+    Args:
+        actual_df (pd.DataFrame): Sounding with "geopotential height_m", "temperature_C",
+            "wind speed_m/s" and optionally "wind direction_degree"
+        forecast_df (pd.DataFrame): Forecast levels with "Altitude (m)"
+        interpolate_wind (bool): Also interpolate the wind linearly through its u/v
+            components ("interp_wind_speed_m/s" and "interp_wind_direction")
 
-    return pd.DataFrame(results)
+    Returns:
+        pd.DataFrame: Forecast rows with "interp_temperature_C", and the wind of the
+        nearest sounding level as "actual_wind_speed_m/s" and "actual_wind_direction"
+    """
+    heights = pd.to_numeric(actual_df["geopotential height_m"], errors="coerce").to_numpy(dtype=float)
+    order = np.argsort(heights, kind="stable")
+    order = order[~np.isnan(heights[order])]
+    heights = heights[order]
+    temps = actual_df["temperature_C"].to_numpy()[order]
+    speeds = actual_df["wind speed_m/s"].to_numpy()[order]
+    if "wind direction_degree" in actual_df.columns:
+        directions = actual_df["wind direction_degree"].to_numpy()[order]
+    else:
+        directions = np.full(len(order), None, dtype=object)
+
+    altitudes = pd.to_numeric(forecast_df["Altitude (m)"], errors="coerce").to_numpy(dtype=float)
+    # Last level at or below, and first level at or above each forecast altitude
+    lower = np.searchsorted(heights, altitudes, side="right") - 1
+    upper = np.searchsorted(heights, altitudes, side="left")
+    valid = (lower >= 0) & (upper < len(heights)) & ~np.isnan(altitudes)
+    lower, upper, altitudes = lower[valid], upper[valid], altitudes[valid]
+
+    h1, h2 = heights[lower], heights[upper]
+    t1, t2 = temps[lower].astype(float), temps[upper].astype(float)
+    span = h2 - h1
+    with np.errstate(divide="ignore", invalid="ignore"):
+        weight = np.where(span > 0, (altitudes - h1) / span, 0.0)
+    interp_temp = t1 + weight * (t2 - t1)
+
+    # For other parameters, take the closer one (nearest actual level)
+    nearest = np.where(np.abs(h1 - altitudes) <= np.abs(h2 - altitudes), lower, upper)
+
+    result = forecast_df.loc[valid].reset_index(drop=True)
+    result["interp_temperature_C"] = interp_temp
+    result["actual_wind_speed_m/s"] = speeds[nearest]
+    result["actual_wind_direction"] = directions[nearest]
+
+    if interpolate_wind:
+        u, v = _wind_components(speeds.astype(float), pd.to_numeric(directions, errors="coerce").astype(float))
+        u = u[lower] + weight * (u[upper] - u[lower])
+        v = v[lower] + weight * (v[upper] - v[lower])
+        result["interp_wind_speed_m/s"] = np.hypot(u, v)
+        result["interp_wind_direction"] = np.round(np.rad2deg(np.arctan2(-u, -v)), 6) % 360
+
+    return result
@@ -0,0 +1,270 @@
+"""
+Aerodrome warning bulletin parser
+
+Turns the monthly aerodrome warning composite ("LIGHT AIRCRAFT WARNING FOR
+VABB - ..." blocks) into warning records with UTC datetimes, and into the
+warning table (AD_warn_DF.csv) used by app.utils.warning_verification.
+
+The bulletin is tokenized in a single pass over its lines, so an upload can
+be parsed straight from its stream. A bulletin may hold the warnings of
+several stations.
+"""
+
+import os
+import re
+from datetime import datetime
+from functools import lru_cache
+from typing import IO, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+import pandas as pd
+
+from app.utils.metar_reader import iter_text_lines
+from app.utils.warning_verification import ISSUED_UTC, VALIDITY_FROM_UTC, VALIDITY_TO_UTC, resolve_ddhhmm
+
+BULLETIN_COLUMNS = [
+    "Station", "Issue date/time", "Validity from", "Validity To", "Wind dir (deg)",
+    "Wind Speed", "Gust", "Significant Wx", "FCST/OBS",
+    ISSUED_UTC, VALIDITY_FROM_UTC, VALIDITY_TO_UTC,
+]
+
+# Compass points used in the warnings, in degrees
+WIND_DIR_DEGREES = {
+    "N": 0, "NNE": 20, "NE": 50, "ENE": 70, "E": 90, "ESE": 110, "SE": 140, "SSE": 160,
+    "S": 180, "SSW": 200, "SW": 230, "WSW": 250, "W": 270, "WNW": 290, "NW": 320, "NNW": 340,
+}
+
+# Title date, e.g. "- 20230904 08:00" or "– 2023 09 06 07:30"
+_TITLE_DATE_RE = re.compile(r"(\d{4})\s?(\d{2})\s?(\d{2})(?:\s+(\d{2}):(\d{2}))?")
+# Validity groups are DDHHMM; a few bulletins carry a stray extra digit
+_VALID_RE = re.compile(r"VALID\s*(\d{6})\d{0,2}/(\d{6})\d{0,2}")
+_ISSUE_RE = re.compile(r"(\d{6})Z?$")
+# Every token the weather line is checked for, matched in one scan
+_WX_TOKEN_RE = re.compile(
+    r"\b(?:SFC WSPD (?P<speed>\d+)KT"
+    r"|MAX(?P<gust>\d+)"
+    r"|FROM\s+(?P<dir>[A-Z]+)"
+    r"|(?P<intensity>HVY |FBL )?(?P<ts>TSRA|TS)"
+    r"|(?P<fcst>FCST)"
+    r"|(?P<obs>OBS))"
+)
+# Rank of the significant weather forms, strongest first
+_SIG_WX_RANK = {"+TSRA": 0, "-TSRA": 1, "TSRA": 2, "+TS": 3, "-TS": 4, "TS": 5}
+_INTENSITY = {"HVY ": "+", "FBL ": "-"}
+
+# Parser states: what the next non-blank line is expected to be
+_TITLE, _SEPARATOR, _HEADER, _WEATHER = range(4)
+
+
+class AerodromeWarning(NamedTuple):
+    """
+    One warning of the bulletin. Times are UTC; the validity is widened to
+    whole half hours.
+    """
+    station: str
+    issued: Optional[datetime]
+    valid_from: Optional[datetime]
+    valid_to: Optional[datetime]
+    wind_dir: Optional[int]
+    wind_speed: Optional[int]
+    gust: Optional[int]
+    sig_wx: str
+    fcst_obs: str
+
+
+def _title_date(line: str) -> Optional[datetime]:
+    match = _TITLE_DATE_RE.search(line)
+    if not match:
+        return None
+    year, month, day, hour, minute = match.groups()
+    try:
+        return datetime(int(year), int(month), int(day), int(hour or 0), int(minute or 0))
+    except ValueError:
+        return None
+
+
+def resolve_near(ddhhmm: str, reference: datetime) -> datetime:
+    """
+    Convert a DDHHMM group to the datetime closest to reference.
+
+    The group may fall in the month before or after the reference, e.g. a
+    warning valid to "010300" that was issued on the 30th.
+    """
+    day, hour, minute = int(ddhhmm[0:2]), int(ddhhmm[2:4]), int(ddhhmm[4:6])
+    # Within 12 days of the reference the same month is always the closest
+    if abs(day - reference.day) <= 12 and hour < 24:
+        try:
+            return datetime(reference.year, reference.month, day, hour, minute)
+        except ValueError:
+            pass
+    candidates = []
+    for months in (-1, 0, 1):
+        year, month = divmod(reference.year * 12 + reference.month - 1 + months, 12)
+        candidates.append(resolve_ddhhmm(ddhhmm, year, month + 1))
+    return min(candidates, key=lambda candidate: abs(candidate - reference))
+
+
+def _floor_half_hour(ddhhmm: str) -> str:
+    return ddhhmm[:4] + ("00" if ddhhmm[4:6] < "30" else "30")
+
+
+def _ceil_half_hour(ddhhmm: str) -> str:
+    minute = ddhhmm[4:6]
+    if minute in ("00", "30"):
+        return ddhhmm
+    if minute < "30":
+        return ddhhmm[:4] + "30"
+    # Hour 24 rolls over into the next day when resolved
+    return f"{ddhhmm[:2]}{int(ddhhmm[2:4]) + 1:02d}00"
+
+
+def parse_warning(header: str, wx_line: str, reference: datetime) -> AerodromeWarning:
+    """
+    Parse one warning from its header line and its weather line.
+
+    Args:
+        header: e.g. "VABB 040730 AD WRNG 1 VALID 040800/041200"
+        wx_line: e.g. "SFC WSPD 17KT MAX27 FROM WSW FCST NC="
+        reference: Date of the warning (from its title); DDHHMM groups are
+                   resolved to the datetime closest to it
+
+    Returns:
+        AerodromeWarning
+    """
+    parts = header.split()
+    issued = None
+    if len(parts) > 1:
+        match = _ISSUE_RE.match(parts[1])
+        if match:
+            issued = resolve_near(match.group(1), reference)
+
+    valid_from = valid_to = None
+    match = _VALID_RE.search(header)
+    if match:
+        valid_from = resolve_near(_floor_half_hour(match.group(1)), issued or reference)
+        valid_to = resolve_near(_ceil_half_hour(match.group(2)), valid_from)
+
+    return AerodromeWarning(
+        parts[0] if parts else "", issued, valid_from, valid_to, *parse_weather_line(wx_line)
+    )
+
+
+# Bulletins repeat the same few weather lines, so their tokens are cached
+@lru_cache(maxsize=1024)
+def parse_weather_line(wx_line: str) -> Tuple[Optional[int], Optional[int], Optional[int], str, str]:
+    """
+    Tokenize a warning's weather line in one scan.
+
+    Args:
+        wx_line: e.g. "MOD TSRA WITH SFC WSPD 17KT MAX27 FROM WSW FCST NC="
+
+    Returns:
+        tuple: (wind_dir, wind_speed, gust, sig_wx, fcst_obs); the first
+               speed, gust and direction found are used, and the strongest
+               thunderstorm form
+    """
+    wind_speed = gust = direction = None
+    sig_wx = fcst_obs = ""
+    for token in _WX_TOKEN_RE.finditer(wx_line):
+        kind = token.lastgroup
+        if kind == "speed":
+            if wind_speed is None:
+                wind_speed = int(token.group("speed"))
+        elif kind == "gust":
+            if gust is None:
+                gust = int(token.group("gust"))
+        elif kind == "dir":
+            if direction is None:
+                direction = token.group("dir")
+        elif kind == "ts":
+            form = _INTENSITY.get(token.group("intensity"), "") + token.group("ts")
+            if not sig_wx or _SIG_WX_RANK[form] < _SIG_WX_RANK[sig_wx]:
+                sig_wx = form
+        elif kind == "fcst":
+            fcst_obs = "FCST"
+        elif kind == "obs" and not fcst_obs:
+            fcst_obs = "OBS"
+    return WIND_DIR_DEGREES.get(direction), wind_speed, gust, sig_wx, fcst_obs
+
+
+def iter_warnings(source: Union[str, os.PathLike, IO], station: Optional[str] = None,
+                  year: Optional[int] = None, month: Optional[int] = None) -> Iterator[AerodromeWarning]:
+    """
+    Yield the warnings of a bulletin one at a time.
+
+    Each warning is a title line containing "WARNING", a separator line, the
+    header line and the weather line; blank lines are ignored.
+
+    Args:
+        source: Path to the bulletin, or an open text or binary stream (e.g. an upload)
+        station: Yield only the warnings of this ICAO station (default: all)
+        year: Year of warnings whose title has no date (default: the last dated title)
+        month: Month of warnings whose title has no date
+
+    Raises:
+        ValueError: If a warning cannot be dated
+    """
+    reference = datetime(year, month, 1) if year and month else None
+    state, header = _TITLE, None
+    for line in iter_text_lines(source):
+        line = line.strip()
+        if not line:
+            continue
+        if state == _TITLE:
+            if "WARNING" in line:
+                reference = _title_date(line) or reference
+                state = _SEPARATOR
+        elif state == _SEPARATOR:
+            state = _HEADER
+        elif state == _HEADER:
+            header, state = line, _WEATHER
+        else:
+            state = _TITLE
+            if station and header.split(None, 1)[0] != station:
+                continue
+            if reference is None:
+                raise ValueError(f"Cannot date warning '{header}': no date in its title, please give year and month")
+            yield parse_warning(header, line, reference)
+
+
+def warnings_to_frame(warnings: List[AerodromeWarning]) -> pd.DataFrame:
+    """
+    Build the warning table (the AD_warn_DF.csv columns) from warning records.
+
+    Times are written as DDHHMM, with a trailing Z on the validity, and as UTC
+    datetimes in the ISSUED_UTC, VALIDITY_FROM_UTC and VALIDITY_TO_UTC columns;
+    verification uses the datetimes, so warnings near a month end keep their month.
+    """
+    def ddhhmm(time, suffix=""):
+        return f"{time.day:02d}{time.hour:02d}{time.minute:02d}{suffix}" if time is not None else ""
+
+    return pd.DataFrame({
+        "Station": [w.station for w in warnings],
+        "Issue date/time": [ddhhmm(w.issued) for w in warnings],
+        "Validity from": [ddhhmm(w.valid_from, "Z") for w in warnings],
+        "Validity To": [ddhhmm(w.valid_to, "Z") for w in warnings],
+        "Wind dir (deg)": pd.array([w.wind_dir for w in warnings], dtype="Int64"),
+        "Wind Speed": [f"{w.wind_speed}KT" if w.wind_speed is not None else "" for w in warnings],
+        "Gust": [f"{w.gust}KT" if w.gust is not None else "" for w in warnings],
+        "Significant Wx": [w.sig_wx for w in warnings],
+        "FCST/OBS": [w.fcst_obs for w in warnings],
+        ISSUED_UTC: pd.to_datetime([w.issued for w in warnings]).to_numpy(),
+        VALIDITY_FROM_UTC: pd.to_datetime([w.valid_from for w in warnings]).to_numpy(),
+        VALIDITY_TO_UTC: pd.to_datetime([w.valid_to for w in warnings]).to_numpy(),
+    }, columns=BULLETIN_COLUMNS)
+
+
+def parse_warning_bulletin(source: Union[str, os.PathLike, IO], station: Optional[str] = None,
+                           year: Optional[int] = None, month: Optional[int] = None) -> pd.DataFrame:
+    """
+    Parse an aerodrome warning composite into the warning table.
+
+    Args:
+        source: Path to the bulletin, or an open text or binary stream (e.g. an upload)
+        station: Keep only the warnings of this ICAO station (default: all)
+        year: Year of warnings whose title has no date
+        month: Month of warnings whose title has no date
+
+    Returns:
+        pd.DataFrame: One row per warning with the BULLETIN_COLUMNS columns
+    """
+    return warnings_to_frame(list(iter_warnings(source, station=station, year=year, month=month)))
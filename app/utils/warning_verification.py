@@ -0,0 +1,426 @@
+"""
+Aerodrome warning verification
+
+Matches aerodrome warnings (gust / thunderstorm) against the METAR reports
+observed during their validity. The METARs are parsed once into a list sorted
+by observation time, and the reports of each warning's validity window are
+found by binary search instead of rescanning every report per warning.
+"""
+
+import calendar
+import re
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import pandas as pd
+
+from app.utils.artifacts import artifact_format, artifact_path, precompress, write_artifact
+
+_TIME_GROUP_RE = re.compile(r"\b(\d{6})Z\b")
+_TIMESTAMP_RE = re.compile(r"(\d{8})(\d{4})")
+_WIND_RE = re.compile(r" (\d{3})(\d{2})(G(\d{2,3}))?KT")
+_CLOUD_RE = re.compile(r"(FEW\d{3}(?:CB|TCU)?|SCT\d{3}(?:CB|TCU)?|BKN\d{3}(?:CB|TCU)?|OVC\d{3}(?:CB|TCU)?)")
+_TSRA_RE = re.compile(r"(TSRA|TS|FBL TSRA|MOD TSRA|HVY TSRA|MOD TS|FBL TS|HVY TS)", re.IGNORECASE)
+_GUST_VALUE_RE = re.compile(r"\d{2,3}KT")
+
+# Columns of the warning report (final_warning_report.csv)
+WARNING_REPORT_COLUMNS = [
+    "Sl. No.",
+    "Elements (Thunderstorm/Surface wind & Gust)",
+    "Warning issue Time",
+    "true-1 / false-0",
+    "Remarks",
+]
+
+# Columns of the warning table with the UTC datetimes resolved by the bulletin
+# parser (see app.utils.warning_bulletin.warnings_to_frame)
+ISSUED_UTC = "Issue time UTC"
+VALIDITY_FROM_UTC = "Validity from UTC"
+VALIDITY_TO_UTC = "Validity To UTC"
+
+# Columns of the optional audit table, one row per (warning, METAR) pair
+AUDIT_COLUMNS = [
+    "Row", "FCST/OBS", "Validity from", "Validity To",
+    "METAR time", "METAR", "Wind Dir", "Gust", "Clouds",
+]
+
+
+class MetarObservation(NamedTuple):
+    """One METAR report with the groups used for warning verification."""
+    time: datetime
+    line: str
+    wind_dir: Optional[int]
+    wind_gust: Optional[int]
+    clouds: List[str]
+
+
+class WarningWindow(NamedTuple):
+    """A warning row and the METAR reports observed during its validity."""
+    row: int
+    fcst_obs: str
+    validity_from: str
+    validity_to: str
+    observations: Optional[List[MetarObservation]]
+
+
+def get_metar_time_group(metar: str) -> Optional[str]:
+    """
+    Return the DDHHMM time group of a METAR line, from its DDHHMMZ group or its
+    YYYYMMDDHHMM timestamp prefix, or None if it has neither.
+    """
+    match = _TIME_GROUP_RE.search(metar)
+    if match:
+        return match.group(1)
+    match = _TIMESTAMP_RE.match(metar)
+    if match:
+        return match.group(1)[-2:] + match.group(2)
+    return None
+
+
+def _shift_months(year: int, month: int, months: int) -> Tuple[int, int]:
+    index = year * 12 + month - 1 + months
+    return index // 12, index % 12 + 1
+
+
+def resolve_ddhhmm(ddhhmm: str, year: int, month: int) -> datetime:
+    """
+    Convert a DDHHMM group to a datetime in the given month.
+
+    Days past the end of the month (e.g. "310000" in a 30-day month, as written
+    when 2400Z is moved to the next day) roll over into the next month.
+    """
+    day, hour, minute = int(ddhhmm[0:2]), int(ddhhmm[2:4]), int(ddhhmm[4:6])
+    return datetime(year, month, 1) + timedelta(days=day - 1, hours=hour, minutes=minute)
+
+
+class MetarTimeline:
+    """
+    METAR reports sorted by observation time, with the verification groups
+    (wind direction, gust and clouds) parsed once per report.
+    """
+
+    def __init__(self, lines: Iterable[str], year: Optional[int] = None, month: Optional[int] = None):
+        """
+        Args:
+            lines: METAR lines, optionally prefixed with a YYYYMMDDHHMM timestamp
+            year: Year of lines without a timestamp (default: the first timestamp found)
+            month: Month of lines without a timestamp (default: the first timestamp found)
+        """
+        observations = []
+        pending = []
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            match = _TIMESTAMP_RE.match(line)
+            if match:
+                try:
+                    time = datetime.strptime(match.group(0), "%Y%m%d%H%M")
+                except ValueError:
+                    continue
+                if year is None or month is None:
+                    year, month = time.year, time.month
+                observations.append(self._observation(time, line))
+            elif get_metar_time_group(line):
+                pending.append(line)
+
+        # Lines with only a DDHHMMZ group need the month and year of the data
+        if pending and year is not None and month is not None:
+            for line in pending:
+                ddhhmm = get_metar_time_group(line)
+                if int(ddhhmm[:2]) <= calendar.monthrange(year, month)[1]:
+                    observations.append(self._observation(resolve_ddhhmm(ddhhmm, year, month), line))
+
+        observations.sort(key=lambda observation: observation.time)
+        self.observations = observations
+        self.times = [observation.time for observation in observations]
+        self.year = year
+        self.month = month
+
+    @staticmethod
+    def _observation(time: datetime, line: str) -> MetarObservation:
+        wind = _WIND_RE.search(line)
+        return MetarObservation(
+            time=time,
+            line=line,
+            wind_dir=int(wind.group(1)) if wind else None,
+            wind_gust=int(wind.group(4)) if wind and wind.group(4) else None,
+            clouds=_CLOUD_RE.findall(line),
+        )
+
+    @classmethod
+    def from_file(cls, path: str, year: Optional[int] = None, month: Optional[int] = None) -> "MetarTimeline":
+        """
+        Build a timeline from a METAR text file with one report per line.
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(f, year=year, month=month)
+
+    def __len__(self) -> int:
+        return len(self.observations)
+
+    def between(self, start: datetime, end: datetime) -> List[MetarObservation]:
+        """
+        Return the reports observed from start to end (both inclusive).
+        """
+        return self.observations[bisect_left(self.times, start):bisect_right(self.times, end)]
+
+    def _month_of(self, ddhhmm: str) -> Tuple[Optional[int], Optional[int]]:
+        """
+        Return the (year, month) of the METAR data in which a DDHHMM time falls,
+        for data spanning several months; the month of the data if it falls in none.
+        """
+        if self.times:
+            first, last = self.times[0], self.times[-1]
+            year, month = first.year, first.month
+            while (year, month) <= (last.year, last.month):
+                if first <= resolve_ddhhmm(ddhhmm, year, month) <= last:
+                    return year, month
+                year, month = _shift_months(year, month, 1)
+        return self.year, self.month
+
+    def window(self, validity_from: str, validity_to: str,
+               year: Optional[int] = None, month: Optional[int] = None) -> List[MetarObservation]:
+        """
+        Return the reports observed during a warning's validity given as DDHHMM.
+
+        Prefer between() with the validity datetimes where they are known (see
+        extract_warning_windows); a DDHHMM time only gives the day of the month.
+
+        Args:
+            validity_from: Start of validity, DDHHMM (the last 6 digits are used, a trailing Z is ignored)
+            validity_to: End of validity, DDHHMM; an end before the start is taken to be in the next month
+            year: Year of the warning (default: see month)
+            month: Month of the warning (default: the month of the METAR data in which
+                   the start of validity falls)
+        """
+        validity_from = str(validity_from).replace("Z", "")[-6:]
+        validity_to = str(validity_to).replace("Z", "")[-6:]
+        if not (len(validity_from) == len(validity_to) == 6 and validity_from.isdigit() and validity_to.isdigit()):
+            return []
+        if not (year and month):
+            year, month = self._month_of(validity_from)
+        if year is None or month is None:
+            return []
+        start = resolve_ddhhmm(validity_from, year, month)
+        end_year, end_month = (year, month)
+        if int(validity_to) < int(validity_from):
+            end_year, end_month = _shift_months(year, month, 1)
+        end = resolve_ddhhmm(validity_to, end_year, end_month)
+        return self.between(start, end)
+
+
+def extract_warning_windows(ad_warn_df: pd.DataFrame, timeline: MetarTimeline) -> List[WarningWindow]:
+    """
+    Find the METAR reports of every forecast warning.
+
+    The validity is taken from the VALIDITY_FROM_UTC and VALIDITY_TO_UTC
+    datetimes of the bulletin parser, so warnings of a period spanning several
+    months are placed correctly. Tables without them (e.g. an older
+    AD_warn_DF.csv) fall back to the DDHHMM "Validity from"/"Validity To".
+    Rows that are not forecasts (FCST/OBS other than FCST) get observations=None.
+
+    Args:
+        ad_warn_df: Warnings with "Validity from", "Validity To" and "FCST/OBS" columns,
+                    and optionally the UTC validity columns (datetimes, or their text when read from CSV)
+        timeline: METAR reports of the warning period
+
+    Returns:
+        List of WarningWindow, one per warning row (row numbers start at 1)
+    """
+    windows = []
+    columns = {name: ad_warn_df[name].tolist() if name in ad_warn_df.columns else [""] * len(ad_warn_df)
+               for name in ["FCST/OBS", "Validity from", "Validity To"]}
+    for name in [VALIDITY_FROM_UTC, VALIDITY_TO_UTC]:
+        if name in ad_warn_df.columns:
+            times = pd.to_datetime(ad_warn_df[name], errors="coerce")
+            columns[name] = [None if pd.isna(time) else time.to_pydatetime() for time in times]
+        else:
+            columns[name] = [None] * len(ad_warn_df)
+    for idx, (fcst_obs, validity_from, validity_to, valid_from_utc, valid_to_utc) in enumerate(
+        zip(columns["FCST/OBS"], columns["Validity from"], columns["Validity To"],
+            columns[VALIDITY_FROM_UTC], columns[VALIDITY_TO_UTC])
+    ):
+        fcst_obs = str(fcst_obs).strip().upper()
+        validity_from = str(validity_from).replace("Z", "")[-6:]
+        validity_to = str(validity_to).replace("Z", "")[-6:]
+        observations = None
+        if fcst_obs == "FCST":
+            if valid_from_utc is not None and valid_to_utc is not None:
+                observations = timeline.between(valid_from_utc, valid_to_utc)
+            else:
+                observations = timeline.window(validity_from, validity_to)
+        windows.append(WarningWindow(idx + 1, fcst_obs, validity_from, validity_to, observations))
+    return windows
+
+
+def write_extracted_features(windows: Iterable[WarningWindow], output_file: str) -> None:
+    """
+    Write the METAR reports of each warning in the metar_extracted_features.txt format.
+    """
+    with open(output_file, "w") as out:
+        for window in windows:
+            if window.observations is None:
+                out.write(f"\nRow {window.row}: FCST/OBS is {window.fcst_obs}, skipping extraction.\n")
+                continue
+            out.write(f"\nRow {window.row}: Validity {window.validity_from} to {window.validity_to}\n")
+            for observation in window.observations:
+                out.write(f"  METAR: {observation.line}\n")
+                out.write(
+                    f"    Wind Dir: {observation.wind_dir}, Gust: {observation.wind_gust}, "
+                    f"Clouds: {observation.clouds}\n"
+                )
+
+
+def write_audit_table(windows: Iterable[WarningWindow], output_file: str) -> pd.DataFrame:
+    """
+    Write the METAR features of every warning as one flat table, for auditing.
+
+    The table is written as an artifact (see app.utils.artifacts): the format
+    follows the file extension, .parquet or .feather (written as .csv if
+    pyarrow is not installed) or CSV, and a CSV gets its compressed variants.
+
+    Returns:
+        pd.DataFrame: One row per (warning, METAR) pair
+    """
+    columns = {name: [] for name in AUDIT_COLUMNS}
+    for window in windows:
+        for observation in window.observations or []:
+            values = [
+                window.row, window.fcst_obs, window.validity_from, window.validity_to,
+                observation.time, observation.line, observation.wind_dir, observation.wind_gust,
+                " ".join(observation.clouds),
+            ]
+            for name, value in zip(AUDIT_COLUMNS, values):
+                columns[name].append(value)
+    audit_df = pd.DataFrame(columns, columns=AUDIT_COLUMNS).astype({"Wind Dir": "Int64", "Gust": "Int64"})
+
+    path = write_artifact(audit_df, artifact_path(output_file, artifact_format(output_file)))
+    precompress(path)
+    return audit_df
+
+
+def _warning_elements(has_gust: bool, has_tsra: bool) -> str:
+    if has_gust and has_tsra:
+        return "Gust & Thunderstorm warning"
+    if has_gust:
+        return "Gust warning"
+    if has_tsra:
+        return "Thunderstorm warning"
+    return ""
+
+
+def verify_warning(warning: Dict[str, Any], window: WarningWindow) -> List[Any]:
+    """
+    Decide whether one warning verified against the METARs of its window.
+
+    A gust warning verifies if a reported gust came from within 30° of the
+    forecast direction; a thunderstorm warning verifies if CB cloud was
+    reported. Observed (OBS) warnings always count as verified.
+
+    Args:
+        warning: Warning row with "Significant Wx", "Gust", "Wind dir (deg)" and "Issue date/time"
+        window: The warning's METAR reports (see extract_warning_windows)
+
+    Returns:
+        list: Row of the warning report, in WARNING_REPORT_COLUMNS order
+    """
+    sig_wx = str(warning.get("Significant Wx", ""))
+    gust_val = str(warning.get("Gust", ""))
+    wind_dir_fcst = warning.get("Wind dir (deg)", None)
+    issue_time = str(warning.get("Issue date/time", "")).zfill(6)
+
+    # Check for TS/TSRA and gust in warning
+    has_tsra = bool(_TSRA_RE.search(sig_wx))
+    has_gust = bool(_GUST_VALUE_RE.match(gust_val))
+
+    if window.fcst_obs == "OBS":
+        # Elements for OBS rows just reflect the warning
+        return [window.row, _warning_elements(has_gust, has_tsra), issue_time, 1, "OBS"]
+
+    found_gust = False
+    found_cb = False
+    gust_reported = ""
+    dir_reported = ""
+    cb_cloud_group = ""
+    for observation in window.observations or []:
+        if observation.wind_gust is not None and observation.wind_dir is not None and wind_dir_fcst:
+            try:
+                if abs(observation.wind_dir - int(wind_dir_fcst)) <= 30:
+                    found_gust = True
+                    gust_reported = f"{observation.wind_gust}KT"
+                    dir_reported = f"{observation.wind_dir}"
+            except (TypeError, ValueError):
+                pass
+        cb_groups = [cloud for cloud in observation.clouds if "CB" in cloud]
+        if cb_groups:
+            found_cb = True
+            cb_cloud_group = cb_groups[0]
+
+    # Elements come from the METAR evidence, or from the warning itself if there is none
+    elements = _warning_elements(found_gust, found_cb) or _warning_elements(has_gust, has_tsra)
+
+    true_false = 0
+    cb_remark = f" {cb_cloud_group} found" if cb_cloud_group else ""
+    if has_gust and (found_gust or not has_tsra):
+        if found_gust:
+            true_false = 1
+            remark = f"Gust {gust_reported} Dir {dir_reported} matched{cb_remark}"
+        else:
+            remark = "No gust/direction mismatch"
+    elif has_tsra:
+        if found_cb:
+            true_false = 1
+            remark = cb_remark
+        else:
+            remark = "Missing CB or direction mismatch"
+    else:
+        remark = "No significant weather matched"
+    return [window.row, elements, issue_time, true_false, remark]
+
+
+def generate_warning_report(ad_warn_df: pd.DataFrame, windows: List[WarningWindow]) -> pd.DataFrame:
+    """
+    Build the warning report from the warnings and their METAR windows.
+
+    Args:
+        ad_warn_df: Warnings, one row per window (same order as extract_warning_windows)
+        windows: Output of extract_warning_windows
+
+    Returns:
+        pd.DataFrame: Report with WARNING_REPORT_COLUMNS, one row per warning
+    """
+    rows = [
+        verify_warning(warning, window)
+        for warning, window in zip(ad_warn_df.to_dict("records"), windows)
+    ]
+    return pd.DataFrame(rows, columns=WARNING_REPORT_COLUMNS)
+
+
+def warning_accuracy(report_df: pd.DataFrame) -> Optional[float]:
+    """
+    Return the percentage of verified warnings, or None if there are none.
+    """
+    if report_df.empty:
+        return None
+    return report_df["true-1 / false-0"].sum() * 100 / len(report_df)
+
+
+def verify_warnings(ad_warn_df: pd.DataFrame, timeline: MetarTimeline,
+                    audit_file: Optional[str] = None) -> pd.DataFrame:
+    """
+    Verify every warning against the METAR timeline, in memory.
+
+    Args:
+        ad_warn_df: Warnings with validity, FCST/OBS, wind direction, gust and significant weather columns
+        timeline: METAR reports of the warning period
+        audit_file: Optional path of a table of the METAR features used (see write_audit_table)
+
+    Returns:
+        pd.DataFrame: The warning report (see generate_warning_report)
+    """
+    windows = extract_warning_windows(ad_warn_df, timeline)
+    if audit_file:
+        write_audit_table(windows, audit_file)
+    return generate_warning_report(ad_warn_df, windows)
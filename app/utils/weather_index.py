@@ -0,0 +1,169 @@
+"""
+Present weather index
+
+The weather verification of the upper air forecasts asks whether a forecast
+weather code (e.g. "RA", "-TSRA", "HZ") was observed in the METAR reports of a
+time window: the whole validity for the main weather, the period of a BECMG or
+TEMPO group for the changes.
+
+The METARs are decoded once into a WeatherIndex holding, for every present
+weather code, the sorted observation times of the reports that contain it, so
+each question is a binary search instead of a substring scan of every report.
+Only the present weather groups of a report are indexed; the station, the
+trend (NOSIG/BECMG/TEMPO) and the remarks are not observed weather.
+"""
+
+import os
+import re
+from bisect import bisect_left
+from datetime import datetime
+from functools import lru_cache
+from typing import IO, Dict, FrozenSet, Iterable, List, Optional, Tuple, Union
+
+from app.utils.metar_reader import iter_metar_reports
+from app.utils.warning_bulletin import resolve_near
+
+# One present weather group: intensity or proximity, descriptor, phenomena
+_WEATHER_GROUP = (
+    r"(?P<intensity>[-+]|VC)?(?P<descriptor>MI|PR|BC|DR|BL|SH|TS|FZ)?"
+    r"(?P<phenomena>(?:DZ|RA|SN|SG|IC|PL|GR|GS|UP|BR|FG|FU|VA|DU|SA|HZ|PY|PO|SQ|FC|SS|DS)*)"
+)
+_WEATHER_GROUP_RE = re.compile(_WEATHER_GROUP)
+# Whole groups of a report that look like present weather
+_REPORT_GROUP_RE = re.compile(r"(?<!\S)(?=\S)" + _WEATHER_GROUP + r"(?!\S)")
+_TIME_GROUP_RE = re.compile(r"\b(\d{6})Z\b")
+# Start of the parts of a report after the observed groups
+_TREND_RE = re.compile(r"\s(?:NOSIG|BECMG|TEMPO|RMK)\b")
+
+# Forecast codes verified as a broader observed code, e.g. rain showers by any rain
+_FORECAST_ALIASES = {"SHRA": "RA"}
+
+
+@lru_cache(maxsize=1024)
+def weather_keys(group: str) -> FrozenSet[str]:
+    """
+    Index keys of an observed present weather group, without its intensity.
+
+    A group is found by its full code, its descriptor and each of its
+    phenomena, so "+TSRA" is found as "TSRA", "TS" and "RA". Vicinity groups
+    keep their "VC" prefix ("VCSH" is found as "VCSH" only) and are not
+    mistaken for weather at the aerodrome.
+
+    Returns:
+        frozenset: Keys of the group; empty if it is not a present weather group
+    """
+    match = _WEATHER_GROUP_RE.fullmatch(group)
+    if not match or not (match.group("descriptor") or match.group("phenomena")):
+        return frozenset()
+    prefix = "VC" if match.group("intensity") == "VC" else ""
+    descriptor, phenomena = match.group("descriptor") or "", match.group("phenomena")
+    keys = {prefix + descriptor + phenomena}
+    if descriptor:
+        keys.add(prefix + descriptor)
+    for i in range(0, len(phenomena), 2):
+        keys.add(prefix + phenomena[i:i + 2])
+    return frozenset(keys)
+
+
+def forecast_key(token: str) -> Optional[str]:
+    """
+    Index key a forecast weather token is verified by, or None if the token is
+    not a weather code (e.g. a lone intensity sign or "NSW").
+    """
+    match = _WEATHER_GROUP_RE.fullmatch(token.strip())
+    if not match or not (match.group("descriptor") or match.group("phenomena")):
+        return None
+    prefix = "VC" if match.group("intensity") == "VC" else ""
+    code = (match.group("descriptor") or "") + match.group("phenomena")
+    return prefix + _FORECAST_ALIASES.get(code, code)
+
+
+def report_weather(report: str) -> List[str]:
+    """
+    Return the present weather groups of a METAR report, in report order.
+    """
+    time_group = _TIME_GROUP_RE.search(report)
+    body = report[time_group.end():] if time_group else report
+    trend = _TREND_RE.search(body)
+    if trend:
+        body = body[:trend.start()]
+    return [match.group(0) for match in _REPORT_GROUP_RE.finditer(body) if weather_keys(match.group(0))]
+
+
+class WeatherIndex:
+    """
+    Observation times of every present weather code of a set of METAR reports.
+    """
+
+    def __init__(self, reports: Iterable[Tuple[str, Optional[str]]], reference: datetime):
+        """
+        Args:
+            reports: (report, YYYYMMDDHHMM timestamp or None) pairs, as yielded by iter_metar_reports
+            reference: Time the reports are close to (e.g. the start of the forecast validity);
+                       a DDHHMMZ group resolves to the date closest to it
+        """
+        times: Dict[str, List[datetime]] = {}
+        resolved: Dict[str, datetime] = {}
+        count = 0
+        for report, timestamp in reports:
+            time = None
+            if timestamp:
+                try:
+                    time = datetime.strptime(timestamp, "%Y%m%d%H%M")
+                except ValueError:
+                    pass
+            if time is None:
+                match = _TIME_GROUP_RE.search(report)
+                if not match:
+                    continue
+                ddhhmm = match.group(1)
+                if ddhhmm not in resolved:
+                    try:
+                        resolved[ddhhmm] = resolve_near(ddhhmm, reference)
+                    except ValueError:
+                        continue
+                time = resolved[ddhhmm]
+            count += 1
+            for group in report_weather(report):
+                for key in weather_keys(group):
+                    times.setdefault(key, []).append(time)
+
+        for key_times in times.values():
+            key_times.sort()
+        self._times = times
+        self.reports = count
+
+    @classmethod
+    def from_file(cls, source: Union[str, os.PathLike, IO], reference: datetime) -> "WeatherIndex":
+        """
+        Build the index of a METAR file or stream (see iter_metar_reports for the formats).
+        """
+        return cls(iter_metar_reports(source), reference)
+
+    def __len__(self) -> int:
+        return self.reports
+
+    def first_observed(self, weather_data: Iterable[str], start: datetime,
+                       end: datetime) -> Optional[Tuple[str, datetime]]:
+        """
+        Find the first forecast weather token observed from start to end (both inclusive).
+
+        Args:
+            weather_data: Forecast weather tokens, e.g. ["-", "RA"] or ["HVY", "TSRA"];
+                          tokens that are not weather codes are ignored
+            start: Start of the window
+            end: End of the window
+
+        Returns:
+            tuple: (token, time of its first observation in the window), or None if
+                   no token was observed
+        """
+        for token in weather_data:
+            key = forecast_key(token)
+            times = self._times.get(key) if key else None
+            if not times:
+                continue
+            i = bisect_left(times, start)
+            if i < len(times) and times[i] <= end:
+                return token, times[i]
+        return None
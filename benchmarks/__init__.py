@@ -0,0 +1,7 @@
+"""
+Benchmarks for the METAR verification pipeline.
+
+Run a benchmark as a module from the repository root, e.g.:
+
+    python -m benchmarks.compare_weather_data --days 31
+"""
@@ -0,0 +1,72 @@
+"""
+Compare CSV, Parquet and Feather result files: write time, read time and size.
+
+The decoded METAR frame is a month (or more) of replayed sample reports (see
+benchmarks.decode_metar) and the merged frame is the merged output of the
+comparison on synthetic data (see benchmarks.compare_weather_data). Parquet
+and Feather need pyarrow; without it only CSV is measured.
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+from app.utils.artifacts import columnar_available, read_artifact, write_artifact
+from app.utils.metar import compare_weather_data
+from app.utils.metar_decoder import decoded_frame
+from benchmarks.compare_weather_data import synthetic_month
+from benchmarks.decode_memory import decode_columns
+from benchmarks.decode_metar import sample_reports, write_year_of_reports
+
+
+def build_frames(days, tmp):
+    """
+    Return {"decoded_metar": frame, "merged": frame} covering the given number of days.
+    """
+    metar_path = os.path.join(tmp, "metar.txt")
+    write_year_of_reports(metar_path, sample_reports())
+    # Half-hourly reports, so 48 a day
+    decoded = decoded_frame(decode_columns(metar_path, 1, 2023)).head(days * 48)
+
+    df_metar, df_forecast = synthetic_month(days, seed=days)
+    with contextlib.redirect_stdout(io.StringIO()):
+        _, merged = compare_weather_data(df_metar, df_forecast)
+    return {"decoded_metar": decoded, "merged": merged}
+
+
+def best_time(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--days", type=int, default=31, help="Days of data per frame (at most a year)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement (best is kept)")
+    args = parser.parse_args()
+
+    formats = ["csv", "parquet", "feather"] if columnar_available() else ["csv"]
+    if not columnar_available():
+        print("pyarrow is not installed; only CSV is measured")
+
+    print(f"{'frame':<14} {'rows':>6} {'format':<8} {'write s':>8} {'read s':>8} {'size KB':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, frame in build_frames(args.days, tmp).items():
+            na_rep = "N/A" if name == "decoded_metar" else ""
+            for fmt in formats:
+                path = os.path.join(tmp, f"{name}.{fmt}")
+                write_s = best_time(lambda: write_artifact(frame, path, na_rep=na_rep), args.repeat)
+                read_s = best_time(lambda: read_artifact(path), args.repeat)
+                size = os.path.getsize(path) / 1e3
+                print(f"{name:<14} {len(frame):>6} {fmt:<8} {write_s:>8.3f} {read_s:>8.3f} {size:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
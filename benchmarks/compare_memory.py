@@ -0,0 +1,75 @@
+"""
+Measure the peak memory of compare_weather_data against the chunked comparison.
+
+Both write the merged rows to a CSV file, as process_metar does. Peak memory is
+the largest amount allocated by Python during the call (tracemalloc), on top of
+the input frames.
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+from app.utils.metar import compare_weather_data, compare_weather_data_chunked
+from benchmarks.compare_weather_data import synthetic_month
+
+
+def whole_frame(df_metar, df_forecast, path):
+    summary, merged_df = compare_weather_data(df_metar.copy(), df_forecast.copy())
+    merged_df.to_csv(path, index=False)
+    return summary
+
+
+def chunked(df_metar, df_forecast, path, chunk_days):
+    summary, _ = compare_weather_data_chunked(df_metar, df_forecast, path, chunk_days=chunk_days)
+    return summary
+
+
+def measure(func, *args):
+    """
+    Run func once and return (seconds, peak MB, result), with its output silenced.
+    """
+    tracemalloc.start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] / 1e6
+    tracemalloc.stop()
+    return elapsed, peak, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--days", type=int, nargs="+", default=[365, 1095],
+                        help="Number of days per synthetic input")
+    parser.add_argument("--chunk-days", type=int, default=31, help="Days compared at a time")
+    args = parser.parse_args()
+
+    print(f"{'days':>6} {'rows':>8} {'whole MB':>9} {'chunked MB':>11} {'whole s':>8} {'chunked s':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        whole_path = os.path.join(tmp, "whole.csv")
+        chunked_path = os.path.join(tmp, "chunked.csv")
+        for days in args.days:
+            df_metar, df_forecast = synthetic_month(days, seed=days)
+            whole_s, whole_mb, summary_whole = measure(whole_frame, df_metar, df_forecast, whole_path)
+            chunked_s, chunked_mb, summary_chunked = measure(
+                chunked, df_metar, df_forecast, chunked_path, args.chunk_days
+            )
+            pd.testing.assert_frame_equal(summary_whole, summary_chunked)
+            with open(whole_path) as a, open(chunked_path) as b:
+                merged_csv = a.read()
+                assert merged_csv == b.read()
+
+            rows = merged_csv.count("\n") - 1
+            print(f"{days:>6} {rows:>8} {whole_mb:>9.1f} {chunked_mb:>11.1f} {whole_s:>8.2f} {chunked_s:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark compare_weather_data against the former iterrows() implementation.
+
+Synthetic inputs look like the decoder and forecast-extraction output: half-hourly
+METAR rows (float values with occasional "N/A") and hourly forecast rows (ints,
+with None for variable wind). Rows per second are reported for the merged rows.
+"""
+
+import argparse
+import contextlib
+import io
+import random
+import time
+
+import pandas as pd
+
+from app.utils.metar import compare_weather_data
+from benchmarks.legacy import compare_weather_data_iterrows
+
+
+def synthetic_month(days=31, seed=0):
+    """
+    Build (df_metar, df_forecast) frames covering the given number of days.
+    """
+    rnd = random.Random(seed)
+
+    def maybe_missing(value, missing="N/A", rate=0.03):
+        return missing if rnd.random() < rate else value
+
+    metar_rows, forecast_rows = [], []
+    for day in range(1, days + 1):
+        for hour in range(24):
+            for minute in (0, 30):
+                metar_rows.append({
+                    "DAY": f"{day:02d}",
+                    "TIME": f"{hour:02d}{minute:02d}Z",
+                    "WIND_DIR": maybe_missing(float(rnd.randrange(0, 360, 10))),
+                    "WIND_SPEED": maybe_missing(float(rnd.randrange(0, 25))),
+                    "TEMP": maybe_missing(float(rnd.randrange(22, 34))),
+                    "QNH": maybe_missing(float(rnd.randrange(1002, 1012))),
+                })
+            forecast_rows.append({
+                "DAY": day,
+                "MONTH": "09",
+                "YEAR": "2023",
+                "TIME": f"{hour:02d}00Z",
+                "WIND_DIR": maybe_missing(rnd.randrange(0, 360, 10), missing=None),
+                "WIND_SPEED": rnd.randrange(0, 25),
+                "TEMP": rnd.randrange(22, 34),
+                "QFE": rnd.randrange(1001, 1011),
+                "QNH": rnd.randrange(1002, 1012),
+            })
+    return pd.DataFrame(metar_rows), pd.DataFrame(forecast_rows)
+
+
+def time_call(func, df_metar, df_forecast, repeat):
+    """
+    Best wall-clock time of func over `repeat` runs, with its output silenced.
+    """
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        metar, forecast = df_metar.copy(), df_forecast.copy()
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            result = func(metar, forecast)
+            best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--days", type=int, nargs="+", default=[31, 93, 365],
+                        help="Number of days per synthetic input")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement (best is kept)")
+    args = parser.parse_args()
+
+    print(f"{'days':>6} {'rows':>8} {'before rows/s':>14} {'after rows/s':>14} {'speedup':>8}")
+    for days in args.days:
+        df_metar, df_forecast = synthetic_month(days, seed=days)
+        before, (summary_before, merged_before) = time_call(
+            compare_weather_data_iterrows, df_metar, df_forecast, args.repeat
+        )
+        after, (summary_after, merged_after) = time_call(
+            compare_weather_data, df_metar, df_forecast, args.repeat
+        )
+        pd.testing.assert_frame_equal(summary_before, summary_after)
+        pd.testing.assert_frame_equal(merged_before, merged_after)
+
+        rows = len(merged_after)
+        print(f"{days:>6} {rows:>8} {rows / before:>14,.0f} {rows / after:>14,.0f} {before / after:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Measure the memory of a typed decoded METAR frame, column by column.
+
+A year of replayed sample reports (see benchmarks.decode_metar) is decoded
+and built into the typed frame. Sizes are the deep memory usage of each
+column. Compare releases with benchmarks.suite --baseline.
+"""
+
+import argparse
+import os
+import tempfile
+
+from app.utils.metar_decoder import MetarDecoder, decoded_frame
+from app.utils.metar_reader import iter_metar_reports
+from benchmarks.decode_metar import sample_reports, write_year_of_reports
+
+
+def decode_columns(path, month, year):
+    """
+    Decode the reports of path and return the MetarDecoder columns.
+    """
+    decoder = MetarDecoder(month=month, year=year)
+    for report, _ in iter_metar_reports(path):
+        decoder.add(report)
+    return decoder.take_columns()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--year", type=int, default=2023)
+    parser.add_argument("--step", type=int, default=30, help="Minutes between reports")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        metar_path = os.path.join(tmp, "metar_year.txt")
+        write_year_of_reports(metar_path, sample_reports(), args.year, args.step)
+        # Days are only checked against the month, so any 31-day month will do
+        columns = decode_columns(metar_path, 1, args.year)
+
+    df = decoded_frame(columns)
+    sizes = df.memory_usage(deep=True, index=False)
+
+    print(f"rows: {len(df)}")
+    print(f"{'column':<13} {'KB':>9} {'dtype':>12}")
+    for name in df.columns:
+        print(f"{name:<13} {sizes[name] / 1e3:>9.1f} {str(df[name].dtype):>12}")
+    print(f"{'total':<13} {sizes.sum() / 1e3:>9.1f} {sizes.sum() / len(df):>8.0f} bytes/row")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Benchmark decode_metar_to_csv on a year of reports.
+
+The reports of "Aerodrome_warning copy/metar.txt" are replayed with new
+observation times to build a year of half-hourly reports, one "METAR ..."
+report per line. Compare releases with benchmarks.suite --baseline.
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import re
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from app.config import BASE_DIR
+from app.utils.metar import decode_metar_to_csv
+
+SAMPLE_METAR_FILE = os.path.join(BASE_DIR, "Aerodrome_warning copy", "metar.txt")
+
+_TIME_GROUP_RE = re.compile(r"\b\d{6}Z\b")
+
+
+def sample_reports(path=SAMPLE_METAR_FILE):
+    """
+    Read the sample reports without their leading YYYYMMDDHHMM timestamps.
+    """
+    with open(path, "r") as f:
+        return [line.strip().split(" ", 1)[1] for line in f if line.strip()]
+
+
+def write_year_of_reports(path, reports, year=2023, step_minutes=30):
+    """
+    Write a year of reports at the given interval, cycling through the samples.
+
+    Returns:
+        int: Number of reports written
+    """
+    start = datetime(year, 1, 1)
+    end = datetime(year + 1, 1, 1)
+    count = 0
+    with open(path, "w") as f:
+        moment = start
+        while moment < end:
+            report = reports[count % len(reports)]
+            f.write(_TIME_GROUP_RE.sub(moment.strftime("%d%H%MZ"), report, count=1) + "\n")
+            moment += timedelta(minutes=step_minutes)
+            count += 1
+    return count
+
+
+def time_decoder(func, *args):
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        df = func(*args)
+        return time.perf_counter() - start, df
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--year", type=int, default=2023)
+    parser.add_argument("--step", type=int, default=30, help="Minutes between reports")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        metar_path = os.path.join(tmp, "metar_year.txt")
+        total = write_year_of_reports(metar_path, sample_reports(), args.year, args.step)
+        # Days are only checked against the month, so any 31-day month will do
+        elapsed, df = time_decoder(
+            decode_metar_to_csv, metar_path, os.path.join(tmp, "decoded.csv"), 9, args.year
+        )
+
+    stats = df.attrs["decode_stats"]
+    print(f"reports: {total}")
+    print(f"decoded in {elapsed:.2f}s ({total / elapsed:,.0f} reports/s)")
+    print(f"fast path: {stats['fast']}, python-metar fallback: {stats['fallback']}, failed: {stats['failed']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Benchmark the forecast document parser and its content hash cache.
+
+Synthetic local forecast PDFs hold the forecast on the first page, followed by
+pages of annex text (as the charts and notes of a real briefing package). The
+document parser stops after the forecast page, and a repeat of the same file
+is served from the content hash cache. Compare releases with
+benchmarks.suite --baseline.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from app.utils.forecast_document import ForecastDocumentCache
+
+LEVELS = [300, 600, 900, 1500, 2100, 3000, 4500, 6000]
+
+
+def _escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(path, pages):
+    """
+    Write a plain PDF with one Helvetica text line per entry of each page.
+
+    Args:
+        path: File to write
+        pages: List of pages, each a list of text lines
+    """
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for lines in pages:
+        stream = "BT /F1 10 Tf 12 TL 40 800 Td " + " ".join(f"({_escape(line)}) Tj T*" for line in lines) + " ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    body = b"%PDF-1.4\n"
+    offsets = []
+    for number, obj in enumerate(objects, 1):
+        offsets.append(len(body))
+        body += f"{number} 0 obj\n{obj}\nendobj\n".encode("latin-1")
+    xref = len(body)
+    body += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    body += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    body += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    with open(path, "wb") as f:
+        f.write(body)
+
+
+def forecast_lines(icao="VABB", start=datetime(2023, 9, 1, 0, 0), hours=6, seed=0):
+    """
+    Text lines of a local forecast, in the layout parse_forecast_pdf reads.
+    """
+    end = start + timedelta(hours=hours)
+    lines = [
+        f"LOCAL FORECAST FOR {icao} AND ITS NEIGHBOURHOOD",
+        f"VALID FROM {start:%Y/%m/%d %H:%M}UTC TO {end:%Y/%m/%d %H:%M}UTC",
+        "UPPER WINDS AND TEMPERATURES",
+    ]
+    for index, level in enumerate(LEVELS):
+        lines.append(f"{level}M {(250 + 10 * index + seed) % 360:03d}/{10 + index * 3:02d} {25 - index * 4:+03d}")
+    lines += [
+        "WEATHER FBL RA BECMG 0102/0104 TSRA TEMPO 0103/0105 HVY TSRA",
+        "=",
+    ]
+    return lines
+
+
+def write_forecast_pdf(path, annex_pages=0, **forecast):
+    """
+    Write a forecast PDF followed by annex_pages pages of notes.
+    """
+    annex = [f"ANNEX NOTE {line:02d}: CHARTS AND NOTAM SUMMARY FOR THE BRIEFING PACKAGE" for line in range(60)]
+    write_pdf(path, [forecast_lines(**forecast)] + [annex] * annex_pages)
+
+
+def best_time(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--annex-pages", type=int, nargs="+", default=[0, 5, 20],
+                        help="Pages after the forecast page")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per case; the best is reported")
+    args = parser.parse_args()
+
+    print(f"{'pages':>6} {'document ms':>12} {'cached ms':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for annex_pages in args.annex_pages:
+            path = os.path.join(tmp, f"forecast_{annex_pages}.pdf")
+            write_forecast_pdf(path, annex_pages, seed=annex_pages)
+
+            parsed, document = best_time(lambda: ForecastDocumentCache().load(path), args.repeat)
+            cache = ForecastDocumentCache()
+            cache.load(path)
+            cached, _ = best_time(lambda: cache.load(path), args.repeat)
+
+            assert len(document.upper_winds_frame()) == len(LEVELS)
+            assert document.icao == "VABB"
+            print(f"{annex_pages + 1:>6} {parsed * 1e3:>12.1f} {cached * 1e3:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Synthetic inputs for the benchmarks.
+
+Every generator is deterministic for a given seed and scales with its
+arguments (days, levels, stations), so two releases are measured on exactly
+the same data. The inputs are written in the formats the pipeline reads:
+
+- METAR reports one per line, optionally with the YYYYMMDDHHMM prefix
+  written by OgimetAPI.save_metar_to_file (write_metar_text), or as the
+  OGIMET getmetar CSV (write_ogimet_csv)
+- Forecast text files, one per month (MMYYYY.txt) or per day
+  (TAKEOFF_Forecast_DDMMYYYY.txt) (write_forecast_text)
+- University of Wyoming sounding CSVs (write_sounding_csv)
+- Local forecast PDFs (write_forecast_pdf) and their weather (forecast_weather)
+- Aerodrome warning composites (write_bulletin)
+
+The generators of the individual benchmarks are importable from here too.
+"""
+
+import random
+from datetime import datetime, timedelta
+
+from benchmarks.compare_weather_data import synthetic_month
+from benchmarks.forecast_document import forecast_lines, write_forecast_pdf, write_pdf
+from benchmarks.interpolate import synthetic_forecast, synthetic_sounding
+from benchmarks.warning_bulletin import STATIONS, write_bulletin
+
+PRESENT_WEATHER = ["", "", "", "", "HZ", "HZ", "BR", "FU", "-RA", "RA", "-SHRA", "VCSH", "TS", "TSRA", "+TSRA"]
+TRENDS = ["NOSIG", "NOSIG", "NOSIG", "BECMG 3000 BR", "TEMPO TSRA", "TEMPO 25020G30KT"]
+FORECAST_WEATHER = ["HZ", "FU", "BR", "FBL RA", "MOD RA", "FBL TSRA", "HVY TSRA", "MOD SHRA", "NSW"]
+SOUNDING_COLUMNS = [
+    "time", "longitude", "latitude", "pressure_hPa", "geopotential height_m", "temperature_C",
+    "dew point temperature_C", "relative humidity_%", "wind direction_degree", "wind speed_m/s",
+]
+
+
+def metar_report(rng, icao, moment):
+    """
+    One METAR (or now and then SPECI) report of a station, without the trailing '='.
+
+    Reports follow the standard layout, with the odd gust, variable wind,
+    runway visual range group and trend.
+    """
+    if rng.random() < 0.08:
+        wind = f"VRB{rng.randrange(1, 4):02d}KT"
+    else:
+        direction, speed = rng.randrange(0, 360, 10), rng.randrange(2, 22)
+        wind = f"{direction:03d}{speed:02d}KT"
+        if rng.random() < 0.12:
+            wind = f"{direction:03d}{speed:02d}G{speed + rng.randrange(8, 18):02d}KT"
+    visibility = "9999" if rng.random() < 0.4 else f"{rng.randrange(1500, 6500, 500):04d}"
+    weather = rng.choice(PRESENT_WEATHER)
+    clouds = f"FEW{rng.randrange(10, 30):03d} SCT{rng.randrange(20, 40):03d}"
+    if "TS" in weather:
+        clouds = f"FEW{rng.randrange(15, 30):03d}CB SCT{rng.randrange(20, 40):03d}"
+    temp = rng.randrange(20, 34)
+    groups = [
+        "SPECI" if rng.random() < 0.05 else "METAR", icao, f"{moment:%d%H%M}Z", wind, visibility,
+        f"R27/P{rng.randrange(1000, 2000, 100)}" if rng.random() < 0.03 else "",
+        weather, clouds, f"{temp:02d}/{temp - rng.randrange(2, 8):02d}", f"Q{rng.randrange(1002, 1012)}",
+        rng.choice(TRENDS),
+    ]
+    return " ".join(group for group in groups if group)
+
+
+def metar_observations(icao="VABB", start=datetime(2023, 9, 1), days=31, step_minutes=30, seed=0):
+    """
+    Yield (observation time, report) pairs every step_minutes for days days.
+    """
+    rng = random.Random(seed)
+    moment, end = start, start + timedelta(days=days)
+    while moment < end:
+        yield moment, metar_report(rng, icao, moment)
+        moment += timedelta(minutes=step_minutes)
+
+
+def write_metar_text(path, icao="VABB", start=datetime(2023, 9, 1), days=31, step_minutes=30, seed=0,
+                     timestamps=False):
+    """
+    Write METAR reports one per line.
+
+    Args:
+        timestamps: Prefix every line with its YYYYMMDDHHMM observation time,
+                    as OgimetAPI.save_metar_to_file does
+
+    Returns:
+        int: Number of reports written
+    """
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for moment, report in metar_observations(icao, start, days, step_minutes, seed):
+            f.write(f"{moment:%Y%m%d%H%M} {report}=\n" if timestamps else f"{report}=\n")
+            count += 1
+    return count
+
+
+def write_ogimet_csv(path, icao="VABB", start=datetime(2023, 9, 1), days=31, step_minutes=30, seed=0):
+    """
+    Write METAR reports as the OGIMET getmetar CSV response (with its header).
+
+    Returns:
+        int: Number of reports written
+    """
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("ICAOIND,ANO,MES,DIA,HORA,MIN,PARTE\n")
+        for moment, report in metar_observations(icao, start, days, step_minutes, seed):
+            f.write(f"{icao},{moment:%Y,%m,%d,%H,%M},{report}=\n")
+            count += 1
+    return count
+
+
+def forecast_text_name(start=datetime(2023, 9, 1), daily=False):
+    """
+    Name of a forecast text file: TAKEOFF_Forecast_DDMMYYYY.txt for one day, MMYYYY.txt for a month.
+    """
+    return f"TAKEOFF_Forecast_{start:%d%m%Y}.txt" if daily else f"{start:%m%Y}.txt"
+
+
+def write_forecast_text(path, start=datetime(2023, 9, 1), days=31, seed=0):
+    """
+    Write hourly forecast rows ("0000Z 270/10KT 28 1006 1007") from start.
+
+    A file named after one day (see forecast_text_name) holds that day's rows
+    only; otherwise every day starts with a line holding its day of the month.
+
+    Returns:
+        int: Number of forecast rows written
+    """
+    rng = random.Random(seed)
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("TIME \tWIND\tTEMP\tQFE \tQNH\n")
+        for day in range(days):
+            date = start + timedelta(days=day)
+            if days > 1:
+                f.write(f"{date.day}\n")
+            for hour in range(24):
+                qfe = rng.randrange(1001, 1011)
+                wind = "VRB02KT" if rng.random() < 0.05 else f"{rng.randrange(0, 360, 10):03d}/{rng.randrange(2, 20):02d}KT"
+                f.write(f"{hour:02d}00Z\t{wind}\t{rng.randrange(22, 34)}\t{qfe}\t{qfe + 1}\n")
+                count += 1
+    return count
+
+
+def write_sounding_csv(path, levels=5000, launch=datetime(2023, 9, 1, 0, 0), seed=0):
+    """
+    Write a UWyo sounding CSV with levels rows from the surface up to 30 km.
+
+    Returns:
+        int: Number of levels written
+    """
+    rng = random.Random(seed)
+    heights = sorted(round(rng.uniform(0, 30000), 1) for _ in range(levels))
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(",".join(SOUNDING_COLUMNS) + "\n")
+        for height in heights:
+            temp = round(30 - height * 0.0065 + rng.gauss(0, 0.5), 1)
+            f.write(
+                f"{launch:%Y-%m-%d %H:%M:%S},72.85,19.12,{1013.25 * (1 - height / 44330) ** 5.255:.1f},"
+                f"{height},{temp},{temp - rng.uniform(1, 10):.1f},{rng.randrange(10, 100)},"
+                f"{rng.randrange(0, 360)},{rng.uniform(0, 40):.1f}\n"
+            )
+    return levels
+
+
+def forecast_weather(start, hours=6, seed=0):
+    """
+    Weather section of a local forecast valid from start, with BECMG/TEMPO groups.
+    """
+    rng = random.Random(seed)
+    text = rng.choice(FORECAST_WEATHER)
+    if rng.random() < 0.6:
+        becmg = start + timedelta(hours=rng.randrange(0, hours // 2))
+        text += f" BECMG {becmg:%d%H}/{becmg + timedelta(hours=2):%d%H} {rng.choice(FORECAST_WEATHER)}"
+    if rng.random() < 0.6:
+        tempo = start + timedelta(hours=rng.randrange(0, hours // 2))
+        text += f" TEMPO {tempo:%d%H}/{tempo + timedelta(hours=hours // 2 + 1):%d%H} {rng.choice(FORECAST_WEATHER)}"
+    return text
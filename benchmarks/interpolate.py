@@ -0,0 +1,77 @@
+"""
+Benchmark interpolate_temperature_only on soundings of increasing resolution.
+
+Synthetic soundings have the given number of levels between the surface and
+30 km (as in a high-resolution UWyo CSV); forecast levels are spread over the
+same range like the UPPER WINDS table of a forecast PDF. Compare releases with
+benchmarks.suite --baseline.
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.utils.upper_data_fetch import interpolate_temperature_only
+
+
+def synthetic_sounding(levels, seed=0):
+    """
+    Build a sounding frame with strictly increasing heights.
+    """
+    rng = np.random.default_rng(seed)
+    heights = np.sort(rng.uniform(0, 30000, levels)).round(1)
+    return pd.DataFrame({
+        "geopotential height_m": heights,
+        "temperature_C": (30 - heights * 0.0065 + rng.normal(0, 0.5, levels)).round(1),
+        "wind speed_m/s": rng.uniform(0, 40, levels).round(1),
+        "wind direction_degree": rng.integers(0, 360, levels).astype(float),
+    })
+
+
+def synthetic_forecast(levels, seed=0):
+    """
+    Build forecast levels like parse_forecast_pdf returns (highest first).
+    """
+    rng = np.random.default_rng(seed)
+    altitudes = sorted(rng.integers(100, 29000, levels).tolist(), reverse=True)
+    return pd.DataFrame({
+        "Altitude (m)": altitudes,
+        "Wind Direction": [f"{d:03d}" for d in rng.integers(0, 36, levels) * 10],
+        "Wind Speed (kt)": rng.integers(5, 80, levels).astype(float),
+        "Temperature (°C)": rng.integers(-60, 30, levels).astype(float),
+    })
+
+
+def time_call(func, actual_df, forecast_df, repeat):
+    """
+    Best wall-clock time of func over `repeat` runs.
+    """
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(actual_df, forecast_df)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--levels", type=int, nargs="+", default=[100, 1000, 10000],
+                        help="Number of sounding levels per synthetic input")
+    parser.add_argument("--forecast-levels", type=int, default=200, help="Number of forecast levels")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement (best is kept)")
+    args = parser.parse_args()
+
+    forecast_df = synthetic_forecast(args.forecast_levels)
+    print(f"{'levels':>8} {'ms':>10} {'levels/s':>14}")
+    for levels in args.levels:
+        actual_df = synthetic_sounding(levels, seed=levels)
+        elapsed, result = time_call(interpolate_temperature_only, actual_df, forecast_df, args.repeat)
+        assert result["interp_temperature_C"].notna().all()
+        print(f"{levels:>8} {elapsed * 1000:>10.2f} {levels / elapsed:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
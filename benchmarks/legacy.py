@@ -0,0 +1,276 @@
+"""
+The row-by-row compare_weather_data that the vectorized comparison replaced.
+
+benchmarks.compare_weather_data times it as the "before" case in rows per
+second and checks that the current code still produces the same output. Other
+stages are compared with earlier releases through benchmarks.suite --baseline.
+"""
+
+import pandas as pd
+
+from app.utils.metar import circular_difference
+
+
+def compare_weather_data_iterrows(
+    df1,
+    df2,
+    wind_dir_threshold=30,
+    wind_speed_threshold=5,
+    temp_threshold=1,
+    qnh_threshold=1,
+):
+    """
+    Row-by-row compare_weather_data (merged_df.iterrows() loop).
+
+    Compares weather data from two DataFrames based on matching 'DAY' and 'TIME'.
+
+    Args:
+        df1 (pd.DataFrame): Actual (METAR) data with 'TIME', 'WIND_DIR', 'WIND_SPEED', 'TEMP', 'QNH', and 'DAY'.
+        df2 (pd.DataFrame): Forecast data with 'TIME', 'WIND_DIR', 'WIND_SPEED', 'TEMP', 'QNH', and 'DAY'.
+        wind_dir_threshold (int): Threshold for wind direction accuracy in degrees.
+        wind_speed_threshold (int): Threshold for wind speed accuracy in knots.
+        temp_threshold (int): Threshold for temperature accuracy in °C.
+        qnh_threshold (int): Threshold for QNH accuracy in hPa.
+
+    Returns:
+        pd.DataFrame: Daily accuracy summary with counts in parentheses.
+    """
+
+    if not isinstance(df1, pd.DataFrame) or not isinstance(df2, pd.DataFrame):
+        print("Error: Input arguments must be Pandas DataFrames.")
+        return pd.DataFrame()
+
+    required_columns = ["TIME", "WIND_DIR", "WIND_SPEED", "TEMP", "QNH", "DAY"]
+
+    # Check if all required columns are in df1
+    if not all(col in df1.columns for col in required_columns):
+        missing_cols = [col for col in required_columns if col not in df1.columns]
+        print(f"Error: METAR DataFrame is missing columns: {missing_cols}")
+        return pd.DataFrame()
+
+    # Check if all required columns except QNH are in df2
+    forecast_required = ["TIME", "WIND_DIR", "WIND_SPEED", "TEMP", "DAY"]
+    if not all(col in df2.columns for col in forecast_required):
+        missing_cols = [col for col in forecast_required if col not in df2.columns]
+        print(f"Error: Forecast DataFrame is missing columns: {missing_cols}")
+        return pd.DataFrame()
+
+    # If QNH is not in df2 but QFE is, use QFE as QNH
+    if "QNH" not in df2.columns and "QFE" in df2.columns:
+        df2["QNH"] = df2["QFE"]
+    elif "QNH" not in df2.columns:
+        print(
+            "Error: Forecast DataFrame is missing QNH column and no QFE column to substitute."
+        )
+        return pd.DataFrame()
+
+    # Combine DAY and TIME for unique identification
+    df1["DATETIME"] = (
+        df1["DAY"].astype(str).str.zfill(2) + " " + df1["TIME"].astype(str)
+    )
+    df2["DATETIME"] = (
+        df2["DAY"].astype(str).str.zfill(2) + " " + df2["TIME"].astype(str)
+    )
+
+    # Remove duplicate date-times, keeping the first occurrence
+    df1_unique = df1.drop_duplicates(subset="DATETIME", keep="first")
+    df2_unique = df2.drop_duplicates(subset="DATETIME", keep="first")
+
+    merged_df = pd.merge(
+        df1_unique,
+        df2_unique,
+        on="DATETIME",
+        suffixes=("_actual", "_forecast"),
+        how="inner",
+    )
+
+    if merged_df.empty:
+        print("No matching day and times found between the DataFrames.")
+        return pd.DataFrame()
+
+    # Track parameter-wise individual accuracies
+    dir_accuracy_flags = []
+    speed_accuracy_flags = []
+    temp_accuracy_flags = []
+    qnh_accuracy_flags = []
+    overall_accuracy = []
+    inaccuracy_reasons = []
+
+    for _, row in merged_df.iterrows():
+        actual_dir = row["WIND_DIR_actual"]
+        forecast_dir = row["WIND_DIR_forecast"]
+        actual_speed = row["WIND_SPEED_actual"]
+        forecast_speed = row["WIND_SPEED_forecast"]
+        actual_temp = row["TEMP_actual"]
+        forecast_temp = row["TEMP_forecast"]
+        actual_qnh = row["QNH_actual"]
+        forecast_qnh = row["QNH_forecast"]
+
+        dir_accurate = False
+        speed_accurate = False
+        temp_accurate = False
+        qnh_accurate = False
+        reasons = []
+
+        # Handle direction accuracy
+        if (
+            actual_dir == "VRB"
+            or forecast_dir == "VRB"
+            or actual_dir == "N/A"
+            or forecast_dir == "N/A"
+            or pd.isna(actual_dir)
+            or pd.isna(forecast_dir)
+        ):
+            dir_accurate = True
+        else:
+            try:
+                dir_diff = circular_difference(int(forecast_dir), int(actual_dir))
+                dir_accurate = dir_diff is not None and dir_diff <= wind_dir_threshold
+                if not dir_accurate and dir_diff is not None:
+                    reasons.append(f"Wind Direction off by {dir_diff:.1f}°")
+            except (ValueError, TypeError):
+                print(
+                    f"Warning: Invalid wind direction for DATETIME {row['DATETIME']}."
+                )
+                reasons.append("Wind Direction - Invalid data")
+
+        # Handle speed accuracy
+        if (
+            pd.notna(actual_speed)
+            and pd.notna(forecast_speed)
+            and actual_speed != "N/A"
+            and forecast_speed != "N/A"
+        ):
+            try:
+                speed_diff = abs(int(forecast_speed) - int(actual_speed))
+                speed_accurate = speed_diff <= wind_speed_threshold
+                if not speed_accurate:
+                    reasons.append(f"Wind Speed off by {speed_diff} knots")
+            except (ValueError, TypeError):
+                print(f"Warning: Invalid wind speed for DATETIME {row['DATETIME']}.")
+                reasons.append("Wind Speed - Invalid data")
+        else:
+            print(f"Warning: Missing wind speed for DATETIME {row['DATETIME']}.")
+            reasons.append("Wind Speed - Missing data")
+
+        # Handle temperature accuracy
+        if (
+            pd.notna(actual_temp)
+            and pd.notna(forecast_temp)
+            and actual_temp != "N/A"
+            and forecast_temp != "N/A"
+        ):
+            try:
+                temp_diff = abs(float(forecast_temp) - float(actual_temp))
+                temp_accurate = temp_diff <= temp_threshold
+                if not temp_accurate:
+                    reasons.append(f"Temperature off by {temp_diff:.1f}°C")
+            except (ValueError, TypeError):
+                print(f"Warning: Invalid temperature for DATETIME {row['DATETIME']}.")
+                reasons.append("Temperature - Invalid data")
+        else:
+            print(f"Warning: Missing temperature for DATETIME {row['DATETIME']}.")
+            reasons.append("Temperature - Missing data")
+
+        # Handle QNH accuracy
+        if (
+            pd.notna(actual_qnh)
+            and pd.notna(forecast_qnh)
+            and actual_qnh != "N/A"
+            and forecast_qnh != "N/A"
+        ):
+            try:
+                qnh_diff = abs(float(forecast_qnh) - float(actual_qnh))
+                qnh_accurate = qnh_diff <= qnh_threshold
+                if not qnh_accurate:
+                    reasons.append(f"QNH off by {qnh_diff:.1f} hPa")
+            except (ValueError, TypeError):
+                print(f"Warning: Invalid QNH for DATETIME {row['DATETIME']}.")
+                reasons.append("QNH - Invalid data")
+        else:
+            print(f"Warning: Missing QNH for DATETIME {row['DATETIME']}.")
+            reasons.append("QNH - Missing data")
+
+        # Store individual accuracy flags
+        dir_accuracy_flags.append(dir_accurate)
+        speed_accuracy_flags.append(speed_accurate)
+        temp_accuracy_flags.append(temp_accurate)
+        qnh_accuracy_flags.append(qnh_accurate)
+
+        # Overall accuracy
+        overall_accuracy.append(
+            "Accurate"
+            if all([dir_accurate, speed_accurate, temp_accurate, qnh_accurate])
+            else "Not Accurate"
+        )
+        
+        # Store inaccuracy reasons
+        inaccuracy_reasons.append(" | ".join(reasons) if reasons else "All Accurate")
+
+    # Add accuracy flags to DataFrame
+    merged_df["DIR_Accurate"] = dir_accuracy_flags
+    merged_df["SPD_Accurate"] = speed_accuracy_flags
+    merged_df["TEMP_Accurate"] = temp_accuracy_flags
+    merged_df["QNH_Accurate"] = qnh_accuracy_flags
+    merged_df["Accuracy"] = overall_accuracy
+    merged_df["Inaccuracy_Reason"] = inaccuracy_reasons
+
+    # Group-wise summary per DAY
+    merged_df["DAY"] = merged_df["DATETIME"].str.split().str[0]  # Extract day again
+
+    # Calculate daily accuracy percentages with counts
+    daily_accuracy = (
+        merged_df.groupby("DAY")
+        .agg(
+            {
+                "DIR_Accurate": lambda x: f"{round(100 * x.sum() / len(x), 1)}% ({x.sum()})",
+                "SPD_Accurate": lambda x: f"{round(100 * x.sum() / len(x), 1)}% ({x.sum()})",
+                "TEMP_Accurate": lambda x: f"{round(100 * x.sum() / len(x), 1)}% ({x.sum()})",
+                "QNH_Accurate": lambda x: f"{round(100 * x.sum() / len(x), 1)}% ({x.sum()})",
+                "Accuracy": lambda x: f"{round(100 * (x == 'Accurate').sum() / len(x), 1)}% ({(x == 'Accurate').sum()})",
+            }
+        )
+        .rename(
+            columns={
+                "DIR_Accurate": "Wind Direction",
+                "SPD_Accurate": "Wind Speed",
+                "TEMP_Accurate": "Temperature",
+                "QNH_Accurate": "QNH",
+                "Accuracy": "Overall",
+            }
+        )
+        .reset_index()
+    )
+
+    # Calculate whole month accuracy
+    total_records = len(merged_df)
+    whole_month = {
+        "DAY": "Whole Month",
+        "Wind Direction": f"{round(100 * merged_df['DIR_Accurate'].sum() / total_records, 1)}% ({merged_df['DIR_Accurate'].sum()})",
+        "Wind Speed": f"{round(100 * merged_df['SPD_Accurate'].sum() / total_records, 1)}% ({merged_df['SPD_Accurate'].sum()})",
+        "Temperature": f"{round(100 * merged_df['TEMP_Accurate'].sum() / total_records, 1)}% ({merged_df['TEMP_Accurate'].sum()})",
+        "QNH": f"{round(100 * merged_df['QNH_Accurate'].sum() / total_records, 1)}% ({merged_df['QNH_Accurate'].sum()})",
+        "Overall": f"{round(100 * (merged_df['Accuracy'] == 'Accurate').sum() / total_records, 1)}% ({(merged_df['Accuracy'] == 'Accurate').sum()})",
+    }
+
+    # Add ICAO requirements row
+    icao_requirements = {
+        "DAY": "ICAO Requirement",
+        "Wind Direction": "80%",
+        "Wind Speed": "80%",
+        "Temperature": "80%",
+        "QNH": "80%",
+        "Overall": "80%",
+    }
+
+    # Append whole month and ICAO requirements to daily accuracy
+    daily_accuracy = pd.concat(
+        [
+            daily_accuracy,
+            pd.DataFrame([whole_month]),
+            pd.DataFrame([icao_requirements]),
+        ],
+        ignore_index=True,
+    )
+
+    return daily_accuracy, merged_df
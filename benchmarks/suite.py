@@ -0,0 +1,282 @@
+"""
+Time every pipeline stage on synthetic data and write the results as JSON.
+
+Each stage runs in a fresh process: its input is generated (see
+benchmarks.generators), the stage is timed over a few runs, then run once more
+under tracemalloc. The results hold the best and mean time, the throughput in
+items per second, the peak RSS of the process and the peak Python allocation
+of the stage. Results of two releases can be compared with --baseline.
+
+    python -m benchmarks.suite --days 31 --output results.json
+    python -m benchmarks.suite --days 31 --baseline results.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from multiprocessing import get_context
+from typing import Any, Callable, Dict, NamedTuple
+
+import pandas as pd
+
+from app.config import BASE_DIR
+from app.utils import upper_air_weather
+from app.utils.metar import compare_weather_data, decode_metar_to_csv, extract_data_from_file_with_day_and_wind
+from app.utils.sounding_cache import parse_sounding_csv
+from app.utils.upper_data_fetch import interpolate_temperature_only
+from app.utils.warning_bulletin import parse_warning_bulletin
+from app.utils.warning_verification import MetarTimeline, verify_warnings, warning_accuracy
+from benchmarks import generators
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+START = datetime(2023, 9, 1)
+
+
+class Case(NamedTuple):
+    """A stage ready to be timed: func runs it once on inputs of items items."""
+    func: Callable[[], Any]
+    items: int
+    unit: str
+    input_bytes: int
+
+
+def _peak_rss_mb():
+    """Peak resident set size of this process so far, or None where it cannot be read."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return round(peak / (1e6 if sys.platform == "darwin" else 1e3), 1)
+
+
+class StubOgimetAPI:
+    """
+    Stand-in for OgimetAPI serving generated reports, so the stage is timed without the network.
+    """
+
+    def __init__(self, observations, directory):
+        self.observations = observations
+        self.directory = directory
+        self.calls = 0
+
+    def __call__(self):
+        return self
+
+    def save_metar_to_file(self, begin, end=None, icao=None):
+        begin = datetime.strptime(begin, "%Y%m%d%H%M")
+        end = datetime.strptime(end, "%Y%m%d%H%M")
+        self.calls += 1
+        path = os.path.join(self.directory, f"metar_data_{self.calls}.txt")
+        with open(path, "w") as f:
+            for moment, report in self.observations:
+                if begin <= moment <= end:
+                    f.write(f"{moment:%Y%m%d%H%M} {report}=\n")
+        return path
+
+
+def decode_case(tmp, args):
+    path = os.path.join(tmp, "metar.txt")
+    reports = generators.write_metar_text(path, start=START, days=args.days, seed=args.seed)
+    output = os.path.join(tmp, "decoded.csv")
+    return Case(lambda: decode_metar_to_csv(path, output, month=START.month, year=START.year, icao="VABB"),
+                reports, "reports", os.path.getsize(path))
+
+
+def extract_case(tmp, args):
+    path = os.path.join(tmp, generators.forecast_text_name(START))
+    rows = generators.write_forecast_text(path, start=START, days=args.days, seed=args.seed)
+    return Case(lambda: extract_data_from_file_with_day_and_wind(path), rows, "forecast rows", os.path.getsize(path))
+
+
+def compare_case(tmp, args):
+    df_metar, df_forecast = generators.synthetic_month(args.days, seed=args.seed)
+    return Case(lambda: compare_weather_data(df_metar, df_forecast), len(df_forecast), "forecast rows",
+                int(df_metar.memory_usage(deep=True).sum() + df_forecast.memory_usage(deep=True).sum()))
+
+
+def interpolate_case(tmp, args):
+    path = os.path.join(tmp, "sounding.csv")
+    generators.write_sounding_csv(path, levels=args.levels, seed=args.seed)
+    actual_df = parse_sounding_csv(path)
+    forecast_df = generators.synthetic_forecast(args.levels, seed=args.seed)
+    return Case(lambda: interpolate_temperature_only(actual_df, forecast_df), args.levels, "forecast levels",
+                os.path.getsize(path))
+
+
+def weather_accuracy_case(tmp, args):
+    observations = list(generators.metar_observations(start=START, days=args.days, seed=args.seed))
+    forecasts = []
+    for day in range(args.days):
+        start = START + timedelta(days=day)
+        forecasts.append((generators.forecast_weather(start, seed=args.seed + day),
+                          f"{start:%Y%m%d%H%M}", f"{start + timedelta(hours=6):%Y%m%d%H%M}"))
+    stub = StubOgimetAPI(observations, tmp)
+
+    def run():
+        original, upper_air_weather.OgimetAPI = upper_air_weather.OgimetAPI, stub
+        try:
+            return [upper_air_weather.process_weather_accuracy_helper(weather, begin, end, "VABB")
+                    for weather, begin, end in forecasts]
+        finally:
+            upper_air_weather.OgimetAPI = original
+
+    return Case(run, len(forecasts), "forecasts", sum(len(report) + 2 for _, report in observations))
+
+
+def warning_pipeline_case(tmp, args):
+    bulletin_path = os.path.join(tmp, "AERODROM WARNING COMPOSITE.txt")
+    metar_path = os.path.join(tmp, "metar.txt")
+    generators.write_bulletin(bulletin_path, year=START.year, days=args.days, seed=args.seed)
+    generators.write_metar_text(metar_path, start=datetime(START.year, 1, 1), days=args.days, seed=args.seed,
+                                timestamps=True)
+    warnings_csv = os.path.join(tmp, "AD_warn_DF.csv")
+    report_csv = os.path.join(tmp, "final_warning_report.csv")
+
+    def run():
+        # The steps of AD_warn.py and generate_warning_report.py
+        parse_warning_bulletin(bulletin_path, station="VABB").to_csv(warnings_csv)
+        ad_warn_df = pd.read_csv(warnings_csv, dtype={"Issue date/time": str})
+        report_df = verify_warnings(ad_warn_df, MetarTimeline.from_file(metar_path))
+        report_df.to_csv(report_csv, index=False)
+        return warning_accuracy(report_df)
+
+    warnings = len(parse_warning_bulletin(bulletin_path, station="VABB"))
+    return Case(run, warnings, "warnings", os.path.getsize(bulletin_path) + os.path.getsize(metar_path))
+
+
+CASES = {
+    "decode_metar_to_csv": decode_case,
+    "extract_data_from_file_with_day_and_wind": extract_case,
+    "compare_weather_data": compare_case,
+    "interpolate_temperature_only": interpolate_case,
+    "process_weather_accuracy_helper": weather_accuracy_case,
+    "aerodrome_warning_pipeline": warning_pipeline_case,
+}
+
+
+def run_case(name, args):
+    """
+    Generate the input of a stage and time it; runs in its own process.
+    """
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+        case = CASES[name](tmp, args)
+        setup_rss = _peak_rss_mb()
+        times = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            case.func()
+            times.append(time.perf_counter() - start)
+        peak_rss = _peak_rss_mb()
+
+        tracemalloc.start()
+        case.func()
+        peak_alloc = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    best = min(times)
+    return {
+        "items": case.items,
+        "unit": case.unit,
+        "input_bytes": case.input_bytes,
+        "repeat": args.repeat,
+        "best_seconds": round(best, 6),
+        "mean_seconds": round(sum(times) / len(times), 6),
+        "throughput_per_second": round(case.items / best, 1) if best else None,
+        "setup_rss_mb": setup_rss,
+        "peak_rss_mb": peak_rss,
+        "peak_alloc_mb": round(peak_alloc / 1e6, 2),
+    }
+
+
+def _release_label():
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"], cwd=BASE_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare_results(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> int:
+    """
+    Print the throughput of each stage against a baseline run.
+
+    Returns:
+        int: Number of stages slower than the baseline by more than tolerance (a fraction)
+    """
+    regressions = 0
+    print(f"\nAgainst {baseline.get('label')} ({baseline.get('created')}):")
+    for name, result in results["results"].items():
+        old = baseline.get("results", {}).get(name)
+        if not old or not old.get("throughput_per_second") or not result["throughput_per_second"]:
+            print(f"{name:<42} {'no baseline':>10}")
+            continue
+        ratio = result["throughput_per_second"] / old["throughput_per_second"]
+        slower = ratio < 1 - tolerance
+        regressions += slower
+        print(f"{name:<42} {ratio:>9.2f}x{'  REGRESSION' if slower else ''}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--days", type=int, default=31, help="Days of METARs, forecasts and warnings")
+    parser.add_argument("--levels", type=int, default=5000, help="Sounding and forecast levels to interpolate")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per stage")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", nargs="+", choices=sorted(CASES), help="Stages to run (default: all)")
+    parser.add_argument("--label", help="Name of the measured version (default: git describe)")
+    parser.add_argument("--output", help="JSON file to write the results to")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.1,
+                        help="Throughput drop against the baseline reported as a regression")
+    args = parser.parse_args(argv)
+
+    results = {
+        "label": args.label or _release_label(),
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "parameters": {"days": args.days, "levels": args.levels, "repeat": args.repeat, "seed": args.seed},
+        "results": {},
+    }
+    print(f"{'stage':<42} {'items':>8} {'best s':>9} {'items/s':>11} {'peak RSS MB':>12} {'alloc MB':>9}")
+    for name in args.only or CASES:
+        # A fresh process per stage, so its peak RSS is not that of an earlier stage
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+            result = pool.submit(run_case, name, args).result()
+        results["results"][name] = result
+        rss = result["peak_rss_mb"] if result["peak_rss_mb"] is not None else "-"
+        print(f"{name:<42} {result['items']:>8} {result['best_seconds']:>9.4f} "
+              f"{result['throughput_per_second']:>11.1f} {rss:>12} {result['peak_alloc_mb']:>9.2f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare_results(results, baseline, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,85 @@
+"""
+Benchmark the aerodrome warning bulletin parser on a year of warnings.
+
+A synthetic bulletin holds a year of warnings for several stations, written
+like the blocks of "AERODROM WARNING COMPOSITE 0F SEPTEMBER 2023.txt".
+Compare releases with benchmarks.suite --baseline.
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from app.utils.warning_bulletin import parse_warning_bulletin
+
+STATIONS = ["VABB", "VAJJ", "VIDP", "VOMM", "VECC", "VOBL", "VAAH", "VOHS"]
+WEATHER_LINES = [
+    "SFC WSPD {speed}KT MAX{gust} FROM {direction} FCST NC=",
+    "MOD TSRA WITH SFC WSPD {speed}KT MAX{gust} FROM {direction}  FCST NC=",
+    "FBL TSRA WITH SFC WSPD {speed}KT MAX{gust} FROM {direction} FCST NC=",
+    "HVY TSRA WITH SFC WSPD {speed}KT MAX{gust} FROM {direction} FCST NC=",
+    "FBL TS WITH  SFC WSPD {speed}KT MAX{gust} FROM {direction} FCST NC=",
+    "MOD TSRA FCST NC=",
+    "SFC WSPD {speed}KT MAX{gust} FROM  {direction} OBSD NC=",
+]
+DIRECTIONS = ["N", "NNE", "NE", "ENE", "E", "ESE", "SE", "SSE", "S", "SSW", "SW", "WSW", "W", "WNW", "NW", "NNW"]
+
+
+def write_bulletin(path, year=2023, stations=STATIONS, per_day=3, seed=0, days=None):
+    """
+    Write a year of warnings (or its first days), per_day warnings a day for every station.
+
+    Returns:
+        int: Number of warnings written
+    """
+    rng = random.Random(seed)
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        day = datetime(year, 1, 1)
+        end = day + timedelta(days=days) if days else datetime(year + 1, 1, 1)
+        while day < end:
+            f.write(f"{day.day}\n\n")
+            for station in stations:
+                for number in range(1, per_day + 1):
+                    issued = day + timedelta(minutes=rng.randrange(0, 24 * 60, 15))
+                    valid_from = issued + timedelta(minutes=rng.choice([0, 15, 30]))
+                    valid_to = valid_from + timedelta(hours=rng.choice([2, 3, 4]))
+                    weather = rng.choice(WEATHER_LINES).format(
+                        speed=rng.choice([17, 20]), gust=rng.choice([27, 30]), direction=rng.choice(DIRECTIONS)
+                    )
+                    f.write(f"LIGHT AIRCRAFT WARNING FOR {station} - {valid_from:%Y%m%d %H:%M}\n")
+                    f.write("-" * 44 + "\n")
+                    f.write(f"{station} {issued:%d%H%M} AD WRNG {number} "
+                            f"VALID {valid_from:%d%H%M}/{valid_to:%d%H%M}\n")
+                    f.write(f"{weather}\n\n")
+                    count += 1
+            day += timedelta(days=1)
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--year", type=int, default=2023)
+    parser.add_argument("--stations", type=int, default=len(STATIONS), help="Number of stations (max %(default)s)")
+    parser.add_argument("--per-day", type=int, default=3, help="Warnings per station and day")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bulletin.txt")
+        total = write_bulletin(path, args.year, STATIONS[:args.stations], args.per_day)
+        size = os.path.getsize(path)
+
+        start = time.perf_counter()
+        df = parse_warning_bulletin(path)
+        elapsed = time.perf_counter() - start
+
+    assert len(df) == total
+    print(f"warnings: {total} ({args.stations} stations, {size / 1e6:.1f} MB)")
+    print(f"parsed in {elapsed:.2f}s ({total / elapsed:,.0f} warnings/s)")
+
+
+if __name__ == "__main__":
+    main()
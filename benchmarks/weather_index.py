@@ -0,0 +1,100 @@
+"""
+Benchmark the present weather scoring with the METAR weather index.
+
+A synthetic month of half-hourly METARs is verified against a local forecast
+for every six hours of the month, as a bulk verification run would do. The
+index is built once and each forecast and change group is a binary search in
+its own time window. Compare releases with benchmarks.suite --baseline.
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from app.utils.upper_air_weather import score_weather_forecast
+from app.utils.weather_index import WeatherIndex
+
+WEATHER = ["", "", "", "HZ", "BR", "-RA", "RA", "SHRA", "-TSRA", "TSRA", "+TSRA", "TS", "VCSH", "FU"]
+FORECASTS = [
+    "HZ",
+    "FBL RA BECMG {becmg} TSRA TEMPO {tempo} HVY TSRA",
+    "FU BECMG {becmg} BR",
+    "MOD SHRA TEMPO {tempo} TS",
+    "NSW TEMPO {tempo} FBL TSRA",
+]
+
+
+def write_metar_month(path, icao="VABB", year=2023, month=7, seed=0):
+    """
+    Write a month of half-hourly METARs, one report per line.
+
+    Returns:
+        int: Number of reports written
+    """
+    rng = random.Random(seed)
+    observed = datetime(year, month, 1)
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        while observed.month == month:
+            weather = rng.choice(WEATHER)
+            groups = [f"METAR {icao} {observed:%d%H%M}Z", f"{rng.randrange(0, 360, 10):03d}{rng.randrange(2, 20):02d}KT",
+                      "3000", weather, f"SCT{rng.randrange(10, 40):03d}", "28/24", "Q1006"]
+            if rng.random() < 0.2:
+                groups.append(f"TEMPO {rng.choice(WEATHER[3:])}")
+            f.write(" ".join(group for group in groups if group) + "=\n")
+            observed += timedelta(minutes=30)
+            count += 1
+    return count
+
+
+def forecasts(year=2023, month=7, hours=6, seed=0):
+    """
+    (weather text, start, end) of a forecast for every hours of the month.
+    """
+    rng = random.Random(seed)
+    start = datetime(year, month, 1)
+    while start.month == month:
+        end = start + timedelta(hours=hours)
+        becmg = f"{start + timedelta(hours=1):%d%H}/{start + timedelta(hours=2):%d%H}"
+        tempo = f"{start + timedelta(hours=1):%d%H}/{start + timedelta(hours=5):%d%H}"
+        yield rng.choice(FORECASTS).format(becmg=becmg, tempo=tempo), start, end
+        start = end
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--year", type=int, default=2023)
+    parser.add_argument("--month", type=int, default=7)
+    parser.add_argument("--hours", type=int, nargs="+", default=[6, 1], help="Validity of each forecast")
+    args = parser.parse_args()
+
+    print(f"{'hours':>6} {'forecasts':>10} {'build ms':>9} {'score ms':>9} {'forecasts/s':>12} {'credited':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "metar.txt")
+        reports = write_metar_month(path, year=args.year, month=args.month)
+        for hours in args.hours:
+            cases = list(forecasts(args.year, args.month, hours))
+
+            # The scorer may print its progress; only the timings are of interest here
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                index = WeatherIndex.from_file(path, reference=datetime(args.year, args.month, 1))
+                built = time.perf_counter() - start
+                start = time.perf_counter()
+                scores = [score_weather_forecast(text, begin, end, index) for text, begin, end in cases]
+                scored = time.perf_counter() - start
+
+            # Forecasts credited with any observed weather
+            credited = sum(score > 0 for score in scores)
+            print(f"{hours:>6} {len(cases):>10} {built * 1e3:>9.1f} {scored * 1e3:>9.1f} "
+                  f"{len(cases) / scored:>12,.0f} {credited:>9}")
+    print(f"{reports} METAR reports")
+
+
+if __name__ == "__main__":
+    main()
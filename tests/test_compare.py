@@ -0,0 +1,48 @@
+"""
+Tests of the chunked METAR/forecast comparison.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import pandas as pd
+
+from app.utils.metar import compare_weather_data_chunked
+
+
+def frame(day, time):
+    return pd.DataFrame({
+        "DAY": [day], "TIME": [time], "WIND_DIR": [270], "WIND_SPEED": [10], "TEMP": [30], "QNH": [1006],
+    })
+
+
+class CompareChunkedTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.merged = os.path.join(self.tmp, "merged.csv")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_matching_rows(self):
+        summary, stats = compare_weather_data_chunked(frame(4, "0800"), frame(4, "0800"), self.merged)
+        self.assertEqual(stats, {"rows": 1, "accurate": 1})
+        self.assertEqual(summary["DAY"].tolist(), ["04", "Whole Month", "ICAO Requirement"])
+        self.assertTrue(os.path.exists(self.merged))
+
+    def test_no_matching_rows(self):
+        summary, stats = compare_weather_data_chunked(frame(4, "0800"), frame(10, "1200"), self.merged)
+        self.assertTrue(summary.empty)
+        self.assertEqual(stats, {"rows": 0, "accurate": 0})
+
+    def test_nothing_decoded(self):
+        summary, stats = compare_weather_data_chunked(None, frame(10, "1200"), self.merged)
+        self.assertTrue(summary.empty)
+        self.assertEqual(stats, {"rows": 0, "accurate": 0})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,183 @@
+"""
+Tests of the shared HTTP client against a local HTTP stub.
+"""
+
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from app.utils.http_client import HttpClient
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    Answers every path with the next status of the script the test set for it.
+
+    A script entry is (status, headers, delay in seconds); the last entry is
+    repeated once the script is used up.
+    """
+
+    def do_GET(self):
+        server = self.server
+        path = self.path.split("?")[0]
+        with server.lock:
+            server.hits[path] = server.hits.get(path, 0) + 1
+            script = server.scripts[path]
+            status, headers, delay = script[min(server.hits[path], len(script)) - 1]
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        try:
+            if delay:
+                time.sleep(delay)
+            body = f"{status}".encode()
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def log_message(self, format, *args):
+        pass
+
+
+class HttpClientTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+        self.server.daemon_threads = True
+        self.server.lock = threading.Lock()
+        self.server.scripts = {}
+        self.server.hits = {}
+        self.server.in_flight = 0
+        self.server.max_in_flight = 0
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.host = f"127.0.0.1:{self.server.server_port}"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def url(self, path, *script):
+        self.server.scripts[path] = list(script)
+        return f"http://{self.host}{path}"
+
+    def client(self, **kwargs):
+        options = {"timeout": (2, 2), "max_retries": 3, "backoff_factor": 0.01, "max_backoff": 5, "max_per_host": 4}
+        options.update(kwargs)
+        return HttpClient(**options)
+
+    def test_retries_server_errors(self):
+        url = self.url("/flaky", (503, {}, 0), (500, {}, 0), (200, {}, 0))
+        response = self.client().get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.server.hits["/flaky"], 3)
+
+    def test_retries_rate_limit(self):
+        url = self.url("/limited", (429, {}, 0), (200, {}, 0))
+        response = self.client().get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.server.hits["/limited"], 2)
+
+    def test_returns_last_response_when_retries_run_out(self):
+        url = self.url("/down", (503, {}, 0))
+        response = self.client(max_retries=2).get(url)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(self.server.hits["/down"], 3)
+
+    def test_does_not_retry_client_errors(self):
+        url = self.url("/missing", (404, {}, 0))
+        response = self.client().get(url)
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.server.hits["/missing"], 1)
+
+    def test_honours_retry_after(self):
+        url = self.url("/later", (429, {"Retry-After": "1"}, 0), (200, {}, 0))
+        started = time.monotonic()
+        response = self.client().get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertGreaterEqual(time.monotonic() - started, 1)
+
+    def test_retry_after_is_capped_by_max_backoff(self):
+        url = self.url("/much_later", (429, {"Retry-After": "30"}, 0), (200, {}, 0))
+        started = time.monotonic()
+        response = self.client(max_backoff=0.2).get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertLess(time.monotonic() - started, 5)
+
+    def test_applies_timeout(self):
+        url = self.url("/slow", (200, {}, 2))
+        started = time.monotonic()
+        with self.assertRaises(requests.Timeout):
+            self.client(timeout=(1, 0.3), max_retries=0).get(url)
+        self.assertLess(time.monotonic() - started, 1.5)
+
+    def test_timeout_argument_overrides_default(self):
+        url = self.url("/slow", (200, {}, 2))
+        with self.assertRaises(requests.Timeout):
+            self.client(max_retries=0).get(url, timeout=0.3)
+
+    def test_caps_concurrent_requests_per_host(self):
+        url = self.url("/busy", (200, {}, 0.2))
+        client = self.client(max_per_host=2)
+        threads = [threading.Thread(target=client.get, args=(url,)) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.server.hits["/busy"], 6)
+        self.assertEqual(self.server.max_in_flight, 2)
+
+    def test_releases_slot_while_backing_off(self):
+        limited = self.url("/later", (429, {"Retry-After": "1"}, 0), (200, {}, 0))
+        ok = self.url("/ok", (200, {}, 0))
+        client = self.client(max_per_host=1)
+        backing_off = threading.Thread(target=client.get, args=(limited,))
+        backing_off.start()
+        while self.server.hits.get("/later", 0) < 1:
+            time.sleep(0.01)
+
+        started = time.monotonic()
+        self.assertEqual(client.get(ok).status_code, 200)
+        self.assertLess(time.monotonic() - started, 0.8)
+        backing_off.join()
+        self.assertEqual(self.server.hits["/later"], 2)
+
+    def test_metrics_count_retries_and_latency(self):
+        client = self.client()
+        client.get(self.url("/flaky", (503, {}, 0), (503, {}, 0), (200, {}, 0.1)))
+        client.get(self.url("/missing", (404, {}, 0)))
+
+        stats = client.metrics()[self.host]
+        self.assertEqual(stats["requests"], 2)
+        self.assertEqual(stats["retries"], 2)
+        self.assertEqual(stats["failures"], 1)
+        self.assertEqual(stats["last_status"], 404)
+        self.assertGreaterEqual(stats["max_latency"], 0.1)
+        self.assertAlmostEqual(stats["avg_latency"], stats["total_latency"] / 2)
+        self.assertLessEqual(stats["avg_latency"], stats["max_latency"])
+
+    def test_metrics_count_failed_connections(self):
+        url = self.url("/slow", (200, {}, 2))
+        client = self.client(timeout=(1, 0.2), max_retries=1)
+        with self.assertRaises(requests.Timeout):
+            client.get(url)
+
+        stats = client.metrics()[self.host]
+        self.assertEqual(stats["requests"], 1)
+        self.assertEqual(stats["retries"], 1)
+        self.assertEqual(stats["failures"], 1)
+        self.assertIsNone(stats["last_status"])
+
+
+if __name__ == "__main__":
+    unittest.main()
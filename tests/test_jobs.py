@@ -0,0 +1,147 @@
+"""
+Tests of the background job queue, with a local HTTP stub in place of OGIMET.
+"""
+
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from app.utils.http_client import HttpClient
+from app.utils.jobs import FAILED, FINISHED, QUEUED, RUNNING, JobQueue, JobQueueFull
+from app.utils.metar_archive import MetarArchive
+from app.utils.ogimet import OgimetAPI
+
+GETMETAR_CSV = (
+    "VABB,2023,09,04,08,00,METAR VABB 040800Z 28010KT 3000 HZ SCT020 31/25 Q1006 NOSIG=\n"
+    "VABB,2023,09,04,08,30,METAR VABB 040830Z 27012KT 3000 HZ SCT020 31/25 Q1006 NOSIG=\n"
+)
+
+
+class OgimetStub(BaseHTTPRequestHandler):
+    """Answers getmetar with two reports of VABB."""
+
+    def do_GET(self):
+        body = GETMETAR_CSV.encode() if self.path.startswith("/cgi-bin/getmetar") else b""
+        self.send_response(200 if body else 404)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class JobQueueTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), OgimetStub)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        # OGIMET_BASE_URL of the stub
+        patcher = mock.patch.object(OgimetAPI, "BASE_URL", f"http://127.0.0.1:{self.server.server_port}/cgi-bin")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.gate = threading.Event()
+
+    def tearDown(self):
+        self.gate.set()
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def queue(self, **kwargs):
+        return JobQueue(path=os.path.join(self.tmp, "jobs.sqlite3"), **kwargs)
+
+    def fetch_metar(self, icao, progress=None):
+        """A job fetching METAR reports from the stub once the test opens the gate."""
+        progress("Waiting for the test")
+        self.gate.wait(10)
+        api = OgimetAPI(archive=MetarArchive(os.path.join(self.tmp, "archive.sqlite3")),
+                        http=HttpClient(max_retries=0))
+        reports = api.get_metar(begin="202309040000", end="202309041200", icao=icao)
+        return {"reports": [report["PARTE"] for report in reports]}, 200
+
+    def wait_for(self, queue, job_id, statuses):
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            job = queue.get(job_id)
+            if job["status"] in statuses:
+                return job
+            time.sleep(0.01)
+        self.fail(f"job {job_id} is still {job['status']}")
+
+    def test_status_flow(self):
+        queue = self.queue(max_workers=1, max_pending=4)
+        first = queue.submit("metar", self.fetch_metar, "VABB")
+        second = queue.submit("metar", self.fetch_metar, "VABB")
+
+        running = self.wait_for(queue, first, [RUNNING])
+        self.assertEqual(running["progress"], "Waiting for the test")
+        self.assertIsNotNone(running["started"])
+        # One worker: the second job waits for the first
+        self.assertEqual(queue.get(second)["status"], QUEUED)
+
+        self.gate.set()
+        for job_id in (first, second):
+            job = self.wait_for(queue, job_id, [FINISHED, FAILED])
+            self.assertEqual(job["status"], FINISHED)
+            self.assertEqual(job["status_code"], 200)
+            self.assertEqual(len(job["result"]["reports"]), 2)
+            self.assertIsNotNone(job["finished"])
+
+    def test_queue_full(self):
+        queue = self.queue(max_workers=1, max_pending=2)
+        jobs = [queue.submit("metar", self.fetch_metar, "VABB") for _ in range(2)]
+        with self.assertRaises(JobQueueFull):
+            queue.submit("metar", self.fetch_metar, "VABB")
+
+        # Finished jobs free their place
+        self.gate.set()
+        for job_id in jobs:
+            self.wait_for(queue, job_id, [FINISHED])
+        queue.submit("metar", self.fetch_metar, "VABB")
+
+    def test_failed_job(self):
+        queue = self.queue(max_workers=1)
+        job_id = queue.submit("metar", lambda progress=None: 1 / 0)
+        job = self.wait_for(queue, job_id, [FINISHED, FAILED])
+        self.assertEqual(job["status"], FAILED)
+        self.assertEqual(job["status_code"], 500)
+        self.assertIn("division by zero", job["error"])
+
+    def test_jobs_of_a_stopped_server_fail_on_start(self):
+        path = os.path.join(self.tmp, "jobs.sqlite3")
+        self.queue()
+        # A job of a dead process, one of this process before a restart, one of a live process
+        dead_pid = int(subprocess.run([sys.executable, "-c", "import os; print(os.getpid())"],
+                                      capture_output=True, text=True, check=True).stdout)
+        with sqlite3.connect(path) as conn:
+            conn.executemany(
+                "INSERT INTO jobs (id, kind, status, progress, created, pid) VALUES (?, 'metar', ?, '', 0, ?)",
+                [("dead", RUNNING, dead_pid), ("restarted", QUEUED, os.getpid()), ("live", RUNNING, os.getppid())],
+            )
+
+        queue = self.queue()
+        for job_id in ("dead", "restarted"):
+            job = queue.get(job_id)
+            self.assertEqual(job["status"], FAILED)
+            self.assertEqual(job["status_code"], 500)
+            self.assertIn("Interrupted", job["result"]["error"])
+            self.assertIsNotNone(job["finished"])
+        if os.name != "nt":
+            self.assertEqual(queue.get("live")["status"], RUNNING)
+
+
+if __name__ == "__main__":
+    unittest.main()
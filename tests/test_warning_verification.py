@@ -0,0 +1,84 @@
+"""
+Tests of the aerodrome warning verification across a month boundary.
+"""
+
+import io
+import unittest
+from datetime import datetime
+
+import pandas as pd
+
+from app.utils.warning_bulletin import parse_warning_bulletin
+from app.utils.warning_verification import (
+    VALIDITY_FROM_UTC,
+    VALIDITY_TO_UTC,
+    MetarTimeline,
+    extract_warning_windows,
+    verify_warnings,
+)
+
+BULLETIN = """\
+LIGHT AIRCRAFT WARNING FOR VABB - 20230930 22:00
+--------------------------------------------
+VABB 302145 AD WRNG 1 VALID 302200/010200
+SFC WSPD 17KT MAX27 FROM W FCST NC=
+
+LIGHT AIRCRAFT WARNING FOR VABB - 20231002 02:00
+--------------------------------------------
+VABB 020145 AD WRNG 1 VALID 020200/020500
+SFC WSPD 17KT MAX27 FROM W FCST NC=
+"""
+
+METAR = [
+    "202309300000 METAR VABB 300000Z 27008KT 3000 HZ SCT020 28/24 Q1006=",
+    "202309302300 METAR VABB 302300Z 27012G25KT 3000 HZ SCT020 28/24 Q1006=",
+    "202310010100 METAR VABB 010100Z 27010KT 3000 HZ SCT020 28/24 Q1006=",
+    "202310020300 METAR VABB 020300Z 27010G24KT 3000 HZ SCT020 28/24 Q1006=",
+    "202310020330 METAR VABB 020330Z 27010KT 3000 HZ SCT020 28/24 Q1006=",
+]
+
+
+class CrossMonthTest(unittest.TestCase):
+
+    def setUp(self):
+        self.timeline = MetarTimeline(METAR)
+        self.warnings = parse_warning_bulletin(io.StringIO(BULLETIN), station="VABB")
+
+    def test_bulletin_keeps_utc_validity(self):
+        self.assertEqual(self.warnings[VALIDITY_FROM_UTC].tolist(),
+                         [pd.Timestamp(2023, 9, 30, 22), pd.Timestamp(2023, 10, 2, 2)])
+        self.assertEqual(self.warnings[VALIDITY_TO_UTC].tolist(),
+                         [pd.Timestamp(2023, 10, 1, 2), pd.Timestamp(2023, 10, 2, 5)])
+
+    def test_windows_use_utc_validity(self):
+        windows = extract_warning_windows(self.warnings, self.timeline)
+        self.assertEqual([[o.time for o in window.observations] for window in windows], [
+            [datetime(2023, 9, 30, 23), datetime(2023, 10, 1, 1)],
+            [datetime(2023, 10, 2, 3), datetime(2023, 10, 2, 3, 30)],
+        ])
+
+    def test_windows_from_csv_table(self):
+        # AD_warn.py writes the table to CSV; the datetimes come back as text
+        buffer = io.StringIO()
+        self.warnings.to_csv(buffer)
+        buffer.seek(0)
+        table = pd.read_csv(buffer, dtype={"Issue date/time": str})
+        windows = extract_warning_windows(table, self.timeline)
+        self.assertEqual([len(window.observations) for window in windows], [2, 2])
+
+    def test_both_warnings_verify(self):
+        report = verify_warnings(self.warnings, self.timeline)
+        self.assertEqual(report["true-1 / false-0"].tolist(), [1, 1])
+
+    def test_ddhhmm_window_in_later_month(self):
+        self.assertEqual(len(self.timeline.window("020200", "020500")), 2)
+        self.assertEqual(len(self.timeline.window("302200Z", "010200Z")), 2)
+
+    def test_table_without_utc_columns(self):
+        table = self.warnings.drop(columns=[VALIDITY_FROM_UTC, VALIDITY_TO_UTC])
+        windows = extract_warning_windows(table, self.timeline)
+        self.assertEqual([len(window.observations) for window in windows], [2, 2])
+
+
+if __name__ == "__main__":
+    unittest.main()